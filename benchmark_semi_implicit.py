@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+"""
+###############################################################################
+Author:             Christoph Heim
+Date created:       20190715
+Last modified:      20190715
+License:            MIT
+
+Compare the cost per simulated day [s] of the explicit matsuno scheme
+with the semi-implicit treatment of the external gravity wave mode
+(i_semi_implicit = 1) for several time step factors
+(semi_implicit_dt_fac). The cost is the computing time of the time
+steps without NetCDF output, measured after n_warmup time steps (which
+include the compilation). The grid and all other settings are taken
+from namelist.py (CPU only).
+Each configuration is run in a separate process because the namelist
+is read at import:
+    python benchmark_semi_implicit.py           # all configurations
+    python benchmark_semi_implicit.py 1 4.      # i_semi_implicit, dt_fac
+###############################################################################
+"""
+import sys, subprocess
+
+# USER INPUT
+####################################################################
+# (i_semi_implicit, semi_implicit_dt_fac)
+configs = [(0, 1.), (1, 3.), (1, 4.), (1, 5.)]
+# time steps before measurement (includes compilation)
+n_warmup = 3
+# simulated time measured [h]
+bench_hours = 24.
+####################################################################
+
+
+def run_config(i_semi_implicit, dt_fac):
+    """
+    Run n_warmup time steps and bench_hours of simulated time with the
+    matsuno scheme and print time step, number of time steps and cost
+    per simulated day.
+    """
+    import namelist
+    namelist.i_time_stepping = 'MATSUNO'
+    namelist.i_semi_implicit = i_semi_implicit
+    namelist.semi_implicit_dt_fac = dt_fac
+    namelist.i_save_to_restart = 0
+    # some spare time for the warmup steps
+    namelist.i_sim_n_days = (bench_hours + 6.)/24.
+    from main_simulation import Simulation
+
+    sim = Simulation()
+    sim.setup()
+    sim.step(n_warmup)
+    GR = sim.GR
+    ts0 = GR.ts
+    sim_time_sec0 = GR.sim_time_sec
+    total0 = GR.timer.timings.get('total', 0.)
+    IO0 = GR.timer.timings.get('IO', 0.)
+    sim.run_until(sim_time_sec0 + bench_hours*3600)
+    sim_days = (GR.sim_time_sec - sim_time_sec0)/86400
+    cost = ( GR.timer.timings.get('total', 0.) - total0 -
+             (GR.timer.timings.get('IO', 0.) - IO0) ) / sim_days
+    n_ts = GR.ts - ts0
+    dt = GR.dt
+    sim.finalize()
+    print('RESULT ' + str(dt) + ' ' + str(n_ts) + ' ' + str(cost))
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) > 2:
+        run_config(int(sys.argv[1]), float(sys.argv[2]))
+        sys.exit()
+
+    results = {}
+    for config in configs:
+        print('i_semi_implicit ' + str(config[0]) +
+              ', semi_implicit_dt_fac ' + str(config[1]))
+        out = subprocess.run([sys.executable, __file__,
+                              str(config[0]), str(config[1])],
+                             stdout=subprocess.PIPE,
+                             universal_newlines=True).stdout
+        for line in out.split('\n'):
+            if line.startswith('RESULT'):
+                results[config] = [float(val) for val in line.split()[1:]]
+        if config not in results:
+            print(out)
+            raise ValueError('Benchmark failed for configuration ' +
+                             str(config) + '.')
+
+    ref_cost = results[configs[0]][2]
+    print('scheme'.ljust(20) + 'dt [s]\ttime steps\tcost [s/day]\tspeedup')
+    for config in configs:
+        if config[0]:
+            name = 'semi-implicit ' + str(config[1]) + 'x'
+        else:
+            name = 'explicit'
+        dt, n_ts, cost = results[config]
+        print(name.ljust(20) + str(round(dt,1)) + '\t' + str(int(n_ts)) +
+              '\t\t' + str(round(cost,1)) + '\t\t' +
+              str(round(ref_cost/cost,2)))
@@ -4,7 +4,7 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20190509
-Last modified:      20190628
+Last modified:      20190715
 License:            MIT
 
 Computation of potential virtual temperature (POTT) tendency
@@ -15,6 +15,7 @@ Chapter 7.4, page 213
 
 HISTORY
 - 20190604: CH  First implementation.
+- 20190715: CH  Column function for the fused CPU kernel (dyn_fused.py)
 ###############################################################################
 """
 import numpy as np
@@ -177,41 +178,58 @@ turb_flux_tendency = njit(turb_flux_tendency_py)
 radiation   = njit(radiation_py)
 add_up_tendencies = njit(add_up_tendencies_py)
 
-def launch_numba_cpu(A, dsigma, POTT_dif_coef,
+def launch_numba_cpu_column(A, dsigma, POTT_dif_coef,
                     dPOTTdt, POTT, UFLX, VFLX, COLP,
                     POTTVB, WWIND, COLP_NEW, 
                     PHI, PHIVB, KHEAT, RHO, RHOVB, SSHFLX,
-                    dPOTTdt_TURB, dPOTTdt_RAD):
-
-    for i in prange(nb,nx+nb):
-        for j in range(nb,ny+nb):
-            for k in range(wp_int(0),nz):
-                dPOTTdt[i  ,j  ,k], dPOTTdt_TURB[i  ,j  ,k] = \
-                    add_up_tendencies(POTT[i  ,j  ,k],
-                        POTT        [i-1,j  ,k  ], POTT         [i+1,j  ,k  ],
-                        POTT        [i  ,j-1,k  ], POTT         [i  ,j+1,k  ],
-                        POTT        [i  ,j  ,k-1], POTT         [i  ,j  ,k+1],
-                        UFLX        [i  ,j  ,k  ], UFLX[i+1,j  ,k],
-                        VFLX        [i  ,j  ,k  ], VFLX[i  ,j+1,k],
-                        COLP        [i  ,j  ,0  ],
-                        COLP        [i-1,j  ,0  ], COLP[i+1,j  ,0],
-                        COLP        [i  ,j-1,0  ], COLP[i  ,j+1,0],
-                        POTTVB      [i  ,j  ,k  ], POTTVB[i  ,j  ,k+1],
-                        WWIND       [i  ,j  ,k  ], WWIND[i  ,j  ,k+1],
-                        COLP_NEW    [i  ,j  ,0  ],
-
-                        PHI         [i  ,j  ,k  ], PHI        [i  ,j  ,k+1],
-                        PHI         [i  ,j  ,k-1], PHIVB      [i  ,j  ,k  ],
-                        PHIVB       [i  ,j  ,k+1], 
-                        KHEAT       [i  ,j  ,k  ], KHEAT      [i  ,j  ,k+1],
-                        RHO         [i  ,j  ,k  ], RHOVB      [i  ,j  ,k  ],
-                        RHOVB       [i  ,j  ,k+1], SSHFLX     [i  ,j  ,0  ],
-
-                        dPOTTdt_RAD [i  ,j  ,k],
-                        A           [i  ,j  ,0  ],
-                        dsigma      [0  ,0  ,k  ], POTT_dif_coef[0  ,0  ,k],
-                        k)
+                    dPOTTdt_TURB, dPOTTdt_RAD, i, j):
+    for k in range(wp_int(0),nz):
+        # level below (clipped at the surface where k+1 is outside of
+        # fields with nz levels and the value is not used)
+        kp1 = min(k+1, nz-1)
+        dPOTTdt[i  ,j  ,k], dPOTTdt_TURB[i  ,j  ,k] = \
+            add_up_tendencies(POTT[i  ,j  ,k],
+                POTT        [i-1,j  ,k  ], POTT         [i+1,j  ,k  ],
+                POTT        [i  ,j-1,k  ], POTT         [i  ,j+1,k  ],
+                POTT        [i  ,j  ,k-1], POTT         [i  ,j  ,kp1],
+                UFLX        [i  ,j  ,k  ], UFLX[i+1,j  ,k],
+                VFLX        [i  ,j  ,k  ], VFLX[i  ,j+1,k],
+                COLP        [i  ,j  ,0  ],
+                COLP        [i-1,j  ,0  ], COLP[i+1,j  ,0],
+                COLP        [i  ,j-1,0  ], COLP[i  ,j+1,0],
+                POTTVB      [i  ,j  ,k  ], POTTVB[i  ,j  ,k+1],
+                WWIND       [i  ,j  ,k  ], WWIND[i  ,j  ,k+1],
+                COLP_NEW    [i  ,j  ,0  ],
+
+                PHI         [i  ,j  ,k  ], PHI        [i  ,j  ,kp1],
+                PHI         [i  ,j  ,k-1], PHIVB      [i  ,j  ,k  ],
+                PHIVB       [i  ,j  ,k+1], 
+                KHEAT       [i  ,j  ,k  ], KHEAT      [i  ,j  ,k+1],
+                RHO         [i  ,j  ,k  ], RHOVB      [i  ,j  ,k  ],
+                RHOVB       [i  ,j  ,k+1], SSHFLX     [i  ,j  ,0  ],
+
+                dPOTTdt_RAD [i  ,j  ,k],
+                A           [i  ,j  ,0  ],
+                dsigma      [0  ,0  ,k  ], POTT_dif_coef[0  ,0  ,k],
+                k)
+
+POTT_tendency_column_cpu = njit(launch_numba_cpu_column, inline='always')
+
 
+def launch_numba_cpu(A, dsigma, POTT_dif_coef,
+                    dPOTTdt, POTT, UFLX, VFLX, COLP,
+                    POTTVB, WWIND, COLP_NEW, 
+                    PHI, PHIVB, KHEAT, RHO, RHOVB, SSHFLX,
+                    dPOTTdt_TURB, dPOTTdt_RAD, tiles):
+
+    for t in prange(tiles.shape[0]):
+        for i in range(tiles[t,0], min(tiles[t,1], nx+nb)):
+            for j in range(tiles[t,2], min(tiles[t,3], ny+nb)):
+                POTT_tendency_column_cpu(A, dsigma, POTT_dif_coef,
+                        dPOTTdt, POTT, UFLX, VFLX, COLP,
+                        POTTVB, WWIND, COLP_NEW,
+                        PHI, PHIVB, KHEAT, RHO, RHOVB, SSHFLX,
+                        dPOTTdt_TURB, dPOTTdt_RAD, i, j)
 
 POTT_tendency_cpu = njit(parallel=True)(launch_numba_cpu)
 
@@ -4,7 +4,7 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20190510
-Last modified:      20190616
+Last modified:      20190715
 License:            MIT
 
 Computation of horizontal momentum flux in longitude
@@ -247,9 +247,9 @@ def launch_cuda_main_kernel(dUFLXdt, UFLX,
 
     # BCx i
     if i == nb:
-        BFLX_im1     = BFLX_3D[nx ,j  ,k  ]
-        DFLX_im1     = DFLX_3D[nx ,j  ,k  ] 
-        EFLX_im1_jp1 = EFLX_3D[nx ,j+1,k  ]                 
+        BFLX_im1     = BFLX_3D[nx+nb-1,j  ,k  ]
+        DFLX_im1     = DFLX_3D[nx+nb-1,j  ,k  ] 
+        EFLX_im1_jp1 = EFLX_3D[nx+nb-1,j+1,k  ]                 
     else:
         BFLX_im1     = BFLX_3D[i-1,j  ,k  ]                 
         DFLX_im1     = DFLX_3D[i-1,j  ,k  ]                 
@@ -336,6 +336,100 @@ num_dif = njit(num_dif_py)
 add_up_tendencies = jit(add_up_tendencies_py)
 
 
+def launch_numba_cpu_column(dUFLXdt, UFLX,
+                        UWIND, VWIND, 
+                        BFLX_3D, CFLX_3D, DFLX_3D, EFLX_3D,
+                        PHI, PHIVB, COLP, POTT,
+                        PVTF, PVTFVB, WWIND_UWIND,
+
+                        KMOM_dUWINDdz, RHO,
+                        dUFLXdt_TURB, SMOMXFLX,
+
+                        corf_is, lat_is_rad,
+                        dlon_rad, dlat_rad,
+                        dyis,
+                        dsigma, sigma_vb,
+                        UVFLX_dif_coef, i, j):
+    for k in range(wp_int(0),nz):
+        # Prepare momentum fluxes and set boundary conditions if
+        # necessary
+        BFLX            = BFLX_3D[i  ,j  ,k  ]                 
+        CFLX            = CFLX_3D[i  ,j  ,k  ]                 
+        EFLX            = EFLX_3D[i  ,j  ,k  ]                 
+        DFLX_jp1        = DFLX_3D[i  ,j+1,k  ]                 
+        CFLX_jp1        = CFLX_3D[i  ,j+1,k  ]                 
+
+        # BCx i
+        if i == nb:
+            BFLX_im1        = BFLX_3D[nx+nb-1,j  ,k  ]
+            DFLX_im1        = DFLX_3D[nx+nb-1,j  ,k  ] 
+            EFLX_im1_jp1    = EFLX_3D[nx+nb-1,j+1,k  ]                 
+        else:
+            BFLX_im1        = BFLX_3D[i-1,j  ,k  ]                 
+            DFLX_im1        = DFLX_3D[i-1,j  ,k  ]                 
+            EFLX_im1_jp1    = EFLX_3D[i-1,j+1,k  ]                 
+
+        # BCy js
+        if j == nb:
+            DFLX_im1     = wp(0.)                 
+            CFLX         = wp(0.)                 
+            EFLX         = wp(0.)                 
+        if j == ny+nb-1:
+            DFLX_jp1     = wp(0.)                 
+            CFLX_jp1     = wp(0.)                 
+            EFLX_im1_jp1 = wp(0.)                 
+
+        dUFLXdt[i  ,j  ,k], dUFLXdt_TURB[i,j,k] = add_up_tendencies(
+    # 3D
+    UFLX        [i  ,j  ,k  ],
+    UFLX        [i-1,j  ,k  ], UFLX        [i+1,j  ,k  ],
+    UFLX        [i  ,j-1,k  ], UFLX        [i  ,j+1,k  ],
+    VWIND       [i  ,j  ,k  ], VWIND       [i-1,j  ,k  ],
+    VWIND       [i  ,j+1,k  ], VWIND       [i-1,j+1,k  ],
+    UWIND       [i  ,j  ,k  ], UWIND       [i-1,j  ,k  ],
+    UWIND       [i+1,j  ,k  ], UWIND       [i  ,j-1,k  ], 
+    UWIND       [i  ,j+1,k  ], UWIND       [i-1,j-1,k  ], 
+    UWIND       [i-1,j+1,k  ], UWIND       [i+1,j-1,k  ], 
+    UWIND       [i+1,j+1,k  ], 
+    BFLX                     , BFLX_im1                 ,
+    CFLX                     , CFLX_jp1                 ,
+    DFLX_im1                 , DFLX_jp1                 ,
+    EFLX                     , EFLX_im1_jp1             ,
+    PHI         [i  ,j  ,k  ], PHI         [i-1,j  ,k  ],
+    POTT        [i  ,j  ,k  ], POTT        [i-1,j  ,k  ],
+    PVTF        [i  ,j  ,k  ], PVTF        [i-1,j  ,k  ],
+    PVTFVB      [i  ,j  ,k  ], PVTFVB      [i-1,j  ,k  ],
+    PVTFVB      [i-1,j  ,k+1], PVTFVB      [i  ,j  ,k+1],
+    WWIND_UWIND [i  ,j  ,k  ], WWIND_UWIND [i  ,j  ,k+1],
+
+    PHIVB       [i  ,j  ,k  ], PHIVB       [i-1,j  ,k  ],
+    PHIVB       [i  ,j-1,k  ], PHIVB       [i  ,j+1,k  ],
+    PHIVB       [i-1,j-1,k  ], PHIVB       [i-1,j+1,k  ],
+    PHIVB       [i  ,j  ,k+1], PHIVB       [i-1,j  ,k+1],
+    PHIVB       [i  ,j-1,k+1], PHIVB       [i  ,j+1,k+1],
+    PHIVB       [i-1,j-1,k+1], PHIVB       [i-1,j+1,k+1],
+    RHO         [i  ,j  ,k  ], RHO         [i-1,j  ,k  ],
+    RHO         [i  ,j-1,k  ], RHO         [i  ,j+1,k  ],
+    RHO         [i-1,j-1,k  ], RHO         [i-1,j+1,k  ],
+    SMOMXFLX    [i  ,j  ,0  ], SMOMXFLX    [i-1,j  ,0  ],
+    SMOMXFLX    [i  ,j-1,0  ], SMOMXFLX    [i  ,j+1,0  ],
+    SMOMXFLX    [i-1,j-1,0  ], SMOMXFLX    [i-1,j+1,0  ],
+    KMOM_dUWINDdz[i  ,j  ,k  ],KMOM_dUWINDdz[i  ,j  ,k+1],
+
+    # 2D
+    COLP        [i  ,j  ,0  ], COLP        [i-1,j  ,0  ],
+    # GR horizontal
+    corf_is     [i  ,j  ,0  ], lat_is_rad  [i  ,j  ,0  ],
+    dlon_rad    [i  ,j  ,0  ], dlat_rad    [i  ,j  ,0  ],
+    dyis        [i  ,j  ,0  ],
+    # GR vertical
+    dsigma      [0  ,0  ,k  ], sigma_vb    [0  ,0  ,k  ],
+    sigma_vb    [0  ,0  ,k+1],
+    UVFLX_dif_coef[0,0,k], k, j)
+
+UFLX_tendency_column_cpu = njit(launch_numba_cpu_column, inline='always')
+
+
 def launch_numba_cpu_main(dUFLXdt, UFLX,
                         UWIND, VWIND, 
                         BFLX_3D, CFLX_3D, DFLX_3D, EFLX_3D,
@@ -349,86 +443,24 @@ def launch_numba_cpu_main(dUFLXdt, UFLX,
                         dlon_rad, dlat_rad,
                         dyis,
                         dsigma, sigma_vb,
-                        UVFLX_dif_coef):
-
-
-    for i in prange(nb,nxs+nb):
-        for j in range(nb,ny+nb):
-            for k in range(wp_int(0),nz):
-                # Prepare momentum fluxes and set boundary conditions if
-                # necessary
-                BFLX            = BFLX_3D[i  ,j  ,k  ]                 
-                CFLX            = CFLX_3D[i  ,j  ,k  ]                 
-                EFLX            = EFLX_3D[i  ,j  ,k  ]                 
-                DFLX_jp1        = DFLX_3D[i  ,j+1,k  ]                 
-                CFLX_jp1        = CFLX_3D[i  ,j+1,k  ]                 
-
-                # BCx i
-                if i == nb:
-                    BFLX_im1        = BFLX_3D[nx ,j  ,k  ]
-                    DFLX_im1        = DFLX_3D[nx ,j  ,k  ] 
-                    EFLX_im1_jp1    = EFLX_3D[nx ,j+1,k  ]                 
-                else:
-                    BFLX_im1        = BFLX_3D[i-1,j  ,k  ]                 
-                    DFLX_im1        = DFLX_3D[i-1,j  ,k  ]                 
-                    EFLX_im1_jp1    = EFLX_3D[i-1,j+1,k  ]                 
-
-                # BCy js
-                if j == nb:
-                    DFLX_im1     = wp(0.)                 
-                    CFLX         = wp(0.)                 
-                    EFLX         = wp(0.)                 
-                if j == ny+nb-1:
-                    DFLX_jp1     = wp(0.)                 
-                    CFLX_jp1     = wp(0.)                 
-                    EFLX_im1_jp1 = wp(0.)                 
-
-                dUFLXdt[i  ,j  ,k], dUFLXdt_TURB[i,j,k] = add_up_tendencies(
-            # 3D
-            UFLX        [i  ,j  ,k  ],
-            UFLX        [i-1,j  ,k  ], UFLX        [i+1,j  ,k  ],
-            UFLX        [i  ,j-1,k  ], UFLX        [i  ,j+1,k  ],
-            VWIND       [i  ,j  ,k  ], VWIND       [i-1,j  ,k  ],
-            VWIND       [i  ,j+1,k  ], VWIND       [i-1,j+1,k  ],
-            UWIND       [i  ,j  ,k  ], UWIND       [i-1,j  ,k  ],
-            UWIND       [i+1,j  ,k  ], UWIND       [i  ,j-1,k  ], 
-            UWIND       [i  ,j+1,k  ], UWIND       [i-1,j-1,k  ], 
-            UWIND       [i-1,j+1,k  ], UWIND       [i+1,j-1,k  ], 
-            UWIND       [i+1,j+1,k  ], 
-            BFLX                     , BFLX_im1                 ,
-            CFLX                     , CFLX_jp1                 ,
-            DFLX_im1                 , DFLX_jp1                 ,
-            EFLX                     , EFLX_im1_jp1             ,
-            PHI         [i  ,j  ,k  ], PHI         [i-1,j  ,k  ],
-            POTT        [i  ,j  ,k  ], POTT        [i-1,j  ,k  ],
-            PVTF        [i  ,j  ,k  ], PVTF        [i-1,j  ,k  ],
-            PVTFVB      [i  ,j  ,k  ], PVTFVB      [i-1,j  ,k  ],
-            PVTFVB      [i-1,j  ,k+1], PVTFVB      [i  ,j  ,k+1],
-            WWIND_UWIND [i  ,j  ,k  ], WWIND_UWIND [i  ,j  ,k+1],
+                        UVFLX_dif_coef, tiles):
 
-            PHIVB       [i  ,j  ,k  ], PHIVB       [i-1,j  ,k  ],
-            PHIVB       [i  ,j-1,k  ], PHIVB       [i  ,j+1,k  ],
-            PHIVB       [i-1,j-1,k  ], PHIVB       [i-1,j+1,k  ],
-            PHIVB       [i  ,j  ,k+1], PHIVB       [i-1,j  ,k+1],
-            PHIVB       [i  ,j-1,k+1], PHIVB       [i  ,j+1,k+1],
-            PHIVB       [i-1,j-1,k+1], PHIVB       [i-1,j+1,k+1],
-            RHO         [i  ,j  ,k  ], RHO         [i-1,j  ,k  ],
-            RHO         [i  ,j-1,k  ], RHO         [i  ,j+1,k  ],
-            RHO         [i-1,j-1,k  ], RHO         [i-1,j+1,k  ],
-            SMOMXFLX    [i  ,j  ,0  ], SMOMXFLX    [i-1,j  ,0  ],
-            SMOMXFLX    [i  ,j-1,0  ], SMOMXFLX    [i  ,j+1,0  ],
-            SMOMXFLX    [i-1,j-1,0  ], SMOMXFLX    [i-1,j+1,0  ],
-            KMOM_dUWINDdz[i  ,j  ,k  ],KMOM_dUWINDdz[i  ,j  ,k+1],
+    for t in prange(tiles.shape[0]):
+        for i in range(tiles[t,0], min(tiles[t,1], nxs+nb)):
+            for j in range(tiles[t,2], min(tiles[t,3], ny+nb)):
+                UFLX_tendency_column_cpu(
+                        dUFLXdt, UFLX, UWIND, VWIND,
+                        BFLX_3D, CFLX_3D, DFLX_3D, EFLX_3D,
+                        PHI, PHIVB, COLP, POTT,
+                        PVTF, PVTFVB, WWIND_UWIND,
 
-            # 2D
-            COLP        [i  ,j  ,0  ], COLP        [i-1,j  ,0  ],
-            # GR horizontal
-            corf_is     [i  ,j  ,0  ], lat_is_rad  [i  ,j  ,0  ],
-            dlon_rad    [i  ,j  ,0  ], dlat_rad    [i  ,j  ,0  ],
-            dyis        [i  ,j  ,0  ],
-            # GR vertical
-            dsigma      [0  ,0  ,k  ], sigma_vb    [0  ,0  ,k  ],
-            sigma_vb    [0  ,0  ,k+1],
-            UVFLX_dif_coef[0,0,k], k, j)
+                        KMOM_dUWINDdz, RHO,
+                        dUFLXdt_TURB, SMOMXFLX,
+
+                        corf_is, lat_is_rad,
+                        dlon_rad, dlat_rad,
+                        dyis,
+                        dsigma, sigma_vb,
+                        UVFLX_dif_coef, i, j)
 
 UFLX_tendency_cpu = njit(parallel=True)(launch_numba_cpu_main)
@@ -4,7 +4,7 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20190511
-Last modified:      20190616
+Last modified:      20190715
 License:            MIT
 
 Computation of horizontal momentum flux in latitude
@@ -241,10 +241,10 @@ def launch_cuda_main_kernel(dVFLXdt, VFLX,
     SFLX_jm1        =  SFLX_3D[i  ,j-1,k  ]
 
     # BCx is
-    if i == nxs - 1:
-        QFLX_ip1        =  QFLX_3D[1  ,j  ,k  ]
-        TFLX_ip1_jm1    =  TFLX_3D[1  ,j-1,k  ]
-        SFLX_ip1        =  SFLX_3D[1  ,j  ,k  ]
+    if i == nx+nb-1:
+        QFLX_ip1        =  QFLX_3D[nb ,j  ,k  ]
+        TFLX_ip1_jm1    =  TFLX_3D[nb ,j-1,k  ]
+        SFLX_ip1        =  SFLX_3D[nb ,j  ,k  ]
     else:
         QFLX_ip1        =  QFLX_3D[i+1,j  ,k  ]
         TFLX_ip1_jm1    =  TFLX_3D[i+1,j-1,k  ]
@@ -319,7 +319,7 @@ pre_grad = njit(pre_grad_py)
 num_dif = njit(num_dif_py)
 add_up_tendencies = njit(add_up_tendencies_py)
 
-def launch_numba_cpu_main(dVFLXdt, VFLX,
+def launch_numba_cpu_column(dVFLXdt, VFLX,
                     UWIND, VWIND,
                     RFLX_3D, SFLX_3D, TFLX_3D, QFLX_3D,
                     PHI, PHIVB, COLP, POTT,
@@ -332,77 +332,110 @@ def launch_numba_cpu_main(dVFLXdt, VFLX,
                     dlon_rad, dlat_rad,
                     dxjs,
                     dsigma, sigma_vb,
-                    UVFLX_dif_coef):
+                    UVFLX_dif_coef, i, j):
+    for k in range(wp_int(0),nz):
+        # Prepare momentum fluxes and set boundary conditions if
+        # necessary
+        RFLX            =  RFLX_3D[i  ,j  ,k  ]
+        QFLX            =  QFLX_3D[i  ,j  ,k  ]
+        TFLX            =  TFLX_3D[i  ,j  ,k  ]
+        RFLX_jm1        =  RFLX_3D[i  ,j-1,k  ]
+        SFLX_jm1        =  SFLX_3D[i  ,j-1,k  ]
+
+        # BCx is
+        if i == nx+nb-1:
+            QFLX_ip1        =  QFLX_3D[nb ,j  ,k  ]
+            TFLX_ip1_jm1    =  TFLX_3D[nb ,j-1,k  ]
+            SFLX_ip1        =  SFLX_3D[nb ,j  ,k  ]
+        else:
+            QFLX_ip1        =  QFLX_3D[i+1,j  ,k  ]
+            TFLX_ip1_jm1    =  TFLX_3D[i+1,j-1,k  ]
+            SFLX_ip1        =  SFLX_3D[i+1,j  ,k  ]
+
+        #dVFLXdt[i  ,j  ,k] = add_up_tendencies(
+        dVFLXdt[i  ,j  ,k], dVFLXdt_TURB[i  ,j  ,k] = add_up_tendencies(
+    # 3D
+    VFLX        [i  ,j  ,k  ],
+    VFLX        [i-1,j  ,k  ], VFLX        [i+1,j  ,k  ],
+    VFLX        [i  ,j-1,k  ], VFLX        [i  ,j+1,k  ],
+    UWIND       [i  ,j  ,k  ], UWIND       [i  ,j-1,k  ],
+    UWIND       [i+1,j  ,k  ], UWIND       [i+1,j-1,k  ],
+    VWIND       [i  ,j  ,k  ], VWIND       [i  ,j-1,k  ],
+    VWIND       [i  ,j+1,k  ], VWIND       [i-1,j  ,k  ],
+    VWIND       [i+1,j  ,k  ], VWIND       [i-1,j-1,k  ],
+    VWIND       [i+1,j-1,k  ], VWIND       [i-1,j+1,k  ],
+    VWIND       [i+1,j+1,k  ], 
+    RFLX                     , RFLX_jm1                 ,
+    QFLX                     , QFLX_ip1                 ,
+    SFLX_jm1                 , SFLX_ip1                 ,
+    TFLX                     , TFLX_ip1_jm1             ,
+    PHI         [i  ,j  ,k  ], PHI         [i  ,j-1,k  ],
+    POTT        [i  ,j  ,k  ], POTT        [i  ,j-1,k  ],
+    PVTF        [i  ,j  ,k  ], PVTF        [i  ,j-1,k  ],
+    PVTFVB      [i  ,j  ,k  ], PVTFVB      [i  ,j-1,k  ],
+    PVTFVB      [i  ,j-1,k+1], PVTFVB      [i  ,j  ,k+1],
+    WWIND_VWIND [i  ,j  ,k  ], WWIND_VWIND [i  ,j  ,k+1],
+
+    PHIVB       [i  ,j  ,k  ], PHIVB       [i  ,j-1,k  ],
+    PHIVB       [i-1,j  ,k  ], PHIVB       [i+1,j  ,k  ],
+    PHIVB       [i-1,j-1,k  ], PHIVB       [i+1,j-1,k  ],
+    PHIVB       [i  ,j  ,k+1], PHIVB       [i  ,j-1,k+1],
+    PHIVB       [i-1,j  ,k+1], PHIVB       [i+1,j  ,k+1],
+    PHIVB       [i-1,j-1,k+1], PHIVB       [i+1,j-1,k+1],
+    RHO         [i  ,j  ,k  ], RHO         [i  ,j-1,k  ],
+    RHO         [i-1,j  ,k  ], RHO         [i+1,j  ,k  ],
+    RHO         [i-1,j-1,k  ], RHO         [i+1,j-1,k  ],
+    SMOMYFLX    [i  ,j  ,0  ], SMOMYFLX    [i  ,j-1,0  ],
+    SMOMYFLX    [i-1,j  ,0  ], SMOMYFLX    [i+1,j  ,0  ],
+    SMOMYFLX    [i-1,j-1,0  ], SMOMYFLX    [i+1,j-1,0  ],
+    KMOM_dVWINDdz[i  ,j  ,k  ],KMOM_dVWINDdz[i  ,j  ,k+1],
+
+    # 2D
+    COLP        [i  ,j  ,0  ], COLP        [i  ,j-1,0  ],
+    # GR horizontal
+    corf        [i  ,j  ,0  ], corf        [i  ,j-1,0  ],
+    lat_rad     [i  ,j  ,0  ], lat_rad     [i  ,j-1,0  ],
+    dlon_rad    [i  ,j  ,0  ], dlat_rad    [i  ,j  ,0  ],
+    dxjs        [i  ,j  ,0  ],
+    # GR vertical
+    dsigma      [0  ,0  ,k  ], sigma_vb    [0  ,0  ,k  ],
+    sigma_vb    [0  ,0  ,k+1],
+    UVFLX_dif_coef[0,0,k], k, i)
+
+VFLX_tendency_column_cpu = njit(launch_numba_cpu_column, inline='always')
 
-    for i in prange(nb,nx+nb):
-        for j in range(nb,nys+nb):
-            for k in range(wp_int(0),nz):
-                # Prepare momentum fluxes and set boundary conditions if
-                # necessary
-                RFLX            =  RFLX_3D[i  ,j  ,k  ]
-                QFLX            =  QFLX_3D[i  ,j  ,k  ]
-                TFLX            =  TFLX_3D[i  ,j  ,k  ]
-                RFLX_jm1        =  RFLX_3D[i  ,j-1,k  ]
-                SFLX_jm1        =  SFLX_3D[i  ,j-1,k  ]
-
-                # BCx is
-                if i == nxs - 1:
-                    QFLX_ip1        =  QFLX_3D[1  ,j  ,k  ]
-                    TFLX_ip1_jm1    =  TFLX_3D[1  ,j-1,k  ]
-                    SFLX_ip1        =  SFLX_3D[1  ,j  ,k  ]
-                else:
-                    QFLX_ip1        =  QFLX_3D[i+1,j  ,k  ]
-                    TFLX_ip1_jm1    =  TFLX_3D[i+1,j-1,k  ]
-                    SFLX_ip1        =  SFLX_3D[i+1,j  ,k  ]
-
-                #dVFLXdt[i  ,j  ,k] = add_up_tendencies(
-                dVFLXdt[i  ,j  ,k], dVFLXdt_TURB[i  ,j  ,k] = add_up_tendencies(
-            # 3D
-            VFLX        [i  ,j  ,k  ],
-            VFLX        [i-1,j  ,k  ], VFLX        [i+1,j  ,k  ],
-            VFLX        [i  ,j-1,k  ], VFLX        [i  ,j+1,k  ],
-            UWIND       [i  ,j  ,k  ], UWIND       [i  ,j-1,k  ],
-            UWIND       [i+1,j  ,k  ], UWIND       [i+1,j-1,k  ],
-            VWIND       [i  ,j  ,k  ], VWIND       [i  ,j-1,k  ],
-            VWIND       [i  ,j+1,k  ], VWIND       [i-1,j  ,k  ],
-            VWIND       [i+1,j  ,k  ], VWIND       [i-1,j-1,k  ],
-            VWIND       [i+1,j-1,k  ], VWIND       [i-1,j+1,k  ],
-            VWIND       [i+1,j+1,k  ], 
-            RFLX                     , RFLX_jm1                 ,
-            QFLX                     , QFLX_ip1                 ,
-            SFLX_jm1                 , SFLX_ip1                 ,
-            TFLX                     , TFLX_ip1_jm1             ,
-            PHI         [i  ,j  ,k  ], PHI         [i  ,j-1,k  ],
-            POTT        [i  ,j  ,k  ], POTT        [i  ,j-1,k  ],
-            PVTF        [i  ,j  ,k  ], PVTF        [i  ,j-1,k  ],
-            PVTFVB      [i  ,j  ,k  ], PVTFVB      [i  ,j-1,k  ],
-            PVTFVB      [i  ,j-1,k+1], PVTFVB      [i  ,j  ,k+1],
-            WWIND_VWIND [i  ,j  ,k  ], WWIND_VWIND [i  ,j  ,k+1],
 
-            PHIVB       [i  ,j  ,k  ], PHIVB       [i  ,j-1,k  ],
-            PHIVB       [i-1,j  ,k  ], PHIVB       [i+1,j  ,k  ],
-            PHIVB       [i-1,j-1,k  ], PHIVB       [i+1,j-1,k  ],
-            PHIVB       [i  ,j  ,k+1], PHIVB       [i  ,j-1,k+1],
-            PHIVB       [i-1,j  ,k+1], PHIVB       [i+1,j  ,k+1],
-            PHIVB       [i-1,j-1,k+1], PHIVB       [i+1,j-1,k+1],
-            RHO         [i  ,j  ,k  ], RHO         [i  ,j-1,k  ],
-            RHO         [i-1,j  ,k  ], RHO         [i+1,j  ,k  ],
-            RHO         [i-1,j-1,k  ], RHO         [i+1,j-1,k  ],
-            SMOMYFLX    [i  ,j  ,0  ], SMOMYFLX    [i  ,j-1,0  ],
-            SMOMYFLX    [i-1,j  ,0  ], SMOMYFLX    [i+1,j  ,0  ],
-            SMOMYFLX    [i-1,j-1,0  ], SMOMYFLX    [i+1,j-1,0  ],
-            KMOM_dVWINDdz[i  ,j  ,k  ],KMOM_dVWINDdz[i  ,j  ,k+1],
+def launch_numba_cpu_main(dVFLXdt, VFLX,
+                    UWIND, VWIND,
+                    RFLX_3D, SFLX_3D, TFLX_3D, QFLX_3D,
+                    PHI, PHIVB, COLP, POTT,
+                    PVTF, PVTFVB, WWIND_VWIND,
 
-            # 2D
-            COLP        [i  ,j  ,0  ], COLP        [i  ,j-1,0  ],
-            # GR horizontal
-            corf        [i  ,j  ,0  ], corf        [i  ,j-1,0  ],
-            lat_rad     [i  ,j  ,0  ], lat_rad     [i  ,j-1,0  ],
-            dlon_rad    [i  ,j  ,0  ], dlat_rad    [i  ,j  ,0  ],
-            dxjs        [i  ,j  ,0  ],
-            # GR vertical
-            dsigma      [0  ,0  ,k  ], sigma_vb    [0  ,0  ,k  ],
-            sigma_vb    [0  ,0  ,k+1],
-            UVFLX_dif_coef[0,0,k], k, i)
+                    KMOM_dVWINDdz, RHO,
+                    dVFLXdt_TURB, SMOMYFLX,
+
+                    corf, lat_rad,
+                    dlon_rad, dlat_rad,
+                    dxjs,
+                    dsigma, sigma_vb,
+                    UVFLX_dif_coef, tiles):
+
+    for t in prange(tiles.shape[0]):
+        for i in range(tiles[t,0], min(tiles[t,1], nx+nb)):
+            for j in range(tiles[t,2], min(tiles[t,3], nys+nb)):
+                VFLX_tendency_column_cpu(
+                        dVFLXdt, VFLX, UWIND, VWIND,
+                        RFLX_3D, SFLX_3D, TFLX_3D, QFLX_3D,
+                        PHI, PHIVB, COLP, POTT,
+                        PVTF, PVTFVB, WWIND_VWIND,
+
+                        KMOM_dVWINDdz, RHO,
+                        dVFLXdt_TURB, SMOMYFLX,
+
+                        corf, lat_rad,
+                        dlon_rad, dlat_rad,
+                        dxjs,
+                        dsigma, sigma_vb,
+                        UVFLX_dif_coef, i, j)
 
 VFLX_tendency_cpu = njit(parallel=True)(launch_numba_cpu_main)
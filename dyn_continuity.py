@@ -4,7 +4,7 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20190526
-Last modified:      20190608
+Last modified:      20190715
 License:            MIT
 
 Computation column pressure (COLP) tendency and vertical wind (WWIND),
@@ -19,6 +19,7 @@ Chapter 7.4, page 208ff
 HISTORY
 - 20190531: CH: First implementation.
 - 20190608: CH: Removed vertical reduction restriction of nz = 2**x
+- 20190715: CH: Single pass version of CPU kernel (continuity_fused_cpu)
 ###############################################################################
 """
 import numpy as np
@@ -130,12 +131,12 @@ def launch_cuda_main_kernel(UFLX, VFLX, FLXDIV,
             dCOLPdt[i,j,0] = wp(0.)
 
         ## PRESSURE TIME STEP
-        ########################################################################
+        #######################################################################
         cuda.syncthreads()
         COLP_NEW[i,j,0] = euler_forward(COLP_OLD[i,j,0], dCOLPdt[i,j,0], dt)
 
         ## VERTICAL WIND
-        ########################################################################
+        #######################################################################
         cuda.syncthreads()
         vert_sum[k] = FLXDIV[i,j,k]
         # cumulative-sum-reduce vert_sum vertically
@@ -170,63 +171,136 @@ euler_forward   = vectorize()(euler_forward_py)
 def launch_numba_cpu(UFLX, VFLX, FLXDIV,
                     UWIND, VWIND, WWIND,
                     COLP, dCOLPdt, COLP_NEW, COLP_OLD,
-                    dyis, dxjs, dsigma, sigma_vb, A, dt):
-
-
-    for i in prange(nb,nx+nb):
-        for j in range(nb,ny+nb):
-            for k in range(wp_int(0),nz):
-                # MOMENTUM FLUXES
-                ###############################################################
-                UFLX_i = calc_UFLX(
-                    UWIND       [i  ,j  ,k  ],
-                    COLP        [i  ,j  ,0  ], COLP        [i-1,j  ,0  ],
-                    dyis        [i  ,j  ,0  ])
-                UFLX_ip1 = calc_UFLX(
-                    UWIND       [i+1,j  ,k  ],
-                    COLP        [i+1,j  ,0  ], COLP        [i  ,j  ,0  ],
-                    dyis        [i+1,j  ,0  ])
-
-                VFLX_j = calc_VFLX(
-                    VWIND       [i  ,j  ,k  ],
-                    COLP        [i  ,j  ,0  ], COLP        [i  ,j-1,0  ],
-                    dxjs        [i  ,j  ,0  ])
-                VFLX_jp1 = calc_VFLX(
-                    VWIND       [i  ,j+1,k  ],
-                    COLP        [i  ,j+1,0  ], COLP        [i  ,j  ,0  ],
-                    dxjs        [i  ,j+1,0  ])
-
-                UFLX[i  ,j  ,k] = UFLX_i
-                VFLX[i  ,j  ,k] = VFLX_j
-
-                ## MOMENTUM FLUX DIVERGENCE
-                ###############################################################
-                FLXDIV[i  ,j  ,k] = calc_FLXDIV(
-                    UFLX_i           , UFLX_ip1    ,
-                    VFLX_j           , VFLX_jp1    ,
-                    dsigma[0  ,0  ,k], A[i  ,j  ,0])
+                    dyis, dxjs, dsigma, sigma_vb, A, dt, tiles):
+
+
+    for t in prange(tiles.shape[0]):
+        for i in range(tiles[t,0], min(tiles[t,1], nx+nb)):
+            for j in range(tiles[t,2], min(tiles[t,3], ny+nb)):
+                for k in range(wp_int(0),nz):
+                    # MOMENTUM FLUXES
+                    ###########################################################
+                    UFLX_i = calc_UFLX(
+                        UWIND       [i  ,j  ,k  ],
+                        COLP        [i  ,j  ,0  ], COLP        [i-1,j  ,0  ],
+                        dyis        [i  ,j  ,0  ])
+                    UFLX_ip1 = calc_UFLX(
+                        UWIND       [i+1,j  ,k  ],
+                        COLP        [i+1,j  ,0  ], COLP        [i  ,j  ,0  ],
+                        dyis        [i+1,j  ,0  ])
+
+                    VFLX_j = calc_VFLX(
+                        VWIND       [i  ,j  ,k  ],
+                        COLP        [i  ,j  ,0  ], COLP        [i  ,j-1,0  ],
+                        dxjs        [i  ,j  ,0  ])
+                    VFLX_jp1 = calc_VFLX(
+                        VWIND       [i  ,j+1,k  ],
+                        COLP        [i  ,j+1,0  ], COLP        [i  ,j  ,0  ],
+                        dxjs        [i  ,j+1,0  ])
+
+                    UFLX[i  ,j  ,k] = UFLX_i
+                    VFLX[i  ,j  ,k] = VFLX_j
+
+                    ## MOMENTUM FLUX DIVERGENCE
+                    ###########################################################
+                    FLXDIV[i  ,j  ,k] = calc_FLXDIV(
+                        UFLX_i           , UFLX_ip1    ,
+                        VFLX_j           , VFLX_jp1    ,
+                        dsigma[0  ,0  ,k], A[i  ,j  ,0])
 
     ## COLUMN PRESSURE TENDENCY
-    ############################################################################
+    ###########################################################################
     if i_COLP_main_switch:
         dCOLPdt[:,:,0] = - FLXDIV.sum(axis=2)
     else:
         dCOLPdt[:,:,0] = wp(0.)
 
     ### PRESSURE TIME STEP
-    ############################################################################
+    ###########################################################################
     COLP_NEW[:,:,0] = COLP_OLD[:,:,0] + dt * dCOLPdt[:,:,0]
 
     ### VERTICAL WIND
-    ############################################################################
-    for i in prange(nb,nx+nb):
-        for j in range(nb,ny+nb):
-            flxdivsum = FLXDIV[i,j,0]
-            for k in prange(1,nz):
-                WWIND[i,j,k] = ( - flxdivsum / COLP_NEW[i,j,0] - sigma_vb[0,0,k]
-                                 * dCOLPdt[i,j,0] / COLP_NEW[i,j,0] )
-                flxdivsum += FLXDIV[i,j,k]
+    ###########################################################################
+    for t in prange(tiles.shape[0]):
+        for i in range(tiles[t,0], min(tiles[t,1], nx+nb)):
+            for j in range(tiles[t,2], min(tiles[t,3], ny+nb)):
+                flxdivsum = FLXDIV[i,j,0]
+                for k in prange(1,nz):
+                    WWIND[i,j,k] = ( - flxdivsum / COLP_NEW[i,j,0]
+                                     - sigma_vb[0,0,k]
+                                     * dCOLPdt[i,j,0] / COLP_NEW[i,j,0] )
+                    flxdivsum += FLXDIV[i,j,k]
 
 
 
 continuity_cpu = njit(parallel=True)(launch_numba_cpu)
+
+
+def launch_numba_cpu_fused(UFLX, VFLX, FLXDIV,
+                    UWIND, VWIND, WWIND,
+                    COLP, dCOLPdt, COLP_NEW, COLP_OLD,
+                    dyis, dxjs, dsigma, sigma_vb, A, dt, tiles):
+    """
+    Same as launch_numba_cpu but with one pass over the columns.
+    The halos of dCOLPdt and COLP_NEW are not set.
+    """
+
+    for t in prange(tiles.shape[0]):
+        for i in range(tiles[t,0], min(tiles[t,1], nx+nb)):
+            for j in range(tiles[t,2], min(tiles[t,3], ny+nb)):
+                flxdivsum = wp(0.)
+                for k in range(wp_int(0),nz):
+                    # MOMENTUM FLUXES
+                    ###########################################################
+                    UFLX_i = calc_UFLX(
+                        UWIND       [i  ,j  ,k  ],
+                        COLP        [i  ,j  ,0  ], COLP        [i-1,j  ,0  ],
+                        dyis        [i  ,j  ,0  ])
+                    UFLX_ip1 = calc_UFLX(
+                        UWIND       [i+1,j  ,k  ],
+                        COLP        [i+1,j  ,0  ], COLP        [i  ,j  ,0  ],
+                        dyis        [i+1,j  ,0  ])
+
+                    VFLX_j = calc_VFLX(
+                        VWIND       [i  ,j  ,k  ],
+                        COLP        [i  ,j  ,0  ], COLP        [i  ,j-1,0  ],
+                        dxjs        [i  ,j  ,0  ])
+                    VFLX_jp1 = calc_VFLX(
+                        VWIND       [i  ,j+1,k  ],
+                        COLP        [i  ,j+1,0  ], COLP        [i  ,j  ,0  ],
+                        dxjs        [i  ,j+1,0  ])
+
+                    UFLX[i  ,j  ,k] = UFLX_i
+                    VFLX[i  ,j  ,k] = VFLX_j
+
+                    ## MOMENTUM FLUX DIVERGENCE
+                    ###########################################################
+                    FLXDIV[i  ,j  ,k] = calc_FLXDIV(
+                        UFLX_i           , UFLX_ip1    ,
+                        VFLX_j           , VFLX_jp1    ,
+                        dsigma[0  ,0  ,k], A[i  ,j  ,0])
+                    flxdivsum += FLXDIV[i  ,j  ,k]
+
+                ## COLUMN PRESSURE TENDENCY
+                ###############################################################
+                if i_COLP_main_switch:
+                    dCOLPdt[i,j,0] = - flxdivsum
+                else:
+                    dCOLPdt[i,j,0] = wp(0.)
+
+                ### PRESSURE TIME STEP
+                ###############################################################
+                COLP_NEW[i,j,0] = COLP_OLD[i,j,0] + dt * dCOLPdt[i,j,0]
+
+                ### VERTICAL WIND
+                ###############################################################
+                flxdivsum = FLXDIV[i,j,0]
+                for k in range(1,nz):
+                    WWIND[i,j,k] = ( - flxdivsum / COLP_NEW[i,j,0]
+                                     - sigma_vb[0,0,k]
+                                     * dCOLPdt[i,j,0] / COLP_NEW[i,j,0] )
+                    flxdivsum += FLXDIV[i,j,k]
+
+
+
+continuity_fused_cpu = njit(parallel=True)(launch_numba_cpu_fused)
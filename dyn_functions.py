@@ -243,7 +243,7 @@ def interp_WWIND_UVWIND_py(
                     COLP_NEW_dm1     * A_dm1     * WWIND_dm1     +
                     COLP_NEW         * A         * WWIND         )
         # right rigid wall 
-        elif rigid_wall and (p_ind == np):
+        elif rigid_wall and (p_ind == np+nb-1):
             COLPAWWIND_ds_ks = wp(0.25)*( 
                     COLP_NEW_dm1     * A_dm1     * WWIND_dm1     +
                     COLP_NEW         * A         * WWIND         +
@@ -327,7 +327,7 @@ def interp_KMOM_dUVWINDdz_py(
                 PHI_dm1     +
                 PHI         ) / con_g
         # right rigid wall 
-        elif rigid_wall and (p_ind == np):
+        elif rigid_wall and (p_ind == np+nb-1):
             COLPAKMOM_ds_ks = wp(0.25)*( 
                 RHOVB_dm1     * COLP_NEW_dm1     * A_dm1     * KMOM_dm1     +
                 RHOVB         * COLP_NEW         * A         * KMOM         +
@@ -404,7 +404,7 @@ def interp_VAR_ds_py(
             VAR_dm1     +
             VAR         ) / con_g
     # right rigid wall 
-    elif rigid_wall and (p_ind == np):
+    elif rigid_wall and (p_ind == np+nb-1):
         VAR_ds = wp(0.25)*( 
             VAR_dm1     +
             VAR         +
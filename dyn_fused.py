@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+"""
+###############################################################################
+Author:             Christoph Heim
+Date created:       20190715
+Last modified:      20190715
+License:            MIT
+
+Fused CPU kernel for the tendencies of the momentum fluxes (UFLX, VFLX),
+the potential temperature (POTT) and the moisture variables (QV, QC).
+Instead of one parallel loop over the domain per variable
+(dyn_UFLX.py, dyn_VFLX.py, dyn_POTT.py, dyn_moist.py), all tendencies of
+a column are computed in the same pass while the stencil of neighbouring
+columns is still in the cache. The column functions of the separate
+kernels are used such that the results are bitwise identical.
+The continuity equation and the preparation of the advective momentum
+fluxes (dyn_UVFLX_prepare.py) are computed before because the
+tendencies depend on their results in neighbouring columns
+(see also continuity_fused_cpu in dyn_continuity.py).
+Selected with i_fused_tendencies.
+###############################################################################
+"""
+from numba import njit, prange
+
+from main_grid import nx,nxs,ny,nys,nz,nzs,nb
+from dyn_UFLX import UFLX_tendency_column_cpu
+from dyn_VFLX import VFLX_tendency_column_cpu
+from dyn_POTT import POTT_tendency_column_cpu
+from dyn_moist import moist_tendency_column_cpu
+###############################################################################
+
+
+###############################################################################
+### SPECIALIZE FOR CPU
+###############################################################################
+def launch_numba_cpu(dUFLXdt, dVFLXdt, dPOTTdt, dQVdt, dQCdt,
+                    dUFLXdt_TURB, dVFLXdt_TURB, dPOTTdt_TURB, dQVdt_TURB,
+                    UFLX, VFLX, UWIND, VWIND, WWIND,
+                    BFLX, CFLX, DFLX, EFLX,
+                    RFLX, SFLX, TFLX, QFLX,
+                    PHI, PHIVB, COLP, COLP_NEW, POTT, POTTVB, QV, QC,
+                    PVTF, PVTFVB, WWIND_UWIND, WWIND_VWIND,
+                    KMOM_dUWINDdz, KMOM_dVWINDdz,
+                    KHEAT, RHO, RHOVB,
+                    SMOMXFLX, SMOMYFLX, SSHFLX, SLHFLX, dPOTTdt_RAD,
+
+                    corf_is, corf, lat_is_rad, lat_rad,
+                    dlon_rad, dlat_rad, dyis, dxjs, A,
+                    dsigma, sigma_vb,
+                    UVFLX_dif_coef, POTT_dif_coef, moist_dif_coef, tiles):
+
+    for t in prange(tiles.shape[0]):
+        for i in range(tiles[t,0], min(tiles[t,1], nxs+nb)):
+            for j in range(tiles[t,2], min(tiles[t,3], nys+nb)):
+
+                # UFLX
+                if j < ny+nb:
+                    UFLX_tendency_column_cpu(
+                            dUFLXdt, UFLX, UWIND, VWIND,
+                            BFLX, CFLX, DFLX, EFLX,
+                            PHI, PHIVB, COLP, POTT,
+                            PVTF, PVTFVB, WWIND_UWIND,
+
+                            KMOM_dUWINDdz, RHO,
+                            dUFLXdt_TURB, SMOMXFLX,
+
+                            corf_is, lat_is_rad,
+                            dlon_rad, dlat_rad,
+                            dyis,
+                            dsigma, sigma_vb,
+                            UVFLX_dif_coef, i, j)
+
+                # VFLX
+                if i < nx+nb:
+                    VFLX_tendency_column_cpu(
+                            dVFLXdt, VFLX, UWIND, VWIND,
+                            RFLX, SFLX, TFLX, QFLX,
+                            PHI, PHIVB, COLP, POTT,
+                            PVTF, PVTFVB, WWIND_VWIND,
+
+                            KMOM_dVWINDdz, RHO,
+                            dVFLXdt_TURB, SMOMYFLX,
+
+                            corf,        lat_rad,
+                            dlon_rad,    dlat_rad,
+                            dxjs,
+                            dsigma,      sigma_vb,
+                            UVFLX_dif_coef, i, j)
+
+                if i < nx+nb and j < ny+nb:
+                    # POTT
+                    POTT_tendency_column_cpu(A, dsigma, POTT_dif_coef,
+                            dPOTTdt, POTT, UFLX, VFLX, COLP,
+                            POTTVB, WWIND, COLP_NEW,
+                            PHI, PHIVB, KHEAT, RHO, RHOVB, SSHFLX,
+                            dPOTTdt_TURB, dPOTTdt_RAD, i, j)
+
+                    # QV and QC
+                    moist_tendency_column_cpu(A, dsigma, moist_dif_coef,
+                            dQVdt, dQVdt_TURB, QV, dQCdt, QC, UFLX, VFLX, COLP,
+                            WWIND, COLP_NEW,
+                            PHI, PHIVB, KHEAT, RHO, RHOVB, SLHFLX, i, j)
+
+
+tendencies_fused_cpu = njit(parallel=True)(launch_numba_cpu)
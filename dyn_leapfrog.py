@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+"""
+###############################################################################
+Author:             Christoph Heim
+Date created:       20190710
+Last modified:      20190715
+License:            MIT
+
+Perform a leapfrog time integration with Robert-Asselin-Williams (RAW)
+filter (Williams 2009, Mon. Wea. Rev. 137, 2538-2546).
+In contrast to the matsuno scheme, only one evaluation of the
+tendencies and of the primary diagnostics is required per time step.
+The _OLD fields contain the (filtered) time level n-1 throughout the
+simulation. The first time step of a simulation is an euler forward step
+(_OLD fields are not yet defined), as well as every time step with changed
+length (adaptive time step).
+###############################################################################
+"""
+from namelist import i_comp_mode
+from io_read_namelist import CPU, GPU
+from dyn_tendencies import compute_tendencies
+from dyn_org_discretizations import (PrognosticsFactory, DiagnosticsFactory)
+###############################################################################
+if i_comp_mode == 1:
+    Prognostics = PrognosticsFactory(target=CPU)
+    Diagnostics = DiagnosticsFactory(target=CPU)
+elif i_comp_mode == 2:
+    Prognostics = PrognosticsFactory(target=GPU)
+    Diagnostics = DiagnosticsFactory(target=GPU)
+
+def step_leapfrog(GR, F):
+
+    # first time step of simulation (ts is incremented before the step)
+    # or changed time step (n-1 and n+1 have to be equidistant):
+    # euler forward step
+    start = (GR.ts == 1) or GR.dt_control.dt_changed
+
+    # UPDATE TIME LEVELS
+    ##############################
+    ##############################
+    if start:
+        GR.timer.start('step')
+        F.new_time_level()
+        GR.timer.stop('step')
+    ##############################
+    ##############################
+
+    # COMPUTE TENDENCIES
+    ##############################
+    ##############################
+    if start:
+        compute_tendencies(GR, F)
+    else:
+        # COLP_NEW = COLP_OLD + 2*dt*dCOLPdt
+        compute_tendencies(GR, F, dt=2*GR.dt)
+    ##############################
+    ##############################
+
+    # PROGNOSE NEXT TIME LEVEL
+    ##############################
+    ##############################
+    GR.timer.start('step')
+    if start:
+        F.move_time_level(['COLP'], ['COLP_NEW'])
+        F.detach_time_level(F.field_groups[F.PROG_FIELDS])
+        F.plan(GR, Prognostics.euler_forward, Prognostics.target)()
+    else:
+        F.plan(GR, Prognostics.leapfrog, Prognostics.target)()
+    GR.timer.stop('step')
+    ##############################
+    ##############################
+
+    # DIAGNOSE VARIABLES
+    ##############################
+    ##############################
+    GR.timer.start('diag')
+    F.plan(GR, Diagnostics.primary_diag, Diagnostics.target)()
+    GR.timer.stop('diag')
+    ##############################
+    ##############################
+
@@ -4,19 +4,22 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20181001
-Last modified:      20190604
+Last modified:      20190715
 License:            MIT
 
 Perform a matsuno time integration.
+The time levels are advanced without copying (see main_fields.py):
+_OLD shares the buffer of the current fields until the first euler
+forward step writes the estimate to spare buffers.
+With i_semi_implicit, both stages are corrected for the implicit
+treatment of the external gravity wave mode (see dyn_semi_implicit.py).
 ###############################################################################
 """
-from namelist import i_comp_mode, i_moist_main_switch
-from io_read_namelist import CPU, GPU, gpu_enable
-from main_grid import tpb, bpg
+from namelist import i_comp_mode, i_semi_implicit
+from io_read_namelist import CPU, GPU
 from dyn_tendencies import compute_tendencies
 from dyn_org_discretizations import (PrognosticsFactory, DiagnosticsFactory) 
-if gpu_enable:
-    from misc_gpu_functions import set_equal
+from dyn_semi_implicit import SemiImplicit
 ###############################################################################
 if i_comp_mode == 1:
     Prognostics = PrognosticsFactory(target=CPU)
@@ -24,6 +27,8 @@ if i_comp_mode == 1:
 elif i_comp_mode == 2:
     Prognostics = PrognosticsFactory(target=GPU)
     Diagnostics = DiagnosticsFactory(target=GPU)
+if i_semi_implicit:
+    SI = SemiImplicit(target=Prognostics.target)
 
 def step_matsuno(GR, F):
 
@@ -31,22 +36,7 @@ def step_matsuno(GR, F):
     ##############################
     ##############################
     GR.timer.start('step')
-    if i_comp_mode == 1:
-        F.host['COLP_OLD'][:]  = F.host['COLP'][:]
-        F.host['UWIND_OLD'][:] = F.host['UWIND'][:]
-        F.host['VWIND_OLD'][:] = F.host['VWIND'][:]
-        F.host['POTT_OLD'][:]  = F.host['POTT'][:]
-        if i_moist_main_switch:
-            F.host['QV_OLD'][:]    = F.host['QV'][:]
-            F.host['QC_OLD'][:]    = F.host['QC'][:]
-    elif i_comp_mode == 2:
-        set_equal[bpg, tpb](F.device['COLP_OLD'],     F.device['COLP'])
-        set_equal[bpg, tpb](F.device['UWIND_OLD'],    F.device['UWIND'])
-        set_equal[bpg, tpb](F.device['VWIND_OLD'],    F.device['VWIND'])
-        set_equal[bpg, tpb](F.device['POTT_OLD'],     F.device['POTT'])
-        if i_moist_main_switch:
-            set_equal[bpg, tpb](F.device['QV_OLD'],       F.device['QV'])
-            set_equal[bpg, tpb](F.device['QC_OLD'],       F.device['QC'])
+    F.new_time_level()
     GR.timer.stop('step')
     ##############################
     ##############################
@@ -60,11 +50,12 @@ def step_matsuno(GR, F):
     # COMPUTE TENDENCIES
     ##############################
     ##############################
+    if i_semi_implicit:
+        GR.timer.start('semi_impl')
+        F.plan(GR, SI.store_state, SI.target)()
+        GR.timer.stop('semi_impl')
     compute_tendencies(GR, F)
-    if i_comp_mode == 1:
-        F.host['COLP'][:]  = F.host['COLP_NEW'][:]
-    elif i_comp_mode == 2:
-        set_equal[bpg, tpb](F.device['COLP'],     F.device['COLP_NEW'])
+    F.move_time_level(['COLP'], ['COLP_NEW'])
     ##############################
     ##############################
 
@@ -72,10 +63,13 @@ def step_matsuno(GR, F):
     ##############################
     ##############################
     GR.timer.start('step')
-    Prognostics.euler_forward(GR, GR.GRF[Prognostics.target],
-                        **F.get(Prognostics.fields_prognostic,
-                            target=Prognostics.target))
+    F.detach_time_level(F.field_groups[F.PROG_FIELDS])
+    F.plan(GR, Prognostics.euler_forward, Prognostics.target)()
     GR.timer.stop('step')
+    if i_semi_implicit:
+        GR.timer.start('semi_impl')
+        F.plan(GR, SI.correct, SI.target)()
+        GR.timer.stop('semi_impl')
     ##############################
     ##############################
 
@@ -83,9 +77,7 @@ def step_matsuno(GR, F):
     ##############################
     ##############################
     GR.timer.start('diag')
-    Diagnostics.primary_diag(GR.GRF[Diagnostics.target],
-                        **F.get(Diagnostics.fields_primary_diag,
-                            target=Diagnostics.target))
+    F.plan(GR, Diagnostics.primary_diag, Diagnostics.target)()
     GR.timer.stop('diag')
     ##############################
     ##############################
@@ -99,11 +91,12 @@ def step_matsuno(GR, F):
     # COMPUTE TENDENCIES
     ##############################
     ##############################
+    if i_semi_implicit:
+        GR.timer.start('semi_impl')
+        F.plan(GR, SI.store_state, SI.target)()
+        GR.timer.stop('semi_impl')
     compute_tendencies(GR, F)
-    if i_comp_mode == 1:
-        F.host['COLP'][:]  = F.host['COLP_NEW'][:]
-    elif i_comp_mode == 2:
-        set_equal[bpg, tpb](F.device['COLP'],     F.device['COLP_NEW'])
+    F.move_time_level(['COLP'], ['COLP_NEW'])
     ##############################
     ##############################
 
@@ -111,10 +104,12 @@ def step_matsuno(GR, F):
     ##############################
     ##############################
     GR.timer.start('step')
-    Prognostics.euler_forward(GR, GR.GRF[Prognostics.target],
-                        **F.get(Prognostics.fields_prognostic,
-                            target=Prognostics.target))
+    F.plan(GR, Prognostics.euler_forward, Prognostics.target)()
     GR.timer.stop('step')
+    if i_semi_implicit:
+        GR.timer.start('semi_impl')
+        F.plan(GR, SI.correct, SI.target)()
+        GR.timer.stop('semi_impl')
     ##############################
     ##############################
 
@@ -122,9 +117,7 @@ def step_matsuno(GR, F):
     ##############################
     ##############################
     GR.timer.start('diag')
-    Diagnostics.primary_diag(GR.GRF[Diagnostics.target],
-                        **F.get(Diagnostics.fields_primary_diag,
-                            target=Diagnostics.target))
+    F.plan(GR, Diagnostics.primary_diag, Diagnostics.target)()
     GR.timer.stop('diag')
     ##############################
     ##############################
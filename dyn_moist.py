@@ -4,7 +4,7 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20190609
-Last modified:      20190701
+Last modified:      20190715
 License:            MIT
 
 Computation of moisture variables (QV, QC) tendencies
@@ -15,6 +15,7 @@ Chapter 7.3, page 212
 
 HISTORY
 20190609: CH  First implementation.
+20190715: CH  Column function for the fused CPU kernel (dyn_fused.py)
 ###############################################################################
 """
 import numpy as np
@@ -198,47 +199,58 @@ num_dif         = njit(num_dif_pw_py)
 turb_flux_tendency = njit(turb_flux_tendency_py)
 add_up_tendencies = njit(add_up_tendencies_py)
 
-def launch_numba_cpu(A, dsigma, moist_dif_coef,
+def launch_numba_cpu_column(A, dsigma, moist_dif_coef,
                     dQVdt, dQVdt_TURB, QV, dQCdt, QC, UFLX, VFLX, COLP,
                     WWIND, COLP_NEW,
-                    PHI, PHIVB, KHEAT, RHO, RHOVB, SLHFLX):
-
-    for i in prange(nb,nx+nb):
-        for j in range(nb,ny+nb):
-            for k in range(wp_int(0),nz):
-                dQVdt[i  ,j  ,k], dQVdt_TURB[i  ,j  ,k], dQCdt[i  ,j  ,k] = \
-                    add_up_tendencies(
-                        QV          [i  ,j  ,k  ],
-                        QV          [i-1,j  ,k  ], QV       [i+1,j  ,k  ],
-                        QV          [i  ,j-1,k  ], QV       [i  ,j+1,k  ],
-                        QV          [i  ,j  ,k-1], QV       [i  ,j  ,k+1],
-                        QC          [i  ,j  ,k  ],
-                        QC          [i-1,j  ,k  ], QC       [i+1,j  ,k  ],
-                        QC          [i  ,j-1,k  ], QC       [i  ,j+1,k  ],
-                        QC          [i  ,j  ,k-1], QC       [i  ,j  ,k+1],
-                        UFLX        [i  ,j  ,k  ], UFLX     [i+1,j  ,k  ],
-                        VFLX        [i  ,j  ,k  ], VFLX     [i  ,j+1,k  ],
-                        COLP        [i  ,j  ,0  ],
-                        COLP        [i-1,j  ,0  ], COLP     [i+1,j  ,0  ],
-                        COLP        [i  ,j-1,0  ], COLP     [i  ,j+1,0  ],
-                        WWIND       [i  ,j  ,k  ], WWIND    [i  ,j  ,k+1],
-                        COLP_NEW    [i  ,j  ,0  ],
-
-                        PHI         [i  ,j  ,k  ], PHI      [i  ,j  ,k+1],
-                        PHI         [i  ,j  ,k-1], PHIVB    [i  ,j  ,k  ],
-                        PHIVB       [i  ,j  ,k+1], 
-                        KHEAT       [i  ,j  ,k  ], KHEAT    [i  ,j  ,k+1],
-                        RHO         [i  ,j  ,k  ], RHOVB    [i  ,j  ,k  ],
-                        RHOVB       [i  ,j  ,k+1], SLHFLX   [i  ,j  ,0  ],
-
-                        A           [i  ,j  ,0  ],
-                        dsigma      [0  ,0  ,k  ], moist_dif_coef[0  ,0  ,k],
-                        k)
-
-
-
+                    PHI, PHIVB, KHEAT, RHO, RHOVB, SLHFLX, i, j):
+    for k in range(wp_int(0),nz):
+        # level below (clipped at the surface where k+1 is outside of
+        # fields with nz levels and the value is not used)
+        kp1 = min(k+1, nz-1)
+        dQVdt[i  ,j  ,k], dQVdt_TURB[i  ,j  ,k], dQCdt[i  ,j  ,k] = \
+            add_up_tendencies(
+                QV          [i  ,j  ,k  ],
+                QV          [i-1,j  ,k  ], QV       [i+1,j  ,k  ],
+                QV          [i  ,j-1,k  ], QV       [i  ,j+1,k  ],
+                QV          [i  ,j  ,k-1], QV       [i  ,j  ,kp1],
+                QC          [i  ,j  ,k  ],
+                QC          [i-1,j  ,k  ], QC       [i+1,j  ,k  ],
+                QC          [i  ,j-1,k  ], QC       [i  ,j+1,k  ],
+                QC          [i  ,j  ,k-1], QC       [i  ,j  ,kp1],
+                UFLX        [i  ,j  ,k  ], UFLX     [i+1,j  ,k  ],
+                VFLX        [i  ,j  ,k  ], VFLX     [i  ,j+1,k  ],
+                COLP        [i  ,j  ,0  ],
+                COLP        [i-1,j  ,0  ], COLP     [i+1,j  ,0  ],
+                COLP        [i  ,j-1,0  ], COLP     [i  ,j+1,0  ],
+                WWIND       [i  ,j  ,k  ], WWIND    [i  ,j  ,k+1],
+                COLP_NEW    [i  ,j  ,0  ],
+
+                PHI         [i  ,j  ,k  ], PHI      [i  ,j  ,kp1],
+                PHI         [i  ,j  ,k-1], PHIVB    [i  ,j  ,k  ],
+                PHIVB       [i  ,j  ,k+1], 
+                KHEAT       [i  ,j  ,k  ], KHEAT    [i  ,j  ,k+1],
+                RHO         [i  ,j  ,k  ], RHOVB    [i  ,j  ,k  ],
+                RHOVB       [i  ,j  ,k+1], SLHFLX   [i  ,j  ,0  ],
+
+                A           [i  ,j  ,0  ],
+                dsigma      [0  ,0  ,k  ], moist_dif_coef[0  ,0  ,k],
+                k)
+
+moist_tendency_column_cpu = njit(launch_numba_cpu_column, inline='always')
 
 
+def launch_numba_cpu(A, dsigma, moist_dif_coef,
+                    dQVdt, dQVdt_TURB, QV, dQCdt, QC, UFLX, VFLX, COLP,
+                    WWIND, COLP_NEW,
+                    PHI, PHIVB, KHEAT, RHO, RHOVB, SLHFLX, tiles):
+
+    for t in prange(tiles.shape[0]):
+        for i in range(tiles[t,0], min(tiles[t,1], nx+nb)):
+            for j in range(tiles[t,2], min(tiles[t,3], ny+nb)):
+                moist_tendency_column_cpu(A, dsigma, moist_dif_coef,
+                        dQVdt, dQVdt_TURB, QV, dQCdt, QC, UFLX, VFLX, COLP,
+                        WWIND, COLP_NEW,
+                        PHI, PHIVB, KHEAT, RHO, RHOVB, SLHFLX, i, j)
 
 moist_tendency_cpu = njit(parallel=True)(launch_numba_cpu)
 
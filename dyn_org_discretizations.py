@@ -4,7 +4,7 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20190509
-Last modified:      20190628
+Last modified:      20190715
 License:            MIT
 
 SPATIAL DISCRETIZATION
@@ -33,29 +33,47 @@ Differentiate between computation targets GPU and CPU.
 HISTORY
 - 20190604  : Created (CH) 
 20190609    : Added moisture variables QV and QC (CH)
+20190710    : Added leapfrog time step and dt argument of continuity (CH)
+20190711    : Added Runge-Kutta tendency accumulation and dt argument
+              of euler_forward (CH)
+20190714    : Added split-explicit sub steps of the pressure gradient
+              and the continuity equation (CH)
+20190715    : Added fused CPU tendency kernels (CH)
+20190715    : CPU tendency kernels loop over tiles (misc_tiling.py) (CH)
+20190715    : Boundary exchange of all fields of a kernel in one call on
+              the CPU. KMOM and surface momentum fluxes are exchanged
+              where they are computed on the CPU (CH)
 ###############################################################################
 """
 import numpy as np
 from numba import cuda
 
 from namelist import (i_UVFLX_hor_adv, i_UVFLX_vert_adv,
-                      i_UVFLX_vert_turb, i_moist_main_switch)
-from io_read_namelist import CPU, GPU, gpu_enable
+                      i_UVFLX_vert_turb, i_moist_main_switch,
+                      i_fused_tendencies)
+from io_read_namelist import (CPU, GPU, gpu_enable, wp,
+                              RAW_nu, RAW_alpha)
 from main_grid import (nx,nxs,ny,nys,nz,nzs,nb,
-                 tpb, tpb_ks, bpg, tpb_sc, bpg_sc)
+                 tpb, tpb_ks, bpg, tpb_sc, bpg_sc, tpb_2D)
 
-from misc_boundaries import exchange_BC_cpu
+from misc_boundaries import exchange_BC_cpu, exchange_BC_fields_cpu
 from misc_utilities import function_input_fields
-from dyn_continuity import continuity_cpu
+from dyn_continuity import continuity_cpu, continuity_fused_cpu
 from dyn_UVFLX_prepare import UVFLX_prep_adv_cpu
 from dyn_UFLX import UFLX_tendency_cpu
 from dyn_VFLX import VFLX_tendency_cpu
 from dyn_POTT import POTT_tendency_cpu
 from dyn_moist import moist_tendency_cpu
+from dyn_fused import tendencies_fused_cpu
 
 from dyn_diagnostics import (diag_PVTF_cpu, diag_PHI_cpu,
                              diag_POTTVB_cpu, diag_secondary_cpu)
-from dyn_timestep import make_timestep_cpu
+from dyn_timestep import (make_timestep_cpu, make_leapfrog_step_cpu,
+                          filter_COLP_cpu, RK_accumulate_cpu,
+                          make_COLP_timestep_cpu)
+from dyn_split_explicit import (pre_grad_tendency_cpu,
+                          make_fast_substep_cpu, mean_fluxes_cpu,
+                          set_mean_fluxes_cpu, make_scalar_timestep_cpu)
 if gpu_enable:
     from misc_boundaries import exchange_BC_gpu
     from dyn_continuity import continuity_gpu
@@ -67,7 +85,12 @@ if gpu_enable:
 
     from dyn_diagnostics import (diag_PVTF_gpu, diag_PHI_gpu,
                                  diag_POTTVB_gpu, diag_secondary_gpu)
-    from dyn_timestep import make_timestep_gpu
+    from dyn_timestep import (make_timestep_gpu, make_leapfrog_step_gpu,
+                              filter_COLP_gpu, RK_accumulate_gpu,
+                              make_COLP_timestep_gpu)
+
+# tendency weights of the classical Runge-Kutta 4 stages
+RK4_weights = [1./6., 1./3., 1./3., 1./6.]
 ###############################################################################
 
 
@@ -84,13 +107,20 @@ class TendencyFactory:
         self.fields_momentum = function_input_fields(self.momentum)
         self.fields_temperature = function_input_fields(self.temperature)
         self.fields_moisture = function_input_fields(self.moisture)
+        self.fields_pre_grad = function_input_fields(self.pre_grad)
+        self.fields_remove_pre_grad = function_input_fields(
+                                            self.remove_pre_grad)
+        self.fields_fused = function_input_fields(self.fused)
 
 
     def continuity(self, GR, GRF, UFLX, VFLX, FLXDIV,
                     UWIND, VWIND, WWIND,
-                    COLP, dCOLPdt, COLP_NEW, COLP_OLD):
+                    COLP, dCOLPdt, COLP_NEW, COLP_OLD, dt=None):
         """
+        Time step dt for COLP_OLD -> COLP_NEW (default GR.dt).
         """
+        if dt is None:
+            dt = GR.dt
 
         if self.target == GPU:
             continuity_gpu[bpg_sc, tpb_sc](UFLX, VFLX, FLXDIV,
@@ -98,23 +128,24 @@ class TendencyFactory:
                     COLP, dCOLPdt, COLP_NEW, COLP_OLD,
                     GRF['dyis'], GRF['dxjs'],
                     GRF['dsigma'], GRF['sigma_vb'],
-                    GRF['A'], GR.dt)
+                    GRF['A'], dt)
             exchange_BC_gpu[bpg, tpb](UFLX)
             exchange_BC_gpu[bpg, tpb](VFLX)
             exchange_BC_gpu[bpg, tpb](WWIND)
             exchange_BC_gpu[bpg, tpb](COLP_NEW)
 
         elif self.target == CPU:
-            continuity_cpu(UFLX, VFLX, FLXDIV,
+            if i_fused_tendencies:
+                continuity = continuity_fused_cpu
+            else:
+                continuity = continuity_cpu
+            continuity(UFLX, VFLX, FLXDIV,
                     UWIND, VWIND, WWIND,
                     COLP, dCOLPdt, COLP_NEW, COLP_OLD,
                     GRF['dyis'], GRF['dxjs'],
                     GRF['dsigma'], GRF['sigma_vb'],
-                    GRF['A'], GR.dt)
-            exchange_BC_cpu(UFLX)
-            exchange_BC_cpu(VFLX)
-            exchange_BC_cpu(WWIND)
-            exchange_BC_cpu(COLP_NEW)
+                    GRF['A'], dt, GRF['tiles'])
+            exchange_BC_fields_cpu((UFLX, VFLX, WWIND, COLP_NEW))
 
 
 
@@ -194,27 +225,15 @@ class TendencyFactory:
 
         elif self.target == CPU:
 
-            #TODO why is this necessary?
-            exchange_BC_cpu(KMOM)
-
-            # PREPARE ADVECTIVE FLUXES
-            if i_UVFLX_hor_adv or i_UVFLX_vert_adv or i_UVFLX_vert_turb:
-                UVFLX_prep_adv_cpu(
-                            WWIND_UWIND, WWIND_VWIND,
-                            UWIND, VWIND, WWIND,
-                            UFLX, VFLX,
-                            CFLX, QFLX, DFLX, EFLX,
-                            SFLX, TFLX, BFLX, RFLX,
-                            COLP, COLP_NEW,
-                            KMOM_dUWINDdz, KMOM_dVWINDdz,
-                            KMOM, PHI, RHOVB,
-                            GRF['A'], GRF['dsigma'])
-
-            exchange_BC_cpu(KMOM_dUWINDdz)
-            exchange_BC_cpu(KMOM_dVWINDdz)
-            # TODO: how to remove this?
-            exchange_BC_cpu(SMOMXFLX)
-            exchange_BC_cpu(SMOMYFLX)
+            self._prepare_momentum_cpu(GRF,
+                        UWIND, VWIND, WWIND,
+                        UFLX, VFLX,
+                        CFLX, QFLX, DFLX, EFLX,
+                        SFLX, TFLX, BFLX, RFLX,
+                        PHI, COLP, COLP_NEW,
+                        WWIND_UWIND, WWIND_VWIND,
+                        KMOM_dUWINDdz, KMOM_dVWINDdz,
+                        KMOM, RHOVB)
 
             # UFLX
             UFLX_tendency_cpu(
@@ -230,7 +249,7 @@ class TendencyFactory:
                         GRF['dlon_rad'], GRF['dlat_rad'],
                         GRF['dyis'],
                         GRF['dsigma'], GRF['sigma_vb'],
-                        GRF['UVFLX_dif_coef'])
+                        GRF['UVFLX_dif_coef'], GRF['tiles'])
 
             # VFLX
             VFLX_tendency_cpu(
@@ -246,7 +265,95 @@ class TendencyFactory:
                         GRF['dlon_rad'],    GRF['dlat_rad'],
                         GRF['dxjs'], 
                         GRF['dsigma'],      GRF['sigma_vb'],
-                        GRF['UVFLX_dif_coef'])
+                        GRF['UVFLX_dif_coef'], GRF['tiles'])
+
+
+
+    def _prepare_momentum_cpu(self, GRF,
+                        UWIND, VWIND, WWIND,
+                        UFLX, VFLX,
+                        CFLX, QFLX, DFLX, EFLX,
+                        SFLX, TFLX, BFLX, RFLX,
+                        PHI, COLP, COLP_NEW,
+                        WWIND_UWIND, WWIND_VWIND,
+                        KMOM_dUWINDdz, KMOM_dVWINDdz,
+                        KMOM, RHOVB):
+        """
+        Advective and turbulent momentum fluxes needed by the
+        UFLX and VFLX tendencies.
+        On the CPU, the boundaries of KMOM and SMOMXFLX/SMOMYFLX are
+        exchanged where they are computed (turb_main.py, srfc_main.py),
+        the ones of KMOM_dUWINDdz and KMOM_dVWINDdz are never read.
+        """
+        # PREPARE ADVECTIVE FLUXES
+        if i_UVFLX_hor_adv or i_UVFLX_vert_adv or i_UVFLX_vert_turb:
+            UVFLX_prep_adv_cpu(
+                        WWIND_UWIND, WWIND_VWIND,
+                        UWIND, VWIND, WWIND,
+                        UFLX, VFLX,
+                        CFLX, QFLX, DFLX, EFLX,
+                        SFLX, TFLX, BFLX, RFLX,
+                        COLP, COLP_NEW,
+                        KMOM_dUWINDdz, KMOM_dVWINDdz,
+                        KMOM, PHI, RHOVB,
+                        GRF['A'], GRF['dsigma'], GRF['tiles'])
+
+
+
+    def fused(self, GRF,
+              dUFLXdt, dVFLXdt, dPOTTdt, dQVdt, dQCdt,
+              UWIND, VWIND, WWIND,
+              UFLX, VFLX,
+              CFLX, QFLX, DFLX, EFLX,
+              SFLX, TFLX, BFLX, RFLX,
+              PHI, PHIVB, COLP, COLP_NEW, POTT, POTTVB, QV, QC,
+              PVTF, PVTFVB,
+              WWIND_UWIND, WWIND_VWIND,
+
+              KMOM_dUWINDdz, KMOM_dVWINDdz,
+              KMOM, KHEAT, RHOVB, RHO,
+
+              dUFLXdt_TURB, dVFLXdt_TURB, dPOTTdt_TURB, dQVdt_TURB,
+              SMOMXFLX, SMOMYFLX, SSHFLX, SLHFLX, dPOTTdt_RAD):
+        """
+        Same as momentum, temperature and moisture but with one pass
+        over the columns for all tendencies (dyn_fused.py).
+        """
+        if self.target == GPU:
+            raise NotImplementedError('Fused tendencies not yet '+
+                                      'implemented for GPU.')
+
+        elif self.target == CPU:
+
+            self._prepare_momentum_cpu(GRF,
+                        UWIND, VWIND, WWIND,
+                        UFLX, VFLX,
+                        CFLX, QFLX, DFLX, EFLX,
+                        SFLX, TFLX, BFLX, RFLX,
+                        PHI, COLP, COLP_NEW,
+                        WWIND_UWIND, WWIND_VWIND,
+                        KMOM_dUWINDdz, KMOM_dVWINDdz,
+                        KMOM, RHOVB)
+
+            tendencies_fused_cpu(
+                        dUFLXdt, dVFLXdt, dPOTTdt, dQVdt, dQCdt,
+                        dUFLXdt_TURB, dVFLXdt_TURB, dPOTTdt_TURB, dQVdt_TURB,
+                        UFLX, VFLX, UWIND, VWIND, WWIND,
+                        BFLX, CFLX, DFLX, EFLX,
+                        RFLX, SFLX, TFLX, QFLX,
+                        PHI, PHIVB, COLP, COLP_NEW, POTT, POTTVB, QV, QC,
+                        PVTF, PVTFVB, WWIND_UWIND, WWIND_VWIND,
+                        KMOM_dUWINDdz, KMOM_dVWINDdz,
+                        KHEAT, RHO, RHOVB,
+                        SMOMXFLX, SMOMYFLX, SSHFLX, SLHFLX, dPOTTdt_RAD,
+
+                        GRF['corf_is'], GRF['corf'],
+                        GRF['lat_is_rad'], GRF['lat_rad'],
+                        GRF['dlon_rad'], GRF['dlat_rad'],
+                        GRF['dyis'], GRF['dxjs'], GRF['A'],
+                        GRF['dsigma'], GRF['sigma_vb'],
+                        GRF['UVFLX_dif_coef'], GRF['POTT_dif_coef'],
+                        GRF['moist_dif_coef'], GRF['tiles'])
 
 
 
@@ -270,7 +377,7 @@ class TendencyFactory:
                     dPOTTdt, POTT, UFLX, VFLX, COLP,
                     POTTVB, WWIND, COLP_NEW,
                     PHI, PHIVB, KHEAT, RHO, RHOVB, SSHFLX,
-                    dPOTTdt_TURB, dPOTTdt_RAD)
+                    dPOTTdt_TURB, dPOTTdt_RAD, GRF['tiles'])
 
 
 
@@ -291,7 +398,43 @@ class TendencyFactory:
                     GRF['moist_dif_coef'],
                     dQVdt, dQVdt_TURB, QV, dQCdt, QC, UFLX, VFLX, COLP,
                     WWIND, COLP_NEW,
-                    PHI, PHIVB, KHEAT, RHO, RHOVB, SLHFLX)
+                    PHI, PHIVB, KHEAT, RHO, RHOVB, SLHFLX, GRF['tiles'])
+
+
+
+    def pre_grad(self, GRF, dUFLXdt_SUB, dVFLXdt_SUB,
+                 PHI, COLP, POTT, PVTF, PVTFVB):
+        """
+        Pressure gradient tendency of UFLX and VFLX (split-explicit
+        sub step).
+        """
+        self._pre_grad_tendency(GRF, dUFLXdt_SUB, dVFLXdt_SUB,
+                                dUFLXdt_SUB, dVFLXdt_SUB,
+                                PHI, COLP, POTT, PVTF, PVTFVB, 0)
+
+
+    def remove_pre_grad(self, GRF, dUFLXdt, dVFLXdt,
+                        PHI, COLP, POTT, PVTF, PVTFVB):
+        """
+        Subtract the pressure gradient from the momentum tendencies
+        computed with the same fields, leaving the slow tendencies
+        of the split-explicit scheme.
+        """
+        self._pre_grad_tendency(GRF, dUFLXdt, dVFLXdt, dUFLXdt, dVFLXdt,
+                                PHI, COLP, POTT, PVTF, PVTFVB, 1)
+
+
+    def _pre_grad_tendency(self, GRF, dUFLXdt_SUB, dVFLXdt_SUB,
+                           dUFLXdt, dVFLXdt,
+                           PHI, COLP, POTT, PVTF, PVTFVB, remove):
+        if self.target == GPU:
+            raise NotImplementedError('Split-explicit time stepping not '+
+                                      'yet implemented for GPU.')
+        elif self.target == CPU:
+            pre_grad_tendency_cpu(dUFLXdt_SUB, dVFLXdt_SUB,
+                    dUFLXdt, dVFLXdt, PHI, COLP, POTT, PVTF, PVTFVB,
+                    GRF['dyis'], GRF['dxjs'],
+                    GRF['dsigma'], GRF['sigma_vb'], remove)
 
 
 
@@ -354,14 +497,26 @@ class PrognosticsFactory:
         """
         self.target = target
         self.fields_prognostic = function_input_fields(self.euler_forward)
+        self.fields_leapfrog = function_input_fields(self.leapfrog)
+        self.fields_RK_accumulate = function_input_fields(self.RK_accumulate)
+        self.fields_fast_substep = function_input_fields(self.fast_substep)
+        self.fields_mean_fluxes = function_input_fields(self.mean_fluxes)
+        self.fields_set_mean_fluxes = function_input_fields(
+                                                self.set_mean_fluxes)
+        self.fields_scalars = function_input_fields(
+                                                self.euler_forward_scalars)
 
 
     def euler_forward(self, GR, GRF, UWIND_OLD, UWIND, VWIND_OLD,
                     VWIND, COLP_OLD, COLP, POTT_OLD, POTT,
                     QV, QV_OLD, QC, QC_OLD,
-                    dUFLXdt, dVFLXdt, dPOTTdt, dQVdt, dQCdt):
+                    dUFLXdt, dVFLXdt, dPOTTdt, dQVdt, dQCdt, dt=None):
         """
+        Euler forward step from _OLD over dt (default GR.dt).
         """
+        if dt is None:
+            dt = GR.dt
+
         if self.target == GPU:
 
             make_timestep_gpu[bpg, tpb](COLP, COLP_OLD,
@@ -369,7 +524,7 @@ class PrognosticsFactory:
                       VWIND, VWIND_OLD, dVFLXdt,
                       POTT, POTT_OLD, dPOTTdt,
                       QV, QV_OLD, dQVdt,
-                      QC, QC_OLD, dQCdt, GRF['A'], GR.dt)
+                      QC, QC_OLD, dQCdt, GRF['A'], dt)
             exchange_BC_gpu[bpg, tpb](POTT)
             exchange_BC_gpu[bpg, tpb](VWIND)
             exchange_BC_gpu[bpg, tpb](UWIND)
@@ -384,11 +539,173 @@ class PrognosticsFactory:
                       VWIND, VWIND_OLD, dVFLXdt,
                       POTT, POTT_OLD, dPOTTdt,
                       QV, QV_OLD, dQVdt,
-                      QC, QC_OLD, dQCdt, GRF['A'], GR.dt)
-            exchange_BC_cpu(POTT)
-            exchange_BC_cpu(VWIND)
-            exchange_BC_cpu(UWIND)
+                      QC, QC_OLD, dQCdt, GRF['A'], dt)
             if i_moist_main_switch:
-                exchange_BC_cpu(QV)
-                exchange_BC_cpu(QC)
+                exchange_BC_fields_cpu((POTT, VWIND, UWIND, QV, QC))
+            else:
+                exchange_BC_fields_cpu((POTT, VWIND, UWIND))
 
+
+    def leapfrog(self, GR, GRF, UWIND_OLD, UWIND, VWIND_OLD,
+                    VWIND, COLP_OLD, COLP, COLP_NEW, POTT_OLD, POTT,
+                    QV, QV_OLD, QC, QC_OLD,
+                    dUFLXdt, dVFLXdt, dPOTTdt, dQVdt, dQCdt):
+        """
+        Leapfrog step from _OLD (n-1) over 2*dt using the tendencies
+        of time level n, followed by the Robert-Asselin-Williams filter.
+        Afterwards _OLD contains the filtered level n and the
+        prognostic fields the level n+1.
+        """
+        if self.target == GPU:
+
+            make_leapfrog_step_gpu[bpg, tpb](COLP_NEW, COLP_OLD,
+                      UWIND, UWIND_OLD, dUFLXdt,
+                      VWIND, VWIND_OLD, dVFLXdt,
+                      POTT, POTT_OLD, dPOTTdt,
+                      QV, QV_OLD, dQVdt,
+                      QC, QC_OLD, dQCdt, GRF['A'], GR.dt,
+                      RAW_nu, RAW_alpha)
+            filter_COLP_gpu[bpg, tpb_2D](COLP_OLD, COLP, COLP_NEW,
+                      RAW_nu, RAW_alpha)
+            exchange_BC_gpu[bpg, tpb](POTT)
+            exchange_BC_gpu[bpg, tpb](VWIND)
+            exchange_BC_gpu[bpg, tpb](UWIND)
+            if i_moist_main_switch:
+                exchange_BC_gpu[bpg, tpb](QV)
+                exchange_BC_gpu[bpg, tpb](QC)
+
+        elif self.target == CPU:
+
+            make_leapfrog_step_cpu(COLP_NEW, COLP_OLD,
+                      UWIND, UWIND_OLD, dUFLXdt,
+                      VWIND, VWIND_OLD, dVFLXdt,
+                      POTT, POTT_OLD, dPOTTdt,
+                      QV, QV_OLD, dQVdt,
+                      QC, QC_OLD, dQCdt, GRF['A'], GR.dt,
+                      RAW_nu, RAW_alpha)
+            filter_COLP_cpu(COLP_OLD, COLP, COLP_NEW, RAW_nu, RAW_alpha)
+            if i_moist_main_switch:
+                exchange_BC_fields_cpu((POTT, VWIND, UWIND, QV, QC))
+            else:
+                exchange_BC_fields_cpu((POTT, VWIND, UWIND))
+
+
+    def RK_accumulate(self, GR, RK_stage, COLP_NEW, COLP_OLD,
+                    dCOLPdt, dCOLPdt_RK, dUFLXdt, dUFLXdt_RK,
+                    dVFLXdt, dVFLXdt_RK, dPOTTdt, dPOTTdt_RK,
+                    dQVdt, dQVdt_RK, dQCdt, dQCdt_RK):
+        """
+        Accumulate the tendencies of Runge-Kutta 4 stage RK_stage
+        (0 to 3) in the _RK registers. In the last stage, the combined
+        tendencies are written to the tendency fields and COLP_NEW
+        is recomputed from COLP_OLD with the combined tendency.
+        """
+        RK_weight = wp(RK4_weights[RK_stage])
+        if RK_stage == 0:
+            RK_mode = 0
+        elif RK_stage < len(RK4_weights)-1:
+            RK_mode = 1
+        else:
+            RK_mode = 2
+
+        fields = [(dCOLPdt, dCOLPdt_RK), (dUFLXdt, dUFLXdt_RK),
+                  (dVFLXdt, dVFLXdt_RK), (dPOTTdt, dPOTTdt_RK),
+                  (dQVdt, dQVdt_RK), (dQCdt, dQCdt_RK)]
+
+        if self.target == GPU:
+
+            for dVARdt, dVARdt_RK in fields:
+                RK_accumulate_gpu[bpg, tpb](dVARdt, dVARdt_RK,
+                                            RK_weight, RK_mode)
+            if RK_mode == 2:
+                make_COLP_timestep_gpu[bpg, tpb_2D](COLP_NEW, COLP_OLD,
+                                                    dCOLPdt, GR.dt)
+                exchange_BC_gpu[bpg, tpb](COLP_NEW)
+
+        elif self.target == CPU:
+
+            for dVARdt, dVARdt_RK in fields:
+                RK_accumulate_cpu(dVARdt, dVARdt_RK, RK_weight, RK_mode)
+            if RK_mode == 2:
+                make_COLP_timestep_cpu(COLP_NEW, COLP_OLD, dCOLPdt, GR.dt)
+                exchange_BC_cpu(COLP_NEW)
+
+
+    def fast_substep(self, GRF, COLP_NEW, COLP_SUB,
+                     UWIND, dUFLXdt, dUFLXdt_SUB,
+                     VWIND, dVFLXdt, dVFLXdt_SUB, dt):
+        """
+        Split-explicit sub step of UWIND and VWIND over dt from COLP_SUB
+        to COLP_NEW with the slow tendencies (dUFLXdt, dVFLXdt) and the
+        pressure gradient of the sub step (_SUB).
+        """
+        if self.target == GPU:
+            raise NotImplementedError('Split-explicit time stepping not '+
+                                      'yet implemented for GPU.')
+
+        elif self.target == CPU:
+
+            make_fast_substep_cpu(COLP_NEW, COLP_SUB,
+                      UWIND, dUFLXdt, dUFLXdt_SUB,
+                      VWIND, dVFLXdt, dVFLXdt_SUB, GRF['A'], dt)
+            exchange_BC_fields_cpu((UWIND, VWIND))
+
+
+    def mean_fluxes(self, UFLX_MEAN, VFLX_MEAN, WWIND_MEAN,
+                    UFLX, VFLX, WWIND, COLP_NEW, substep, n_substeps):
+        """
+        Add the mass fluxes of split-explicit sub step substep
+        (0 to n_substeps-1) to their time mean.
+        """
+        weight = wp(1./n_substeps)
+        if substep == 0:
+            mode = 0
+        else:
+            mode = 1
+
+        if self.target == GPU:
+            raise NotImplementedError('Split-explicit time stepping not '+
+                                      'yet implemented for GPU.')
+        elif self.target == CPU:
+            mean_fluxes_cpu(UFLX_MEAN, VFLX_MEAN, WWIND_MEAN,
+                      UFLX, VFLX, WWIND, COLP_NEW, weight, mode)
+
+
+    def set_mean_fluxes(self, UFLX_MEAN, VFLX_MEAN, WWIND_MEAN,
+                        UFLX, VFLX, WWIND, COLP_NEW):
+        """
+        Replace the mass fluxes by their time mean over the sub steps.
+        WWIND is consistent with COLP_NEW of the last sub step.
+        """
+        if self.target == GPU:
+            raise NotImplementedError('Split-explicit time stepping not '+
+                                      'yet implemented for GPU.')
+        elif self.target == CPU:
+            set_mean_fluxes_cpu(UFLX_MEAN, VFLX_MEAN,
+                      WWIND_MEAN, UFLX, VFLX, WWIND, COLP_NEW)
+
+
+    def euler_forward_scalars(self, GR, COLP, COLP_OLD,
+                    POTT, POTT_OLD, dPOTTdt,
+                    QV, QV_OLD, dQVdt, QC, QC_OLD, dQCdt, dt=None):
+        """
+        Euler forward step of POTT, QV and QC from _OLD over dt
+        (default GR.dt).
+        """
+        if dt is None:
+            dt = GR.dt
+
+        if self.target == GPU:
+            raise NotImplementedError('Split-explicit time stepping not '+
+                                      'yet implemented for GPU.')
+
+        elif self.target == CPU:
+
+            make_scalar_timestep_cpu(COLP, COLP_OLD,
+                      POTT, POTT_OLD, dPOTTdt,
+                      QV, QV_OLD, dQVdt,
+                      QC, QC_OLD, dQCdt, dt)
+            if i_moist_main_switch:
+                exchange_BC_fields_cpu((POTT, QV, QC))
+            else:
+                exchange_BC_cpu(POTT)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+"""
+###############################################################################
+Author:             Christoph Heim
+Date created:       20190713
+Last modified:      20190714
+License:            MIT
+
+Polar filter for the regular lat-lon grid.
+Poleward of polar_filter_lat the zonal waves of the tendencies are damped
+such that no wave violates the CFL criterion at polar_filter_lat
+(response see polar_filter_response in main_grid.py). The time step can
+thus be derived from the grid spacing at polar_filter_lat instead of the
+one of the polemost rows.
+All filtered rows and vertical levels of a field are transformed at once
+with real FFTs along the periodic longitude axis.
+The filter preserves zonal means and thus the global mass.
+- filter_continuity:    column pressure tendency (COLP_NEW is recomputed).
+                        Applied directly after the continuity equation
+                        because the tendencies of the other variables
+                        depend on COLP_NEW.
+- filter_momentum:      tendencies of UFLX and VFLX.
+- filter_scalars:       tendencies of POTT, QV and QC.
+The vertical wind is not filtered. Otherwise the vertical fluxes are
+inconsistent with the horizontal flux divergence which makes the
+flux-form advection unstable (a constant field is no longer conserved).
+Because the filter is linear, filtering both the COLP tendency and the
+flux-form tendencies (e.g. of POTT*COLP) keeps them consistent.
+###############################################################################
+"""
+import numpy as np
+
+from namelist import i_moist_main_switch
+from io_read_namelist import GPU
+from main_grid import nx,nb
+from misc_boundaries import exchange_BC_cpu
+from misc_utilities import function_input_fields
+###############################################################################
+
+
+class PolarFilter:
+
+    def __init__(self, target):
+
+        if target == GPU:
+            raise NotImplementedError('Polar filter not yet '+
+                                      'implemented for GPU.')
+        self.target = target
+        self.fields_continuity = function_input_fields(
+                                        self.filter_continuity)
+        self.fields_momentum = function_input_fields(
+                                        self.filter_momentum)
+        self.fields_scalars = function_input_fields(
+                                        self.filter_scalars)
+
+
+    def filter_continuity(self, GR, dCOLPdt, COLP_NEW, COLP_OLD, dt=None):
+        """
+        Time step dt for COLP_OLD -> COLP_NEW (default GR.dt).
+        """
+        if dt is None:
+            dt = GR.dt
+
+        rows = GR.polar_filter_rows
+        filter_rows(dCOLPdt, rows, GR.polar_filter_response)
+        COLP_NEW[:,rows,:] = COLP_OLD[:,rows,:] + dt*dCOLPdt[:,rows,:]
+        exchange_BC_cpu(COLP_NEW)
+
+
+    def filter_momentum(self, GR, dUFLXdt, dVFLXdt):
+
+        filter_rows(dUFLXdt, GR.polar_filter_rows,
+                    GR.polar_filter_response)
+        filter_rows(dVFLXdt, GR.polar_filter_rows_js,
+                    GR.polar_filter_response_js)
+
+
+    def filter_scalars(self, GR, dPOTTdt, dQVdt, dQCdt):
+
+        filter_rows(dPOTTdt, GR.polar_filter_rows,
+                    GR.polar_filter_response)
+        if i_moist_main_switch:
+            filter_rows(dQVdt, GR.polar_filter_rows,
+                        GR.polar_filter_response)
+            filter_rows(dQCdt, GR.polar_filter_rows,
+                        GR.polar_filter_response)
+
+
+
+def filter_rows(VAR, rows, response):
+    """
+    Multiply the zonal spectrum of VAR in the given rows with response
+    (wave number, row, 1). Works for fields staggered in x as well
+    because the nx unique points are in both cases nb to nx+nb-1.
+    """
+    if len(rows) == 0:
+        return
+    VAR_rows = VAR[nb:nx+nb,rows,:]
+    spectrum = np.fft.rfft(VAR_rows, axis=0)
+    spectrum *= response
+    VAR[nb:nx+nb,rows,:] = np.fft.irfft(spectrum, n=nx, axis=0)
+    exchange_BC_cpu(VAR)
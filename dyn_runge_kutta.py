@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+"""
+###############################################################################
+Author:             Christoph Heim
+Date created:       20190711
+Last modified:      20190715
+License:            MIT
+
+Perform a Runge-Kutta time integration.
+- RK3:  low-storage 3rd order scheme of Wicker and Skamarock 2002
+        (Mon. Wea. Rev. 130, 2088-2097). Every stage is an euler forward
+        step from the _OLD fields (time level n) over dt/3, dt/2 and dt.
+        No additional fields are required.
+- RK4:  classical 4th order scheme. The stages are euler forward steps
+        from the _OLD fields over dt/2, dt/2 and dt. The weighted
+        tendencies of the stages are accumulated in one register
+        per prognostic variable (_RK fields) and the final step is
+        an euler forward step with the combined tendencies.
+The time step is scaled with the larger stability limit of the schemes
+(see time_stepping_stability in io_read_namelist.py).
+- RK3 split-explicit (i_split_explicit, Wicker and Skamarock 2002):
+        In every stage, the slow momentum tendencies (all terms except
+        the pressure gradient) are computed once at the stage state.
+        Starting from the _OLD fields, the continuity equation and the
+        pressure gradient are then integrated over the stage with
+        forward-backward sub steps (COLP first, momentum with the
+        pressure gradient of the new COLP). The full time step has
+        split_explicit_n_sub sub steps, the stages the corresponding
+        fraction (at least one). POTT, QV and QC are advanced once per
+        stage with the mass fluxes averaged over the sub steps, which
+        keeps them consistent with the sub-cycled COLP.
+###############################################################################
+"""
+import numpy as np
+
+from namelist import (i_comp_mode,
+                      i_split_explicit, split_explicit_n_sub)
+from io_read_namelist import CPU, GPU, gpu_enable
+from main_grid import tpb, bpg
+from dyn_tendencies import (compute_tendencies, compute_continuity,
+                            compute_momentum, compute_pre_grad,
+                            compute_scalars)
+from dyn_org_discretizations import (PrognosticsFactory, DiagnosticsFactory)
+if gpu_enable:
+    from misc_gpu_functions import set_equal
+###############################################################################
+if i_comp_mode == 1:
+    Prognostics = PrognosticsFactory(target=CPU)
+    Diagnostics = DiagnosticsFactory(target=CPU)
+elif i_comp_mode == 2:
+    Prognostics = PrognosticsFactory(target=GPU)
+    Diagnostics = DiagnosticsFactory(target=GPU)
+
+# fraction of dt of each stage
+RK3_stages = [1./3., 1./2., 1.]
+RK4_stages = [1./2., 1./2., 1., 1.]
+
+def step_RK3(GR, F):
+
+    update_time_levels(GR, F)
+
+    for stage_dt in RK3_stages:
+        if i_split_explicit:
+            RK_split_stage(GR, F, stage_dt*GR.dt)
+        else:
+            RK_stage(GR, F, stage_dt*GR.dt)
+
+
+def step_RK4(GR, F):
+
+    update_time_levels(GR, F)
+
+    for stage in range(len(RK4_stages)):
+        RK_stage(GR, F, RK4_stages[stage]*GR.dt, RK4_stage=stage)
+
+
+def update_time_levels(GR, F):
+    """
+    Store time level n in the _OLD fields (shared buffers, no copy).
+    """
+    GR.timer.start('step')
+    F.new_time_level()
+    GR.timer.stop('step')
+
+
+def set_fields_equal(F, set_names, get_names):
+    """
+    Copy fields get_names to fields set_names.
+    """
+    for set_name,get_name in zip(set_names, get_names):
+        if i_comp_mode == 1:
+            F.host[set_name][:] = F.host[get_name][:]
+        elif i_comp_mode == 2:
+            set_equal[bpg, tpb](F.device[set_name], F.device[get_name])
+
+
+def RK_stage(GR, F, dt, RK4_stage=None):
+    """
+    Tendencies of current fields and euler forward step from the _OLD
+    fields over dt. If RK4_stage is given, the tendencies are
+    accumulated and the last stage uses the combined tendencies.
+    """
+    # COMPUTE TENDENCIES
+    ##############################
+    ##############################
+    compute_tendencies(GR, F, dt=dt)
+    if RK4_stage is not None:
+        GR.timer.start('step')
+        F.plan(GR, Prognostics.RK_accumulate, Prognostics.target)(
+                            RK_stage=RK4_stage)
+        GR.timer.stop('step')
+    F.move_time_level(['COLP'], ['COLP_NEW'])
+    ##############################
+    ##############################
+
+    # PROGNOSE NEXT STAGE
+    ##############################
+    ##############################
+    GR.timer.start('step')
+    F.detach_time_level(F.field_groups[F.PROG_FIELDS])
+    F.plan(GR, Prognostics.euler_forward, Prognostics.target)(dt=dt)
+    GR.timer.stop('step')
+    ##############################
+    ##############################
+
+    # DIAGNOSE VARIABLES
+    ##############################
+    ##############################
+    GR.timer.start('diag')
+    F.plan(GR, Diagnostics.primary_diag, Diagnostics.target)()
+    GR.timer.stop('diag')
+    ##############################
+    ##############################
+
+
+
+def RK_split_stage(GR, F, dt):
+    """
+    Split-explicit Runge-Kutta stage from the _OLD fields over dt
+    (see module docstring).
+    """
+    n_substeps = max(int(np.ceil(split_explicit_n_sub*dt/GR.dt - 1E-9)), 1)
+    dtau = dt/n_substeps
+
+    # SLOW TENDENCIES
+    ##############################
+    ##############################
+    compute_continuity(GR, F, dt=dt)
+    compute_momentum(GR, F, pre_grad=False)
+    ##############################
+    ##############################
+
+    # FAST SUB STEPS
+    ##############################
+    ##############################
+    GR.timer.start('step')
+    F.set_time_level(['COLP_SUB'], ['COLP_OLD'])
+    # momentum is sub stepped in place starting from time level n
+    F.detach_time_level(['UWIND', 'VWIND'])
+    set_fields_equal(F, ['UWIND', 'VWIND'], ['UWIND_OLD', 'VWIND_OLD'])
+    GR.timer.stop('step')
+    for substep in range(n_substeps):
+        compute_continuity(GR, F, dt=dtau, COLP='COLP_SUB')
+        GR.timer.start('step')
+        F.plan(GR, Prognostics.mean_fluxes, Prognostics.target)(
+                            substep=substep, n_substeps=n_substeps)
+        GR.timer.stop('step')
+
+        # pressure gradient of the new COLP (forward-backward)
+        GR.timer.start('diag')
+        F.plan(GR, Diagnostics.primary_diag, Diagnostics.target,
+               COLP='COLP_NEW')()
+        GR.timer.stop('diag')
+        compute_pre_grad(GR, F, COLP='COLP_NEW')
+
+        GR.timer.start('step')
+        F.plan(GR, Prognostics.fast_substep, Prognostics.target)(dt=dtau)
+        # COLP_NEW of the last sub step is used below
+        if substep < n_substeps-1:
+            F.move_time_level(['COLP_SUB'], ['COLP_NEW'])
+        GR.timer.stop('step')
+    GR.timer.start('step')
+    F.plan(GR, Prognostics.set_mean_fluxes, Prognostics.target)()
+    GR.timer.stop('step')
+    ##############################
+    ##############################
+
+    # SCALARS
+    ##############################
+    ##############################
+    compute_scalars(GR, F)
+    GR.timer.start('step')
+    F.move_time_level(['COLP'], ['COLP_NEW'])
+    F.detach_time_level(F.field_groups[F.PROG_FIELDS])
+    F.plan(GR, Prognostics.euler_forward_scalars,
+           Prognostics.target)(dt=dt)
+    GR.timer.stop('step')
+    ##############################
+    ##############################
+
+    # DIAGNOSE VARIABLES
+    ##############################
+    ##############################
+    GR.timer.start('diag')
+    F.plan(GR, Diagnostics.primary_diag, Diagnostics.target)()
+    GR.timer.stop('diag')
+    ##############################
+    ##############################
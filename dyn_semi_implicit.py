@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+"""
+###############################################################################
+Author:             Christoph Heim
+Date created:       20190714
+Last modified:      20190715
+License:            MIT
+
+Semi-implicit treatment of the external gravity wave mode for the matsuno
+time stepping. The fastest mode of the model couples the column pressure
+COLP and the vertically averaged wind. Linearized about an isothermal
+state at rest (temperature semi_implicit_T_ref) the pressure gradient
+force is equal on all levels:
+    dCOLP/dt   = - COLP_ref * div(sum_k dsigma_k * WIND_k)
+    dWIND_k/dt = - c_ref**2/COLP_ref * grad(COLP)
+with c_ref the gravity wave speed at semi_implicit_T_ref.
+Both matsuno stages are computed explicitly as before (X_e) and are
+then corrected with the linear terms L weighted backward:
+    X_new = X_e + alpha*dt*L(X_new - X_prev)
+where X_prev is the state the tendencies were computed from.
+With alpha >= 0.5 the scheme is stable for the external mode at any dt
+as long as c_ref is at least the true gravity wave speed. alpha is fixed
+at 0.5 (no damping of the external mode).
+Only the external mode is treated implicitly. The internal gravity wave
+modes remain explicit and limit the time step.
+The correction requires the solution of one Helmholtz equation
+    (1 - (alpha*dt*c_ref)**2 * div grad) dCOLP = RHS
+per stage which is solved directly with a real FFT along the periodic
+longitude axis and one tridiagonal system per zonal wave number
+(real and imaginary part, misc_banded_solver.py).
+Discrete div and grad are the ones of the continuity equation and of
+the pressure gradient (coefficients see Grid: si_...).
+POTT, QV and QC remain unchanged by the correction.
+###############################################################################
+"""
+import numpy as np
+
+from namelist import semi_implicit_T_ref, pair_top
+from io_read_namelist import wp, GPU
+from io_constants import con_Rd, con_cp
+from main_grid import nx,nxs,ny,nys,nz,nb
+from misc_boundaries import exchange_BC_cpu
+from misc_banded_solver import (allocate_banded_work,
+                                solve_banded_batched_cpu)
+from misc_utilities import function_input_fields
+###############################################################################
+
+# backward weight of the linear terms
+alpha = 0.5
+# reference column pressure [Pa]
+COLP_ref = 100000. - pair_top
+# squared gravity wave speed at reference temperature [m2 s-2]
+c_ref2 = con_cp/(con_cp-con_Rd)*con_Rd*semi_implicit_T_ref
+
+
+class SemiImplicit:
+
+    def __init__(self, target):
+
+        if target == GPU:
+            raise NotImplementedError('Semi-implicit time stepping not '+
+                                      'yet implemented for GPU.')
+        self.target = target
+        self.fields = function_input_fields(self.correct)
+
+        # state the tendencies of the current stage are computed from
+        self.COLP_prev = np.zeros((nx ,ny ), dtype=wp)
+        self.UBAR_prev = np.zeros((nxs,ny ), dtype=wp)
+        self.VBAR_prev = np.zeros((nx ,nys), dtype=wp)
+
+        # tridiagonal systems (real and imaginary part of each zonal
+        # wave number) in storage of scipy.linalg.solve_banded
+        self.n_waves = nx//2+1
+        self.AB = np.zeros((2*self.n_waves,3,ny), dtype=wp)
+        self.LU, self.X = allocate_banded_work(2*self.n_waves, 1, 1, ny, wp)
+        self.B = np.zeros((2*self.n_waves,ny), dtype=wp)
+        # time step the systems are set up for
+        self.AB_dt = None
+
+
+    def store_state(self, GR, COLP, UWIND, VWIND):
+        """
+        Store COLP and the vertically averaged wind of X_prev.
+        """
+        self.COLP_prev[:] = COLP[nb:nx+nb,nb:ny+nb,0]
+        self.UBAR_prev[:] = vert_mean(GR, UWIND[nb:nxs+nb,nb:ny+nb,:])
+        self.VBAR_prev[:] = vert_mean(GR, VWIND[nb:nx+nb,nb:nys+nb,:])
+
+
+    def correct(self, GR, COLP, UWIND, VWIND):
+        """
+        Implicit correction of the explicit stage X_e contained in
+        COLP, UWIND and VWIND.
+        """
+        tau = alpha*GR.dt
+        g_ref = c_ref2/COLP_ref
+
+        # explicit increments
+        dCOLP_e = COLP[nb:nx+nb,nb:ny+nb,0] - self.COLP_prev
+        dUBAR_e = (vert_mean(GR, UWIND[nb:nxs+nb,nb:ny+nb,:]) -
+                   self.UBAR_prev)
+        dVBAR_e = (vert_mean(GR, VWIND[nb:nx+nb,nb:nys+nb,:]) -
+                   self.VBAR_prev)
+
+        # Helmholtz equation
+        RHS = dCOLP_e - tau*COLP_ref*(
+                    GR.si_div_x * (dUBAR_e[1:,:] - dUBAR_e[:-1,:]) +
+                    GR.si_div_y * (dVBAR_e[:,1:]*GR.si_dxjs[1:] -
+                                   dVBAR_e[:,:-1]*GR.si_dxjs[:-1]) )
+        if self.AB_dt != GR.dt:
+            self.set_up_systems(GR, tau)
+        spectrum = np.fft.rfft(RHS, axis=0)
+        self.B[:self.n_waves,:] = spectrum.real
+        self.B[self.n_waves:,:] = spectrum.imag
+        solve_banded_batched_cpu(1, 1, self.AB, self.B, self.LU, self.X)
+        spectrum = (self.X[:self.n_waves,:] +
+                    1j*self.X[self.n_waves:,:])
+        dCOLP = np.fft.irfft(spectrum, n=nx, axis=0)
+
+        # update column pressure
+        COLP[nb:nx+nb,nb:ny+nb,0] = self.COLP_prev + dCOLP
+        exchange_BC_cpu(COLP)
+
+        # wind correction (equal on all levels)
+        dCOLP_per = np.concatenate([dCOLP[-1:,:], dCOLP], axis=0)
+        dU = - tau*g_ref*GR.si_grad_x*(dCOLP_per[1:,:] - dCOLP_per[:-1,:])
+        UWIND[nb:nx+nb,nb:ny+nb,:] += dU[:,:,None]
+        dV = np.zeros((nx,nys), dtype=wp)
+        dV[:,1:-1] = - tau*g_ref*GR.si_grad_y[1:-1]*(
+                                    dCOLP[:,1:] - dCOLP[:,:-1])
+        VWIND[nb:nx+nb,nb:nys+nb,:] += dV[:,:,None]
+        exchange_BC_cpu(UWIND)
+        exchange_BC_cpu(VWIND)
+
+
+    def set_up_systems(self, GR, tau):
+        """
+        Helmholtz operator of each zonal wave number for the time step
+        GR.dt (tau = alpha*dt).
+        """
+        fac = tau**2*c_ref2
+        for part in [0, self.n_waves]:
+            AB = self.AB[part:part+self.n_waves,:,:]
+            # upper diagonal (row j to j+1)
+            AB[:,0,1:] = - fac*GR.si_merid_p[:-1]
+            # diagonal
+            AB[:,1,:] = 1. + fac*(GR.si_eigen[:,None]*GR.si_zonal[None,:] +
+                                  GR.si_merid_p[None,:] +
+                                  GR.si_merid_m[None,:])
+            # lower diagonal (row j to j-1)
+            AB[:,2,:-1] = - fac*GR.si_merid_m[1:]
+        self.AB_dt = GR.dt
+
+
+
+def vert_mean(GR, VAR):
+    """
+    Vertical average weighted with dsigma.
+    """
+    return(np.sum(VAR*GR.dsigma, axis=2))
+
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+"""
+###############################################################################
+Author:             Christoph Heim
+Date created:       20190714
+Last modified:      20190715
+License:            MIT
+
+Functions for the split-explicit time integration (CPU only).
+The fast terms (continuity equation and pressure gradient) are sub-cycled
+with a forward-backward scheme while the slow momentum tendencies
+(advection, coriolis, diffusion, turbulence) are held constant:
+- pre_grad_tendency:    pressure gradient term of UFLX and VFLX.
+                        Either stored in the _SUB fields (fast tendency)
+                        or removed from the full tendencies (slow tendency)
+- make_fast_substep:    in-place sub step of UWIND and VWIND from COLP
+                        to COLP_NEW with slow plus fast tendency.
+- mean_fluxes:          time mean of the mass fluxes UFLX, VFLX and of
+                        the vertical mass flux COLP_NEW*WWIND over the
+                        sub steps. Used to transport the scalars
+                        consistently with the sub-cycled COLP.
+- make_scalar_timestep: euler forward step of POTT, QV and QC.
+
+HISTORY
+- 20190714  : Created (CH)
+- 20190715  : Removed GPU kernels, CPU only (CH)
+###############################################################################
+"""
+import numpy as np
+from numba import njit, prange
+
+from namelist import i_UVFLX_main_switch, i_UVFLX_pre_grad
+from io_read_namelist import wp, wp_int
+from main_grid import nx,nxs,ny,nys,nz,nzs,nb
+from dyn_functions import pre_grad_py
+from dyn_timestep import (euler_forward_pw_py,
+                          interp_COLPA_is_py, interp_COLPA_js_py)
+###############################################################################
+
+
+###############################################################################
+### DEVICE UNSPECIFIC PYTHON FUNCTIONS
+###############################################################################
+def mean_flux_py(FLX_MEAN, FLX, weight, mode):
+    """
+    mode 0: first sub step, 1: following sub steps.
+    """
+    if mode == 0:
+        return( weight*FLX )
+    else:
+        return( FLX_MEAN + weight*FLX )
+
+
+def scalar_step_py(VAR_OLD, dVARdt, COLP, COLP_OLD, dt):
+    """
+    Euler forward step of scalar with clipping of negative values.
+    """
+    VAR = VAR_OLD * COLP_OLD/COLP + dt*dVARdt/COLP
+    if VAR < wp(0.):
+        VAR = wp(0.)
+    return(VAR)
+
+
+
+###############################################################################
+### SPECIALIZE FOR CPU
+###############################################################################
+pre_grad            = njit(pre_grad_py)
+euler_forward_pw    = njit(euler_forward_pw_py)
+interp_COLPA_is     = njit(interp_COLPA_is_py)
+interp_COLPA_js     = njit(interp_COLPA_js_py)
+mean_flux           = njit(mean_flux_py)
+scalar_step         = njit(scalar_step_py)
+
+def pre_grad_tendency_cpu(dUFLXdt_SUB, dVFLXdt_SUB, dUFLXdt, dVFLXdt,
+                    PHI, COLP, POTT, PVTF, PVTFVB,
+                    dyis, dxjs, dsigma, sigma_vb, remove):
+
+    for i in prange(nb,nxs+nb):
+        for j in range(nb,nys+nb):
+            for k in range(wp_int(0),nz):
+                # UFLX
+                if j < ny+nb:
+                    dUFLXdt_PG = wp(0.)
+                    if i_UVFLX_main_switch and i_UVFLX_pre_grad:
+                        dUFLXdt_PG = pre_grad(
+                            PHI     [i  ,j  ,k  ], PHI     [i-1,j  ,k  ],
+                            COLP    [i  ,j  ,0  ], COLP    [i-1,j  ,0  ],
+                            POTT    [i  ,j  ,k  ], POTT    [i-1,j  ,k  ],
+                            PVTF    [i  ,j  ,k  ], PVTF    [i-1,j  ,k  ],
+                            PVTFVB  [i  ,j  ,k  ], PVTFVB  [i-1,j  ,k  ],
+                            PVTFVB  [i-1,j  ,k+1], PVTFVB  [i  ,j  ,k+1],
+                            dsigma  [0  ,0  ,k  ], sigma_vb[0  ,0  ,k  ],
+                            sigma_vb[0  ,0  ,k+1], dyis    [i  ,j  ,0  ])
+                    if remove:
+                        dUFLXdt[i,j,k] = dUFLXdt[i,j,k] - dUFLXdt_PG
+                    else:
+                        dUFLXdt_SUB[i,j,k] = dUFLXdt_PG
+                # VFLX
+                if i < nx+nb:
+                    dVFLXdt_PG = wp(0.)
+                    if i_UVFLX_main_switch and i_UVFLX_pre_grad:
+                        dVFLXdt_PG = pre_grad(
+                            PHI     [i  ,j  ,k  ], PHI     [i  ,j-1,k  ],
+                            COLP    [i  ,j  ,0  ], COLP    [i  ,j-1,0  ],
+                            POTT    [i  ,j  ,k  ], POTT    [i  ,j-1,k  ],
+                            PVTF    [i  ,j  ,k  ], PVTF    [i  ,j-1,k  ],
+                            PVTFVB  [i  ,j  ,k  ], PVTFVB  [i  ,j-1,k  ],
+                            PVTFVB  [i  ,j-1,k+1], PVTFVB  [i  ,j  ,k+1],
+                            dsigma  [0  ,0  ,k  ], sigma_vb[0  ,0  ,k  ],
+                            sigma_vb[0  ,0  ,k+1], dxjs    [i  ,j  ,0  ])
+                    if remove:
+                        dVFLXdt[i,j,k] = dVFLXdt[i,j,k] - dVFLXdt_PG
+                    else:
+                        dVFLXdt_SUB[i,j,k] = dVFLXdt_PG
+pre_grad_tendency_cpu = njit(parallel=True)(pre_grad_tendency_cpu)
+
+
+def make_fast_substep_cpu(COLP_NEW, COLP,
+                      UWIND, dUFLXdt, dUFLXdt_SUB,
+                      VWIND, dVFLXdt, dVFLXdt_SUB,
+                      A, dt):
+
+    for i in prange(nb,nxs+nb):
+        for j in range(nb,nys+nb):
+            # UWIND
+            if j < ny+nb:
+                COLPA_NEW_is = interp_COLPA_is(
+                        COLP_NEW [i  ,j  ,0  ], COLP_NEW [i-1,j  ,0  ],
+                        COLP_NEW [i  ,j-1,0  ], COLP_NEW [i  ,j+1,0  ],
+                        COLP_NEW [i-1,j+1,0  ], COLP_NEW [i-1,j-1,0  ],
+                        A        [i  ,j  ,0  ], A        [i-1,j  ,0  ],
+                        A        [i  ,j-1,0  ], A        [i  ,j+1,0  ],
+                        A        [i-1,j+1,0  ], A        [i-1,j-1,0  ], j)
+                COLPA_is     = interp_COLPA_is(
+                        COLP     [i  ,j  ,0  ], COLP     [i-1,j  ,0  ],
+                        COLP     [i  ,j-1,0  ], COLP     [i  ,j+1,0  ],
+                        COLP     [i-1,j+1,0  ], COLP     [i-1,j-1,0  ],
+                        A        [i  ,j  ,0  ], A        [i-1,j  ,0  ],
+                        A        [i  ,j-1,0  ], A        [i  ,j+1,0  ],
+                        A        [i-1,j+1,0  ], A        [i-1,j-1,0  ], j)
+                for k in range(wp_int(0),nz):
+                    UWIND[i,j,k] = euler_forward_pw(UWIND[i,j,k],
+                            dUFLXdt[i,j,k] + dUFLXdt_SUB[i,j,k],
+                            COLPA_NEW_is, COLPA_is, dt)
+            # VWIND
+            if i < nx+nb:
+                COLPA_NEW_js = interp_COLPA_js(
+                        COLP_NEW [i  ,j  ,0  ], COLP_NEW [i  ,j-1,0  ],
+                        COLP_NEW [i-1,j  ,0  ], COLP_NEW [i+1,j  ,0  ],
+                        COLP_NEW [i+1,j-1,0  ], COLP_NEW [i-1,j-1,0  ],
+                        A        [i  ,j  ,0  ], A        [i  ,j-1,0  ],
+                        A        [i-1,j  ,0  ], A        [i+1,j  ,0  ],
+                        A        [i+1,j-1,0  ], A        [i-1,j-1,0  ])
+                COLPA_js     = interp_COLPA_js(
+                        COLP     [i  ,j  ,0  ], COLP     [i  ,j-1,0  ],
+                        COLP     [i-1,j  ,0  ], COLP     [i+1,j  ,0  ],
+                        COLP     [i+1,j-1,0  ], COLP     [i-1,j-1,0  ],
+                        A        [i  ,j  ,0  ], A        [i  ,j-1,0  ],
+                        A        [i-1,j  ,0  ], A        [i+1,j  ,0  ],
+                        A        [i+1,j-1,0  ], A        [i-1,j-1,0  ])
+                for k in range(wp_int(0),nz):
+                    VWIND[i,j,k] = euler_forward_pw(VWIND[i,j,k],
+                            dVFLXdt[i,j,k] + dVFLXdt_SUB[i,j,k],
+                            COLPA_NEW_js, COLPA_js, dt)
+make_fast_substep_cpu = njit(parallel=True)(make_fast_substep_cpu)
+
+
+def mean_fluxes_cpu(UFLX_MEAN, VFLX_MEAN, WWIND_MEAN,
+                    UFLX, VFLX, WWIND, COLP_NEW, weight, mode):
+
+    for i in prange(wp_int(0),nxs+2*nb):
+        for j in range(wp_int(0),nys+2*nb):
+            for k in range(wp_int(0),nzs):
+                if j < ny+2*nb and k < nz:
+                    UFLX_MEAN[i,j,k] = mean_flux(UFLX_MEAN[i,j,k],
+                                            UFLX[i,j,k], weight, mode)
+                if i < nx+2*nb and k < nz:
+                    VFLX_MEAN[i,j,k] = mean_flux(VFLX_MEAN[i,j,k],
+                                            VFLX[i,j,k], weight, mode)
+                if i < nx+2*nb and j < ny+2*nb:
+                    WWIND_MEAN[i,j,k] = mean_flux(WWIND_MEAN[i,j,k],
+                                            COLP_NEW[i,j,0]*WWIND[i,j,k],
+                                            weight, mode)
+mean_fluxes_cpu = njit(parallel=True)(mean_fluxes_cpu)
+
+
+def set_mean_fluxes_cpu(UFLX_MEAN, VFLX_MEAN, WWIND_MEAN,
+                        UFLX, VFLX, WWIND, COLP_NEW):
+
+    for i in prange(wp_int(0),nxs+2*nb):
+        for j in range(wp_int(0),nys+2*nb):
+            for k in range(wp_int(0),nzs):
+                if j < ny+2*nb and k < nz:
+                    UFLX[i,j,k] = UFLX_MEAN[i,j,k]
+                if i < nx+2*nb and k < nz:
+                    VFLX[i,j,k] = VFLX_MEAN[i,j,k]
+                if i < nx+2*nb and j < ny+2*nb:
+                    WWIND[i,j,k] = WWIND_MEAN[i,j,k] / COLP_NEW[i,j,0]
+set_mean_fluxes_cpu = njit(parallel=True)(set_mean_fluxes_cpu)
+
+
+def make_scalar_timestep_cpu(COLP, COLP_OLD,
+                      POTT, POTT_OLD, dPOTTdt,
+                      QV, QV_OLD, dQVdt,
+                      QC, QC_OLD, dQCdt, dt):
+
+    for i in prange(nb,nx+nb):
+        for j in range(nb,ny+nb):
+            for k in range(wp_int(0),nz):
+                POTT[i,j,k] = euler_forward_pw(POTT_OLD[i,j,k],
+                                    dPOTTdt[i,j,k],
+                                    COLP[i,j,0], COLP_OLD[i,j,0], dt)
+                QV[i,j,k]   = scalar_step(QV_OLD[i,j,k], dQVdt[i,j,k],
+                                    COLP[i,j,0], COLP_OLD[i,j,0], dt)
+                QC[i,j,k]   = scalar_step(QC_OLD[i,j,k], dQCdt[i,j,k],
+                                    COLP[i,j,0], COLP_OLD[i,j,0], dt)
+make_scalar_timestep_cpu = njit(parallel=True)(make_scalar_timestep_cpu)
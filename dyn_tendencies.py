@@ -5,56 +5,123 @@
 File name:          dyn_tendencies.py  
 Author:             Christoph Heim
 Date created:       20181001
-Last modified:      20190609
+Last modified:      20190715
 License:            MIT
 
 Compute tendencies during one time step.
 - 20190531: Created (CH)
 - 20190609: Added moisture QV and QC (CH)
+- 20190710: Optional time step dt of continuity for leapfrog (CH)
+- 20190713: Polar filter (CH)
+- 20190714: Separate continuity, momentum and scalars for split-explicit
+            time stepping (CH)
+- 20190715: Call factory methods with launch plans (CH)
+- 20190715: Fused CPU tendency kernels (i_fused_tendencies) (CH)
 ###############################################################################
 """
-from namelist import i_comp_mode
+from namelist import i_comp_mode, i_polar_filter, i_fused_tendencies
 from io_read_namelist import CPU, GPU
 from dyn_org_discretizations import TendencyFactory
+from dyn_polar_filter import PolarFilter
 ###############################################################################
 if i_comp_mode == 1:
     Tendencies = TendencyFactory(target=CPU)
 elif i_comp_mode == 2:
     Tendencies = TendencyFactory(target=GPU)
+if i_polar_filter:
+    Polar = PolarFilter(target=Tendencies.target)
 
-def compute_tendencies(GR, F):
+def compute_tendencies(GR, F, dt=None):
+    """
+    dt is the time step of the COLP forward step (default GR.dt).
+    """
+    compute_continuity(GR, F, dt=dt)
+    if i_fused_tendencies:
+        compute_fused(GR, F)
+    else:
+        compute_momentum(GR, F)
+        compute_scalars(GR, F)
 
+
+def compute_continuity(GR, F, dt=None, COLP=None):
+    """
+    dt is the time step of the COLP forward step (default GR.dt).
+    If COLP is given (split-explicit sub steps), it replaces both COLP
+    and COLP_OLD.
+    """
     # PROGNOSE CONTINUITY
     ##############################
     ##############################
     GR.timer.start('cont')
-    Tendencies.continuity(GR, GR.GRF[Tendencies.target],
-                    **F.get(Tendencies.fields_continuity,
-                        target=Tendencies.target))
+    if COLP is None:
+        F.plan(GR, Tendencies.continuity, Tendencies.target)(dt=dt)
+    else:
+        F.plan(GR, Tendencies.continuity, Tendencies.target,
+               COLP=COLP, COLP_OLD=COLP)(dt=dt)
     GR.timer.stop('cont')
+    if i_polar_filter:
+        GR.timer.start('polar')
+        if COLP is None:
+            F.plan(GR, Polar.filter_continuity, Polar.target)(dt=dt)
+        else:
+            F.plan(GR, Polar.filter_continuity, Polar.target,
+                   COLP_OLD=COLP)(dt=dt)
+        GR.timer.stop('polar')
     ##############################
     ##############################
 
 
+def compute_momentum(GR, F, pre_grad=True):
+    """
+    If pre_grad is False, the pressure gradient is removed from the
+    tendencies (slow tendencies of split-explicit time stepping).
+    """
+
     # PROGNOSE WIND
     ##############################
     ##############################
     GR.timer.start('wind')
-    Tendencies.momentum(GR.GRF[Tendencies.target],
-                    **F.get(Tendencies.fields_momentum,
-                        target=Tendencies.target))
+    F.plan(GR, Tendencies.momentum, Tendencies.target)()
+    if not pre_grad:
+        F.plan(GR, Tendencies.remove_pre_grad, Tendencies.target)()
     GR.timer.stop('wind')
     ##############################
     ##############################
 
+    # POLAR FILTER
+    if i_polar_filter:
+        GR.timer.start('polar')
+        F.plan(GR, Polar.filter_momentum, Polar.target)()
+        GR.timer.stop('polar')
+
+
+def compute_pre_grad(GR, F, COLP=None):
+    """
+    Pressure gradient tendency of the split-explicit sub steps
+    (dUFLXdt_SUB, dVFLXdt_SUB). If COLP is given, it replaces COLP.
+    """
+    GR.timer.start('wind')
+    if COLP is None:
+        F.plan(GR, Tendencies.pre_grad, Tendencies.target)()
+    else:
+        F.plan(GR, Tendencies.pre_grad, Tendencies.target, COLP=COLP)()
+    GR.timer.stop('wind')
+
+    # POLAR FILTER
+    if i_polar_filter:
+        GR.timer.start('polar')
+        F.plan(GR, Polar.filter_momentum, Polar.target,
+               dUFLXdt='dUFLXdt_SUB', dVFLXdt='dVFLXdt_SUB')()
+        GR.timer.stop('polar')
+
+
+def compute_scalars(GR, F):
 
     # PROGNOSE POTT
     ##############################
     ##############################
     GR.timer.start('temp')
-    Tendencies.temperature(GR.GRF[Tendencies.target],
-                    **F.get(Tendencies.fields_temperature,
-                            target=Tendencies.target))
+    F.plan(GR, Tendencies.temperature, Tendencies.target)()
     GR.timer.stop('temp')
     ##############################
     ##############################
@@ -64,10 +131,30 @@ def compute_tendencies(GR, F):
     ###############################
     ###############################
     GR.timer.start('moist')
-    Tendencies.moisture(GR.GRF[Tendencies.target],
-                    **F.get(Tendencies.fields_moisture,
-                            target=Tendencies.target))
+    F.plan(GR, Tendencies.moisture, Tendencies.target)()
     GR.timer.stop('moist')
     ###############################
     ###############################
 
+    # POLAR FILTER
+    if i_polar_filter:
+        GR.timer.start('polar')
+        F.plan(GR, Polar.filter_scalars, Polar.target)()
+        GR.timer.stop('polar')
+
+
+def compute_fused(GR, F):
+    """
+    Momentum and scalar tendencies with one pass over the columns
+    (same as compute_momentum followed by compute_scalars).
+    """
+    GR.timer.start('fused')
+    F.plan(GR, Tendencies.fused, Tendencies.target)()
+    GR.timer.stop('fused')
+
+    # POLAR FILTER
+    if i_polar_filter:
+        GR.timer.start('polar')
+        F.plan(GR, Polar.filter_momentum, Polar.target)()
+        F.plan(GR, Polar.filter_scalars, Polar.target)()
+        GR.timer.stop('polar')
@@ -4,7 +4,7 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20190529
-Last modified:      20190609
+Last modified:      20190711
 License:            MIT
 
 Functions for prognostic step for both CPU and GPU.
@@ -12,6 +12,9 @@ Functions for prognostic step for both CPU and GPU.
 HISTORY
 - 20190529  : Created (CH) 
 20190609    : Added moisture variables QV and QC (CH)
+20190710    : Added leapfrog step with fused Robert-Asselin-Williams
+              filter (CH)
+20190711    : Added tendency accumulation for Runge-Kutta 4 (CH)
 ###############################################################################
 """
 import time
@@ -37,6 +40,30 @@ def euler_forward_pw_py(VAR, dVARdt, COLP, COLP_OLD, dt):
     """
     return( VAR * COLP_OLD/COLP + dt*dVARdt/COLP )
 
+def raw_filter_py(VAR_OLD, VAR, VAR_NEW, RAW_nu, RAW_alpha):
+    """
+    Robert-Asselin-Williams filter of the leapfrog time levels.
+    Returns filtered time level n (the n-1 level of the next step)
+    and corrected time level n+1. RAW_alpha = 1 gives the classical
+    Robert-Asselin filter.
+    """
+    d = RAW_nu/wp(2.) * ( VAR_OLD - wp(2.)*VAR + VAR_NEW )
+    return( VAR + RAW_alpha*d, VAR_NEW - (wp(1.) - RAW_alpha)*d )
+
+def RK_accumulate_py(dVARdt, dVARdt_RK, RK_weight, RK_mode):
+    """
+    Accumulate weighted stage tendency dVARdt in register dVARdt_RK.
+    RK_mode 0: first stage, 1: intermediate stage, 2: last stage
+    (combined tendency is returned as new dVARdt).
+    """
+    if RK_mode == 0:
+        dVARdt_RK = RK_weight*dVARdt
+    elif RK_mode == 1:
+        dVARdt_RK = dVARdt_RK + RK_weight*dVARdt
+    else:
+        dVARdt = dVARdt_RK + RK_weight*dVARdt
+    return( dVARdt, dVARdt_RK )
+
 def interp_COLPA_js_py(COLP, COLP_jm1, COLP_im1, COLP_ip1,
                        COLP_jm1_ip1, COLP_jm1_im1,
                        A, A_jm1, A_im1, A_ip1,
@@ -57,13 +84,13 @@ def interp_COLPA_is_py(COLP, COLP_im1, COLP_jm1, COLP_jp1,
                        A_im1_jp1, A_im1_jm1, j):
     """
     """
-    if j == 1:
+    if j == nb:
         return( wp(1.)/wp(4.)*(
                         COLP_im1_jp1    * A_im1_jp1 +
                         COLP_jp1        * A_jp1     +
                         COLP_im1        * A_im1     +
                         COLP            * A         ) )
-    elif j == ny:
+    elif j == ny+nb-1:
         return( wp(1.)/wp(4.)*(
                         COLP_im1_jm1    * A_im1_jm1 +
                         COLP_jm1        * A_jm1     +
@@ -156,6 +183,8 @@ def run_all_gpu(COLP,
     return(POTT, UWIND, VWIND, QV, QC)
 
 euler_forward_pw = njit(euler_forward_pw_py, device=True, inline=True)
+raw_filter = njit(raw_filter_py, device=True, inline=True)
+RK_accumulate = njit(RK_accumulate_py, device=True, inline=True)
 interp_COLPA_js = njit(interp_COLPA_js_py, device=True, inline=True)
 interp_COLPA_is = njit(interp_COLPA_is_py, device=True, inline=True)
 run_all_gpu = njit(run_all_gpu, device=True, inline=True)
@@ -202,10 +231,117 @@ if gpu_enable:
 
 
 
+def make_leapfrog_step_gpu(COLP_NEW, COLP_OLD,
+                      UWIND, UWIND_OLD, dUFLXdt,
+                      VWIND, VWIND_OLD, dVFLXdt,
+                      POTT, POTT_OLD, dPOTTdt,
+                      QV, QV_OLD, dQVdt,
+                      QC, QC_OLD, dQCdt,
+                      A, dt, RAW_nu, RAW_alpha):
+
+    i, j, k = cuda.grid(3)
+    if i >= nb and i < nxs+nb and j >= nb and j < nys+nb:
+        # leapfrog from n-1 (_OLD) to n+1 over 2*dt
+        (POTT_NEW, UWIND_NEW, VWIND_NEW, QV_NEW, QC_NEW) = run_all_gpu(
+                COLP_NEW [i  ,j  ,0  ], 
+                COLP_NEW [i-1,j  ,0  ], COLP_NEW [i+1,j  ,0  ],       
+                COLP_NEW [i  ,j-1,0  ], COLP_NEW [i  ,j+1,0  ],
+                COLP_NEW [i-1,j-1,0  ], COLP_NEW [i-1,j+1,0  ],
+                COLP_NEW [i+1,j-1,0  ], COLP_NEW [i+1,j+1,0  ],   
+                COLP_OLD [i  ,j  ,0  ], 
+                COLP_OLD [i-1,j  ,0  ], COLP_OLD [i+1,j  ,0  ],       
+                COLP_OLD [i  ,j-1,0  ], COLP_OLD [i  ,j+1,0  ],
+                COLP_OLD [i-1,j-1,0  ], COLP_OLD [i-1,j+1,0  ],
+                COLP_OLD [i+1,j-1,0  ], COLP_OLD [i+1,j+1,0  ],   
+
+                UWIND_OLD[i  ,j  ,k  ], dUFLXdt  [i  ,j  ,k  ],
+                VWIND_OLD[i  ,j  ,k  ], dVFLXdt  [i  ,j  ,k  ],
+                POTT_OLD [i  ,j  ,k  ], dPOTTdt  [i  ,j  ,k  ],
+                QV_OLD   [i  ,j  ,k  ], dQVdt    [i  ,j  ,k  ],
+                QC_OLD   [i  ,j  ,k  ], dQCdt    [i  ,j  ,k  ],
+
+                A        [i  ,j  ,0  ], 
+                A        [i-1,j  ,0  ], A        [i+1,j  ,0  ],       
+                A        [i  ,j-1,0  ], A        [i  ,j+1,0  ],
+                A        [i-1,j-1,0  ], A        [i-1,j+1,0  ],
+                A        [i+1,j-1,0  ], A        [i+1,j+1,0  ],   
+                wp(2.)*dt, i, j)
+
+        # filter time level n and store it as n-1 of the next step
+        if j < ny+nb:
+            UWIND_OLD[i,j,k], UWIND[i,j,k] = raw_filter(
+                    UWIND_OLD[i,j,k], UWIND[i,j,k], UWIND_NEW,
+                    RAW_nu, RAW_alpha)
+        if i < nx+nb:
+            VWIND_OLD[i,j,k], VWIND[i,j,k] = raw_filter(
+                    VWIND_OLD[i,j,k], VWIND[i,j,k], VWIND_NEW,
+                    RAW_nu, RAW_alpha)
+        if i < nx+nb and j < ny+nb:
+            POTT_OLD[i,j,k], POTT[i,j,k] = raw_filter(
+                    POTT_OLD[i,j,k], POTT[i,j,k], POTT_NEW,
+                    RAW_nu, RAW_alpha)
+            QV_OLD[i,j,k], QV[i,j,k] = raw_filter(
+                    QV_OLD[i,j,k], QV[i,j,k], QV_NEW,
+                    RAW_nu, RAW_alpha)
+            QC_OLD[i,j,k], QC[i,j,k] = raw_filter(
+                    QC_OLD[i,j,k], QC[i,j,k], QC_NEW,
+                    RAW_nu, RAW_alpha)
+            # clip negative values
+            if QV[i,j,k] < wp(0.):
+                QV[i,j,k] = wp(0.)
+            if QC[i,j,k] < wp(0.):
+                QC[i,j,k] = wp(0.)
+
+
+def filter_COLP_gpu(COLP_OLD, COLP, COLP_NEW, RAW_nu, RAW_alpha):
+    fnx,fny,fnz = COLP.shape
+    i, j, k = cuda.grid(3)
+    if i < fnx and j < fny and k < fnz:
+        COLP_OLD[i,j,k], COLP[i,j,k] = raw_filter(
+                COLP_OLD[i,j,k], COLP[i,j,k], COLP_NEW[i,j,k],
+                RAW_nu, RAW_alpha)
+
+if gpu_enable:
+    make_leapfrog_step_gpu = cuda.jit(cuda_kernel_decorator(
+                            make_leapfrog_step_gpu,
+                            non_3D={'dt':wp_str, 'RAW_nu':wp_str,
+                                    'RAW_alpha':wp_str}))(
+                            make_leapfrog_step_gpu)
+    filter_COLP_gpu = cuda.jit(cuda_kernel_decorator(filter_COLP_gpu,
+                            non_3D={'RAW_nu':wp_str, 'RAW_alpha':wp_str}))(
+                            filter_COLP_gpu)
+
+
+def RK_accumulate_gpu(dVARdt, dVARdt_RK, RK_weight, RK_mode):
+    fnx,fny,fnz = dVARdt.shape
+    i, j, k = cuda.grid(3)
+    if i < fnx and j < fny and k < fnz:
+        dVARdt[i,j,k], dVARdt_RK[i,j,k] = RK_accumulate(
+                dVARdt[i,j,k], dVARdt_RK[i,j,k], RK_weight, RK_mode)
+
+
+def make_COLP_timestep_gpu(COLP_NEW, COLP_OLD, dCOLPdt, dt):
+    fnx,fny,fnz = COLP_NEW.shape
+    i, j, k = cuda.grid(3)
+    if i < fnx and j < fny and k < fnz:
+        COLP_NEW[i,j,k] = COLP_OLD[i,j,k] + dt*dCOLPdt[i,j,k]
+
+if gpu_enable:
+    RK_accumulate_gpu = cuda.jit(cuda_kernel_decorator(RK_accumulate_gpu,
+                            non_3D={'RK_weight':wp_str, 'RK_mode':'int32'}))(
+                            RK_accumulate_gpu)
+    make_COLP_timestep_gpu = cuda.jit(cuda_kernel_decorator(
+                            make_COLP_timestep_gpu,
+                            non_3D={'dt':wp_str}))(make_COLP_timestep_gpu)
+
+
+
 ###############################################################################
 ### SPECIALIZE FOR CPU
 ###############################################################################
 euler_forward_pw    = njit(euler_forward_pw_py)
+raw_filter          = njit(raw_filter_py)
+RK_accumulate       = njit(RK_accumulate_py)
 interp_COLPA_js     = njit(interp_COLPA_js_py)
 interp_COLPA_is     = njit(interp_COLPA_is_py)
 
@@ -300,3 +436,130 @@ make_timestep_cpu = njit(make_timestep_cpu)
 
 
 
+
+
+def make_leapfrog_step_cpu(COLP_NEW, COLP_OLD,
+                      UWIND, UWIND_OLD, dUFLXdt,
+                      VWIND, VWIND_OLD, dVFLXdt,
+                      POTT, POTT_OLD, dPOTTdt,
+                      QV, QV_OLD, dQVdt,
+                      QC, QC_OLD, dQCdt,
+                      A, dt, RAW_nu, RAW_alpha):
+
+    dt2 = wp(2.)*dt
+
+    for i in prange(nb,nxs+nb):
+        for j in range(nb,nys+nb):
+
+            COLP_NEW_       = COLP_NEW  [i  ,j  ,0  ] 
+            COLP_NEW_im1    = COLP_NEW  [i-1,j  ,0  ]
+            COLP_NEW_ip1    = COLP_NEW  [i+1,j  ,0  ]       
+            COLP_NEW_jm1    = COLP_NEW  [i  ,j-1,0  ]
+            COLP_NEW_jp1    = COLP_NEW  [i  ,j+1,0  ]
+            COLP_NEW_im1_jm1= COLP_NEW  [i-1,j-1,0  ]
+            COLP_NEW_im1_jp1= COLP_NEW  [i-1,j+1,0  ]
+            COLP_NEW_ip1_jm1= COLP_NEW  [i+1,j-1,0  ]
+
+            COLP_OLD_       = COLP_OLD  [i  ,j  ,0  ] 
+            COLP_OLD_im1    = COLP_OLD  [i-1,j  ,0  ]
+            COLP_OLD_ip1    = COLP_OLD  [i+1,j  ,0  ]       
+            COLP_OLD_jm1    = COLP_OLD  [i  ,j-1,0  ]
+            COLP_OLD_jp1    = COLP_OLD  [i  ,j+1,0  ]
+            COLP_OLD_im1_jm1= COLP_OLD  [i-1,j-1,0  ]
+            COLP_OLD_im1_jp1= COLP_OLD  [i-1,j+1,0  ]
+            COLP_OLD_ip1_jm1= COLP_OLD  [i+1,j-1,0  ]
+
+            A_              = A         [i  ,j  ,0  ] 
+            A_im1           = A         [i-1,j  ,0  ]
+            A_ip1           = A         [i+1,j  ,0  ]       
+            A_jm1           = A         [i  ,j-1,0  ]
+            A_jp1           = A         [i  ,j+1,0  ]
+            A_im1_jm1       = A         [i-1,j-1,0  ]
+            A_im1_jp1       = A         [i-1,j+1,0  ]
+            A_ip1_jm1       = A         [i+1,j-1,0  ]
+
+            ## UWIND
+            COLPA_NEW_is = interp_COLPA_is(COLP_NEW_, COLP_NEW_im1,
+                                       COLP_NEW_jm1, COLP_NEW_jp1,
+                                       COLP_NEW_im1_jp1,   COLP_NEW_im1_jm1,
+                                       A_,    A_im1,    A_jm1,    A_jp1,
+                                       A_im1_jp1,      A_im1_jm1, j)
+            COLPA_OLD_is = interp_COLPA_is(COLP_OLD_, COLP_OLD_im1,
+                                       COLP_OLD_jm1, COLP_OLD_jp1,
+                                       COLP_OLD_im1_jp1,   COLP_OLD_im1_jm1,
+                                       A_,    A_im1,    A_jm1,    A_jp1,
+                                       A_im1_jp1,      A_im1_jm1, j)
+            
+            # VWIND
+            COLPA_NEW_js = interp_COLPA_js(COLP_NEW_, COLP_NEW_jm1,
+                                           COLP_NEW_im1,   COLP_NEW_ip1,
+                                           COLP_NEW_ip1_jm1,   COLP_NEW_im1_jm1,
+                                           A_,    A_jm1,    A_im1,    A_ip1,
+                                           A_ip1_jm1,      A_im1_jm1)
+            COLPA_OLD_js = interp_COLPA_js(COLP_OLD_, COLP_OLD_jm1,
+                                           COLP_OLD_im1,   COLP_OLD_ip1,
+                                           COLP_OLD_ip1_jm1,   COLP_OLD_im1_jm1,
+                                           A_,    A_jm1,    A_im1,    A_ip1,
+                                           A_ip1_jm1,      A_im1_jm1)
+
+            for k in range(wp_int(0),nz):
+                # leapfrog from n-1 (_OLD) to n+1 over 2*dt
+                UWIND_NEW = euler_forward_pw(UWIND_OLD[i,j,k],
+                                dUFLXdt[i,j,k], COLPA_NEW_is, COLPA_OLD_is, dt2)
+                VWIND_NEW = euler_forward_pw(VWIND_OLD[i,j,k],
+                                dVFLXdt[i,j,k], COLPA_NEW_js, COLPA_OLD_js, dt2)
+                POTT_NEW  = euler_forward_pw(POTT_OLD[i,j,k],
+                                dPOTTdt[i,j,k], COLP_NEW_, COLP_OLD_, dt2)
+                QV_NEW    = euler_forward_pw(QV_OLD[i,j,k],
+                                dQVdt[i,j,k], COLP_NEW_, COLP_OLD_, dt2)
+                QC_NEW    = euler_forward_pw(QC_OLD[i,j,k],
+                                dQCdt[i,j,k], COLP_NEW_, COLP_OLD_, dt2)
+
+                # filter time level n and store it as n-1 of the next step
+                UWIND_OLD[i,j,k], UWIND[i,j,k] = raw_filter(
+                        UWIND_OLD[i,j,k], UWIND[i,j,k], UWIND_NEW,
+                        RAW_nu, RAW_alpha)
+                VWIND_OLD[i,j,k], VWIND[i,j,k] = raw_filter(
+                        VWIND_OLD[i,j,k], VWIND[i,j,k], VWIND_NEW,
+                        RAW_nu, RAW_alpha)
+                POTT_OLD[i,j,k], POTT[i,j,k] = raw_filter(
+                        POTT_OLD[i,j,k], POTT[i,j,k], POTT_NEW,
+                        RAW_nu, RAW_alpha)
+                QV_OLD[i,j,k], QV_ = raw_filter(
+                        QV_OLD[i,j,k], QV[i,j,k], QV_NEW,
+                        RAW_nu, RAW_alpha)
+                QC_OLD[i,j,k], QC_ = raw_filter(
+                        QC_OLD[i,j,k], QC[i,j,k], QC_NEW,
+                        RAW_nu, RAW_alpha)
+                # clip negative values
+                QV[i,j,k] = max(QV_, wp(0.))
+                QC[i,j,k] = max(QC_, wp(0.))
+make_leapfrog_step_cpu = njit(parallel=True)(make_leapfrog_step_cpu)
+
+
+def filter_COLP_cpu(COLP_OLD, COLP, COLP_NEW, RAW_nu, RAW_alpha):
+
+    for i in prange(wp_int(0),COLP.shape[0]):
+        for j in range(wp_int(0),COLP.shape[1]):
+            COLP_OLD[i,j,0], COLP[i,j,0] = raw_filter(
+                    COLP_OLD[i,j,0], COLP[i,j,0], COLP_NEW[i,j,0],
+                    RAW_nu, RAW_alpha)
+filter_COLP_cpu = njit(parallel=True)(filter_COLP_cpu)
+
+
+def RK_accumulate_cpu(dVARdt, dVARdt_RK, RK_weight, RK_mode):
+
+    for i in prange(wp_int(0),dVARdt.shape[0]):
+        for j in range(wp_int(0),dVARdt.shape[1]):
+            for k in range(wp_int(0),dVARdt.shape[2]):
+                dVARdt[i,j,k], dVARdt_RK[i,j,k] = RK_accumulate(
+                        dVARdt[i,j,k], dVARdt_RK[i,j,k], RK_weight, RK_mode)
+RK_accumulate_cpu = njit(parallel=True)(RK_accumulate_cpu)
+
+
+def make_COLP_timestep_cpu(COLP_NEW, COLP_OLD, dCOLPdt, dt):
+
+    for i in prange(wp_int(0),COLP_NEW.shape[0]):
+        for j in range(wp_int(0),COLP_NEW.shape[1]):
+            COLP_NEW[i,j,0] = COLP_OLD[i,j,0] + dt*dCOLPdt[i,j,0]
+make_COLP_timestep_cpu = njit(parallel=True)(make_COLP_timestep_cpu)
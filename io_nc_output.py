@@ -113,8 +113,8 @@ def output_to_NC(GR, F):
             #print(field_name)
             #print(dimensions)
 
-            i = np.arange(nb,dimx-1) 
-            j = np.arange(nb,dimy-1) 
+            i = np.arange(nb,dimx-nb)
+            j = np.arange(nb,dimy-nb)
             ii,jj = np.ix_(i, j)
 
             VAR_out = ncf.createVariable(field_name, 'f4', dimensions )
@@ -4,7 +4,7 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20190509
-Last modified:      20190701
+Last modified:      20190715
 License:            MIT
 
 Load namelist and process variables if necessary such that
@@ -17,29 +17,81 @@ from namelist import (working_precision,
                     UVFLX_dif_coef, POTT_dif_coef, COLP_dif_coef,
                     moist_dif_coef,
                     i_comp_mode, nb, lon0_deg, lon1_deg,
-                    pair_top, i_time_stepping, nzsoil,
+                    pair_top, i_time_stepping, RAW_nu, RAW_alpha,
+                    nzsoil,
                     i_radiation, i_surface_scheme, i_microphysics,
+                    i_async_radiation,
                     i_POTT_radiation, i_POTT_microphys,
                     i_moist_microphys,
-                    i_COLP_main_switch, i_UVFLX_main_switch)
+                    i_COLP_main_switch, i_UVFLX_main_switch,
+                    i_polar_filter, i_split_explicit,
+                    split_explicit_n_sub, i_semi_implicit,
+                    semi_implicit_dt_fac, i_fused_tendencies)
 ###############################################################################
 
 ###############################################################################
 # GRID
 ###############################################################################
+if nb < 1:
+    raise ValueError('At least one boundary grid point (nb) required.')
+# the boundary exchanges and stencils work for nb > 1 but no time
+# stepping stage uses the additional boundary points yet
 if nb > 1:
-    raise NotImplementedError('nb > 1 not implemented everywhere.. :-(')
+    raise NotImplementedError('nb > 1 not yet used by any time stepping.')
 if lon0_deg != 0 or lon1_deg != 360:
     raise NotImplementedError('In x direction only periodic boundaries '+
                             'implemented.')
 if nzsoil > 1:
     raise NotImplementedError('nzsoil > 1 not yet implemented')
+if i_polar_filter and i_comp_mode == 2:
+    raise NotImplementedError('Polar filter not yet implemented for GPU.')
 
 ###############################################################################
 # COMPUTATION
 ###############################################################################
-if i_time_stepping == 'RK4':
-    raise NotImplementedError('Runge-Kutta 4th order not yet implemented')
+# stability limit of the time stepping schemes for oscillations
+# (maximum |omega*dt|) relative to the one of the matsuno scheme.
+# Scales the time step derived from CFL.
+# The RAW filter reduces the limit of the leapfrog scheme (unstable
+# at the maximum Courant number 0.64).
+time_stepping_stability = {
+    'MATSUNO':      1.,
+    'LEAPFROG':     0.9,
+    'RK3':          np.sqrt(3.),
+    'RK4':          2.*np.sqrt(2.),
+}
+if i_time_stepping not in time_stepping_stability.keys():
+    raise ValueError('Unknown time stepping ' + str(i_time_stepping) + '.')
+if i_split_explicit and i_time_stepping != 'RK3':
+    raise NotImplementedError('Split-explicit time stepping only '+
+                              'implemented for RK3.')
+if i_split_explicit and split_explicit_n_sub < 1:
+    raise ValueError('split_explicit_n_sub has to be at least 1.')
+if i_split_explicit and i_comp_mode == 2:
+    raise NotImplementedError('Split-explicit time stepping not yet '+
+                              'implemented for GPU.')
+if i_semi_implicit and i_time_stepping != 'MATSUNO':
+    raise NotImplementedError('Semi-implicit time stepping only '+
+                              'implemented for MATSUNO.')
+if i_semi_implicit and i_comp_mode == 2:
+    raise NotImplementedError('Semi-implicit time stepping not yet '+
+                              'implemented for GPU.')
+if i_fused_tendencies and i_comp_mode == 2:
+    raise NotImplementedError('Fused tendencies not yet implemented '+
+                              'for GPU.')
+
+# factor of the time step derived from CFL. For split-explicit time
+# stepping the forward-backward sub steps of the fast terms are limited
+# like the matsuno scheme. For semi-implicit time stepping the external
+# gravity waves do not limit the time step.
+if i_split_explicit:
+    dt_stability_factor = split_explicit_n_sub*time_stepping_stability[
+                                                                'MATSUNO']
+elif i_semi_implicit:
+    dt_stability_factor = semi_implicit_dt_fac*time_stepping_stability[
+                                                                'MATSUNO']
+else:
+    dt_stability_factor = time_stepping_stability[i_time_stepping]
 
 # working precision wp
 wp_int = np.int32
@@ -53,6 +105,10 @@ elif working_precision == 'float64':
     wp = np.float64
     wp_numba = numba.float64
 
+# leapfrog filter coefficients
+RAW_nu = wp(RAW_nu)
+RAW_alpha = wp(RAW_alpha)
+
 # GPU settings
 if i_comp_mode == 2:
     gpu_enable = True
@@ -90,3 +146,8 @@ pair_top = wp(pair_top)
 
 if i_radiation and not i_surface_scheme:
     raise ValueError('i_radiation = 1 requires i_surface_scheme = 1')
+
+# async radiation runs parallel numba kernels from a second thread
+# which requires a thread-safe threading layer (tbb or omp).
+if i_radiation and i_async_radiation:
+    numba.config.THREADING_LAYER = 'threadsafe'
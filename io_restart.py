@@ -4,7 +4,7 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20181001
-Last modified:      20190701
+Last modified:      20190715
 License:            MIT
 
 Functions to write restart files and load model from restart files or initial
@@ -16,7 +16,9 @@ import os
 import pickle
 
 from namelist import (i_comp_mode, i_radiation, i_surface_scheme, njobs_rad,
-                    i_turbulence, i_microphysics, i_moist_main_switch)
+                    i_turbulence, i_microphysics, i_moist_main_switch,
+                    i_async_radiation, rad_coarse_factor,
+                    planck_table_dT, i_rad_incremental, rad_incremental_tol)
 from io_read_namelist import wp, gpu_enable, GPU, CPU
 ###############################################################################
 
@@ -36,12 +38,21 @@ def write_restart(GR, F):
     ## set values for certain variables
     #RAD.done = 1 # make sure async radiation starts to run after loading
 
+    # the result of a running radiation worker is written to the restart
+    # and applied at the next radiation boundary
+    if i_radiation:
+        F.RAD.wait_async_radiation(GR)
+
     # temporarily remove unpicklable GR objects for GPU 
     #if gpu_enable:
     grf_gpu = GR.GRF[GPU]
     fields_gpu = F.device
+    spare_buffers = F.spare_buffers
+    launch_plans = F.launch_plans
     del GR.GRF[GPU]
     del F.device
+    del F.spare_buffers
+    del F.launch_plans
 
     out = {}
     out['GR'] = GR
@@ -53,6 +64,8 @@ def write_restart(GR, F):
     #if gpu_enable:
     GR.GRF[GPU] = grf_gpu
     F.device = fields_gpu
+    F.spare_buffers = spare_buffers
+    F.launch_plans = launch_plans
 
 
 
@@ -99,6 +112,24 @@ def load_existing_fields(GR, directory='restart'):
     if i_radiation:
         F.RAD.done = 1
         F.RAD.njobs_rad = njobs_rad
+        F.RAD.i_async_radiation = i_async_radiation
+        F.RAD.async_worker = None
+        F.RAD.async_timer = None
+        # pending worker result (only used by asynchroneous radiation)
+        if not F.RAD.i_async_radiation:
+            F.RAD.async_fields = None
+            F.RAD.async_result_pending = False
+        F.RAD.mp_pool = None
+        F.RAD.mp_shm = None
+        F.RAD.rad_coarse_factor = rad_coarse_factor
+        F.RAD.set_up_coarse_grid(GR)
+        F.RAD.planck_table_dT = planck_table_dT
+        F.RAD.set_up_planck_table()
+        GR.dt_control.add_event(GR, 'radiation', F.RAD.rad_nth_hour*3600)
+        F.RAD.i_rad_incremental = i_rad_incremental
+        F.RAD.rad_incremental_tol = rad_incremental_tol
+        if F.RAD.njobs_rad > 1:
+            F.RAD.start_worker_pool()
     return(F)
 
 
@@ -4,20 +4,32 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20190525
-Last modified:      20190701
+Last modified:      20190715
 License:            MIT
 
 Setup and store model fields. Have each field in memory (for CPU)
 and if GPU enabled also on GPU.
+Time levels of a prognostic variable (e.g. COLP, COLP_OLD, COLP_NEW)
+are advanced by re-pointing their entries in host (CPU) or device (GPU)
+to another buffer instead of copying the data (set_time_level,
+move_time_level, detach_time_level). Buffers no longer referenced by any
+time level are kept as spare buffers.
+Launch plans (plan, LaunchPlan) resolve the arguments of a factory
+method (GR, GRF and model fields) once and call the method with the
+cached argument tuple instead of building a field dictionary (get) at
+every call. Only if buffers were re-pointed the arguments are resolved
+again (version counters).
 ###############################################################################
 """
 import numpy as np
 from numba import cuda
+from inspect import signature
 from scipy.interpolate import interp2d
 
 from namelist import (i_surface_scheme, nzsoil, i_turbulence,
                       i_radiation, i_load_from_restart, i_load_from_IC,
-                      i_moist_main_switch, i_microphysics,)
+                      i_moist_main_switch, i_microphysics,
+                      i_time_stepping, i_split_explicit)
 from io_read_namelist import wp, wp_int, CPU, GPU
 from io_initial_conditions import initialize_fields
 from io_restart import load_existing_fields 
@@ -36,6 +48,8 @@ class ModelFields:
     SRFC_FIELDS         = 'srfc_fields'
     RAD_TO_DEVICE       = 'rad_to_device_fields'
     RAD_TO_HOST         = 'rad_to_host_fields'
+    DT_CONTROL_FIELDS   = 'dt_control_fields'
+    PROG_FIELDS         = 'prog_fields'
 
     
     def __init__(self, GR, gpu_enable):
@@ -44,6 +58,11 @@ class ModelFields:
             loaded_F = load_existing_fields(GR, directory='restart')
             self.__dict__ = loaded_F.__dict__
             self.device = {}
+            self.spare_buffers = {}
+            self.launch_plans = {}
+            self.version = 0
+            self.time_level_version = 0
+            self.set_field_groups()
             if self.gpu_enable:
                 self.copy_host_to_device(GR, field_group=self.ALL_FIELDS)
         else:
@@ -52,6 +71,13 @@ class ModelFields:
 
             self.host   = {}
             self.device = {}
+            # spare buffers of time levels
+            self.spare_buffers = {}
+            # launch plans of factory methods
+            self.launch_plans = {}
+            # incremented if fields (time levels) are re-pointed
+            self.version = 0
+            self.time_level_version = 0
 
             self.host, self.fdict = allocate_fields(GR)
             self.set_field_groups()
@@ -177,8 +203,13 @@ class ModelFields:
                                         'LWFLXDIV', 'TOTFLXDIV', 'dPOTTdt_RAD'],
             self.RAD_TO_HOST:           ['RHO', 'TAIR', 'PHIVB', 'SOILTEMP',
                                          'SURFALBEDLW', 'SURFALBEDSW', 'QC'],
+            self.DT_CONTROL_FIELDS:     ['UWIND', 'VWIND', 'WWIND', 'TAIR'],
+            # prognostic variables with time level _OLD
+            self.PROG_FIELDS:           ['COLP', 'UWIND', 'VWIND', 'POTT'],
 
         }
+        if i_moist_main_switch:
+            self.field_groups[self.PROG_FIELDS] += ['QV', 'QC']
 
 
     def get(self, field_names, target=CPU):
@@ -199,12 +230,26 @@ class ModelFields:
         elif target == GPU:
             for field_name,field in field_dict.items():
                 self.device[field_name] = field
+        self.version += 1
+
+
+    def plan(self, GR, method, target, **replace):
+        """
+        Launch plan of the factory method for target. replace maps
+        arguments to other fields (e.g. COLP='COLP_NEW').
+        """
+        key = (method, target, tuple(replace.items()))
+        if key not in self.launch_plans:
+            self.launch_plans[key] = LaunchPlan(GR, self, method,
+                                                target, replace)
+        return(self.launch_plans[key])
 
 
     def copy_host_to_device(self, GR, field_group):
         GR.timer.start('copy')
         for field_name in self.field_groups[field_group]:
             self.device[field_name] = cuda.to_device(self.host[field_name]) 
+        self.version += 1
         GR.timer.stop('copy')
 
 
@@ -215,6 +260,198 @@ class ModelFields:
         GR.timer.stop('copy')
 
 
+    def new_time_level(self):
+        """
+        Store time level n of the prognostic variables in the _OLD fields
+        (shared buffers, see set_time_level).
+        """
+        field_names = self.field_groups[self.PROG_FIELDS]
+        self.set_time_level([field_name+'_OLD' for field_name in field_names],
+                            field_names)
+
+
+    def set_time_level(self, set_names, get_names):
+        """
+        Fields set_names refer to the buffers of fields get_names
+        (e.g. COLP_OLD <- COLP) without copying. The buffers are shared
+        until one of the fields is detached (detach_time_level).
+        """
+        fields = self.time_level_fields()
+        for set_name,get_name in zip(set_names, get_names):
+            self.repoint(set_name, fields[get_name])
+
+
+    def move_time_level(self, set_names, get_names):
+        """
+        Fields set_names refer to the buffers of fields get_names
+        (e.g. COLP <- COLP_NEW) and fields get_names get spare buffers
+        with undefined content.
+        """
+        fields = self.time_level_fields()
+        for set_name,get_name in zip(set_names, get_names):
+            self.repoint(set_name, fields[get_name])
+            self.repoint(get_name, self.spare_buffer(get_name))
+
+
+    def detach_time_level(self, field_names):
+        """
+        Fields field_names sharing their buffer with another time level
+        get spare buffers with undefined content. Has to be called before
+        a field is overwritten by a step from a time level it shares
+        the buffer with.
+        """
+        fields = self.time_level_fields()
+        for field_name in field_names:
+            for name in time_level_names(field_name, fields):
+                if name != field_name and fields[name] is fields[field_name]:
+                    self.repoint(field_name, self.spare_buffer(field_name))
+                    break
+
+
+    def time_level_fields(self):
+        if self.gpu_enable:
+            return(self.device)
+        else:
+            return(self.host)
+
+
+    def repoint(self, field_name, buffer):
+        """
+        Let field_name refer to buffer. The previous buffer becomes a spare
+        buffer if no other time level refers to it.
+        """
+        fields = self.time_level_fields()
+        previous = fields[field_name]
+        fields[field_name] = buffer
+        if previous is buffer:
+            return
+        self.time_level_version += 1
+        for name in time_level_names(field_name, fields):
+            if fields[name] is previous:
+                return
+        self.spare_buffers.setdefault(time_level_base(field_name),
+                                      []).append(previous)
+
+
+    def spare_buffer(self, field_name):
+        """
+        Spare buffer of the time levels of field_name. A new one is
+        allocated if none is available (e.g. after loading a restart).
+        """
+        spares = self.spare_buffers.setdefault(time_level_base(field_name),
+                                               [])
+        if len(spares) > 0:
+            return(spares.pop())
+        field = self.time_level_fields()[field_name]
+        if self.gpu_enable:
+            return(cuda.device_array_like(field))
+        else:
+            return(np.empty_like(field))
+
+
+
+
+class LaunchPlan:
+    """
+    Call of a factory method with cached arguments. GR, GRF and the
+    model fields of the method are resolved once. The remaining
+    arguments (dt, RK_stage, ...) are given at every call as keywords.
+    If fields were re-pointed (ModelFields.version) all arguments are
+    resolved again, if only time levels were re-pointed
+    (ModelFields.time_level_version) only the time level fields.
+    """
+
+    def __init__(self, GR, F, method, target, replace):
+        self.GR = GR
+        self.F = F
+        self.method = method
+        self.target = target
+        self.replace = replace
+        self.resolve()
+
+
+    def __call__(self, **scalars):
+        if self.version != self.F.version:
+            self.resolve()
+        elif self.time_level_version != self.F.time_level_version:
+            self.resolve_time_levels()
+        return(self.method(*self.args, **self.kwargs, **scalars))
+
+
+    def resolve(self):
+        """
+        Arguments in front of the first scalar argument are passed
+        positionally, fields behind it as keywords.
+        """
+        if self.target == CPU:
+            fields = self.F.host
+        elif self.target == GPU:
+            fields = self.F.device
+        args = []
+        self.kwargs = {}
+        # (position or keyword, field name) of time level fields
+        self.time_levels = []
+        positional = True
+        for arg_name in signature(self.method).parameters:
+            field_name = self.replace.get(arg_name, arg_name)
+            if arg_name == 'GR':
+                value = self.GR
+            elif arg_name == 'GRF':
+                value = self.GR.GRF[self.target]
+            elif field_name in fields:
+                value = fields[field_name]
+                if len(time_level_names(field_name, fields)) > 1:
+                    if positional:
+                        self.time_levels.append((len(args), field_name))
+                    else:
+                        self.time_levels.append((arg_name, field_name))
+            else:
+                positional = False
+                continue
+            if positional:
+                args.append(value)
+            else:
+                self.kwargs[arg_name] = value
+        self.args = tuple(args)
+        self.fields = fields
+        self.version = self.F.version
+        self.time_level_version = self.F.time_level_version
+
+
+    def resolve_time_levels(self):
+        args = list(self.args)
+        for slot,field_name in self.time_levels:
+            if isinstance(slot, str):
+                self.kwargs[slot] = self.fields[field_name]
+            else:
+                args[slot] = self.fields[field_name]
+        self.args = tuple(args)
+        self.time_level_version = self.F.time_level_version
+
+
+
+# suffixes of the time levels of a prognostic variable
+time_level_suffixes = ['', '_OLD', '_NEW', '_SUB']
+
+def time_level_base(field_name):
+    """
+    Name of the prognostic variable of time level field_name.
+    """
+    for suffix in time_level_suffixes[1:]:
+        if field_name.endswith(suffix):
+            return(field_name[:-len(suffix)])
+    return(field_name)
+
+
+def time_level_names(field_name, fields):
+    """
+    Names of all allocated time levels of the variable of field_name.
+    """
+    base = time_level_base(field_name)
+    return([base + suffix for suffix in time_level_suffixes
+            if base + suffix in fields])
+
+
 def allocate_fields(GR):
     """
     1 DYNAMICAL CORE FIELDS
@@ -474,6 +711,32 @@ def allocate_fields(GR):
     'dPOTTdt_MIC':   {'stgx':0,'stgy':0,'dimz':GR.nz ,'dtype':wp},
     }
 
+    # tendency registers of Runge-Kutta 4
+    if i_time_stepping == 'RK4':
+        fdict.update({
+        'dCOLPdt_RK':    {'stgx':0,'stgy':0,'dimz':1     ,'dtype':wp},
+        'dUFLXdt_RK':    {'stgx':1,'stgy':0,'dimz':GR.nz ,'dtype':wp},
+        'dVFLXdt_RK':    {'stgx':0,'stgy':1,'dimz':GR.nz ,'dtype':wp},
+        'dPOTTdt_RK':    {'stgx':0,'stgy':0,'dimz':GR.nz ,'dtype':wp},
+        'dQVdt_RK':      {'stgx':0,'stgy':0,'dimz':GR.nz ,'dtype':wp},
+        'dQCdt_RK':      {'stgx':0,'stgy':0,'dimz':GR.nz ,'dtype':wp},
+        })
+
+    # split-explicit sub steps
+    if i_split_explicit:
+        fdict.update({
+        # column pressure at the current sub step [Pa]
+        'COLP_SUB':      {'stgx':0,'stgy':0,'dimz':1     ,'dtype':wp},
+        # pressure gradient tendency of the current sub step
+        'dUFLXdt_SUB':   {'stgx':1,'stgy':0,'dimz':GR.nz ,'dtype':wp},
+        'dVFLXdt_SUB':   {'stgx':0,'stgy':1,'dimz':GR.nz ,'dtype':wp},
+        # mass fluxes averaged over the sub steps
+        'UFLX_MEAN':     {'stgx':1,'stgy':0,'dimz':GR.nz ,'dtype':wp},
+        'VFLX_MEAN':     {'stgx':0,'stgy':1,'dimz':GR.nz ,'dtype':wp},
+        # vertical mass flux COLP_NEW*WWIND averaged over the sub steps
+        'WWIND_MEAN':    {'stgx':0,'stgy':0,'dimz':GR.nzs,'dtype':wp},
+        })
+
     for key,set in fdict.items():
         dimx = GR.nx + 2*GR.nb
         if set['stgx']:
@@ -4,7 +4,7 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20181001
-Last modified:      20190701
+Last modified:      20190715
 License:            MIT
 
 Set up computational and geographical grid for simulation.
@@ -21,17 +21,21 @@ from numba import cuda
 from namelist import (nz, nb,
                       lon0_deg, lon1_deg, dlon_deg,
                       lat0_deg, lat1_deg, dlat_deg,
-                      CFL, i_load_from_IC, IC_file_name,
+                      CFL,
+                      i_polar_filter, polar_filter_lat, i_semi_implicit,
+                      i_load_from_IC, IC_file_name,
                       i_load_from_restart, i_restart_nth_day,
                       i_out_nth_hour, i_sim_n_days,
                       GMT_initialization)
 from io_read_namelist import (wp_int, wp, gpu_enable, CPU, GPU,
                             POTT_dif_coef, UVFLX_dif_coef,
-                            moist_dif_coef)
+                            moist_dif_coef, dt_stability_factor)
 from io_constants import con_rE, con_omega
 from io_restart import load_restart_grid
 from io_initial_conditions import set_up_sigma_levels
 from misc_utilities import Timer
+from misc_tiling import set_tiles, initial_tile_size
+from main_timestep import TimeStepControl
 ###############################################################################
 
 ###############################################################################
@@ -100,6 +104,13 @@ class Grid:
         else:
             self.create_new_grid()
 
+        # TIME STEP CONTROL
+        if i_load_from_restart:
+            # continue loaded time step control
+            self.dt_control.update_namelist(self)
+        else:
+            self.dt_control = TimeStepControl(self)
+
         # Get Grid from simulation providing initial conditions
         if i_load_from_IC:
             with open(IC_file_name, 'rb') as f:
@@ -254,13 +265,65 @@ class Grid:
         self.sigma_vb     = np.expand_dims(
                             np.expand_dims(self.sigma_vb , 0),0)
 
+        # POLAR FILTER
+        # zonal waves poleward of polar_filter_lat are damped such that
+        # the grid spacing at polar_filter_lat is relevant for the
+        # CFL criterion (dx_courant).
+        self.dx_courant = np.copy(self.dx)
+        if i_polar_filter:
+            self.polar_filter_lat_rad = polar_filter_lat/180*np.pi
+            dx_crit = (np.cos(self.polar_filter_lat_rad) *
+                            self.dlon_rad_1D*con_rE)
+            self.dx_courant = np.maximum(self.dx_courant, dx_crit)
+            # filtered rows at mass points and at js points
+            # and response of zonal wave numbers (wave number, row, 1)
+            for stag, lat_rad in [('', self.lat_rad),
+                                  ('_js', self.lat_js_rad)]:
+                lats = lat_rad[self.nb,:,0]
+                rows = np.argwhere(np.abs(lats) >
+                                   self.polar_filter_lat_rad + 1E-9)[:,0]
+                response = np.ones((self.nx//2+1,len(rows),1), dtype=wp)
+                for jr,j in enumerate(rows):
+                    response[:,jr,0] = polar_filter_response(lats[j],
+                                self.polar_filter_lat_rad,
+                                self.dlon_rad_1D, self.nx)
+                setattr(self, 'polar_filter_rows'+stag, rows)
+                setattr(self, 'polar_filter_response'+stag, response)
+
+        # SEMI-IMPLICIT
+        # row coefficients (latitude) of the discrete divergence and
+        # gradient operators used in the Helmholtz equation of the
+        # external gravity wave mode (see dyn_semi_implicit.py).
+        if i_semi_implicit:
+            A_row = self.A[self.nb,self.nb:self.ny+self.nb,0]
+            A_js_row = np.full(self.nys, np.nan)
+            A_js_row[1:-1] = (A_row[1:] + A_row[:-1])/2
+            dyis_row = self.dyis[self.nb,self.nb:self.ny+self.nb,0]
+            # no flux across the meridional domain boundaries
+            self.si_dxjs = np.copy(self.dxjs[self.nb,
+                                        self.nb:self.nys+self.nb,0])
+            self.si_dxjs[[0,-1]] = 0.
+            self.si_div_x = dyis_row/A_row
+            self.si_div_y = 1./A_row
+            self.si_grad_x = dyis_row/A_row
+            self.si_grad_y = np.zeros(self.nys)
+            self.si_grad_y[1:-1] = self.si_dxjs[1:-1]/A_js_row[1:-1]
+            # zonal part: eigenvalues of the periodic second difference
+            self.si_eigen = 4.*np.sin(np.pi*np.arange(self.nx//2+1)/
+                                      self.nx)**2
+            self.si_zonal = (dyis_row/A_row)**2
+            # meridional part: coupling to row j+1 (p) and j-1 (m)
+            self.si_merid_p = self.si_dxjs[1:]*self.si_grad_y[1:]/A_row
+            self.si_merid_m = self.si_dxjs[:-1]*self.si_grad_y[:-1]/A_row
+
         # TIME STEP
-        mindx = np.nanmin(self.dx)
+        mindx = np.nanmin(self.dx_courant)
         self.CFL = CFL
         self.i_out_nth_hour = i_out_nth_hour
         self.nc_output_count = 0
         self.i_sim_n_days = i_sim_n_days
-        self.dt = int(self.CFL*mindx/400)
+        self.dt = int(self.CFL*dt_stability_factor*
+                      mindx/400)
         while i_out_nth_hour*3600 % self.dt > 0:
             self.dt -= 1
         self.nts = i_sim_n_days*3600*24/self.dt
@@ -312,6 +375,8 @@ class Grid:
             if gpu_enable:
                 self.GRF[GPU][field_name] = cuda.to_device(
                                     self.GRF[CPU][field_name])
+        # tiles of the CPU stencil kernels
+        set_tiles(self, initial_tile_size(self))
                                     
 
         
@@ -323,37 +388,21 @@ class Grid:
                    Can therefore be used within grid.py and initial_conditiony.py
         """
 
-        dim2 = False
-        if len(FIELD.shape) == 2:
-            dim2 = True
-            fnx,fny = FIELD.shape
-        elif len(FIELD.shape) == 3:
-            fnx,fny,fnz = FIELD.shape
-
-        # zonal boundaries
-        if fnx == self.nxs+2*self.nb: # staggered in x
-            FIELD[0,::] = FIELD[self.nxs-1,::] 
-            FIELD[self.nxs,::] = FIELD[1,::] 
-        else:     # unstaggered in x
-            FIELD[0,::] = FIELD[self.nx,::] 
-            FIELD[self.nx+1,::] = FIELD[1,::] 
-
-        if dim2:
-            # meridional boundaries
-            if fny == self.nys+2*self.nb: # staggered in y
-                for j in [0,1,self.nys,self.nys+1]:
-                    FIELD[:,j] = wp(0.)
-            else:     # unstaggered in y
-                FIELD[:,0] = FIELD[:,1] 
-                FIELD[:,self.ny+1] = FIELD[:,self.ny] 
-        else:
-            # meridional boundaries
-            if fny == self.nys+2*self.nb: # staggered in y
-                for j in [0,1,self.nys,self.nys+1]:
-                    FIELD[:,j,:] = wp(0.)
-            else:     # unstaggered in y
-                FIELD[:,0,:] = FIELD[:,1,:] 
-                FIELD[:,self.ny+1,:] = FIELD[:,self.ny,:] 
+        nb = self.nb
+        fnx,fny = FIELD.shape[0:2]
+
+        # zonal boundaries (periodic, staggered fields contain the
+        # periodic point twice: nb and nx+nb)
+        FIELD[:nb,::] = FIELD[self.nx:self.nx+nb,::]
+        FIELD[self.nx+nb:,::] = FIELD[nb:fnx-self.nx,::]
+
+        # meridional boundaries
+        if fny == self.nys+2*nb: # staggered in y (incl. poles)
+            FIELD[:,:nb+1] = wp(0.)
+            FIELD[:,self.nys+nb-1:] = wp(0.)
+        else:     # unstaggered in y
+            FIELD[:,:nb] = FIELD[:,nb:nb+1]
+            FIELD[:,self.ny+nb:] = FIELD[:,self.ny+nb-1:self.ny+nb]
 
         return(FIELD)
 
@@ -362,3 +411,18 @@ def lat_lon_recangle_area(lat,dlon,dlat):
     A = np.cos(lat) * dlon * dlat * con_rE**2
     return(A)
 
+
+def polar_filter_response(lat, lat_crit, dlon, nx):
+    """
+    Response of the zonal wave numbers k = 0 to nx/2 at latitude lat.
+    The amplitude of wave k is multiplied by
+    cos(lat)/(cos(lat_crit)*sin(k*dlon/2)) where this is smaller than
+    one. Thus no wave is faster (in grid points per time step) than the
+    shortest wave at lat_crit.
+    """
+    k = np.arange(nx//2+1)
+    sin_k = np.sin(k*dlon/2)
+    response = np.ones(nx//2+1)
+    response[1:] = np.minimum(1., np.cos(lat) /
+                        (np.cos(lat_crit) * sin_k[1:]))
+    return(response)
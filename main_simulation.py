@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+"""
+###############################################################################
+Author:             Christoph Heim
+Date created:       20190715
+Last modified:      20190715
+License:            MIT
+
+Simulation object wrapping grid (Grid), model fields (ModelFields) and
+the time loop such that the model can be driven from Python:
+    sim = Simulation()
+    sim.setup()             # grid, fields, output at time step 0
+    sim.step(10)            # advance 10 time steps
+    sim.run_until(3600*24)  # advance until simulation time [s]
+    sim.run_until()         # advance until end (i_sim_n_days)
+    sim.finalize()          # timer report
+Several simulations (e.g. benchmarks or restarts) can be run one after
+the other in the same process. Kernels compiled by numba and the
+module level objects of the kernels (e.g. Tendencies, polar filter,
+semi-implicit solver) are reused. The configuration is read from
+namelist.py at import and is thus the same for all simulations of a
+process. Not possible with radiation worker processes (njobs_rad > 1):
+they are forked when the radiation is set up, which hangs once numba
+has started its threads (first parallel kernel). Such a simulation has
+to be the only one of its process.
+###############################################################################
+"""
+import numpy as np
+
+from namelist import (i_time_stepping, i_save_to_restart, i_comp_mode,
+                      i_radiation, njobs_rad)
+from io_read_namelist import (gpu_enable, CPU, GPU)
+from io_nc_output import constant_fields_to_NC, output_to_NC
+from io_restart import write_restart
+from io_functions import (print_ts_info)
+from main_grid import Grid
+from main_fields import ModelFields
+from main_timestep import PhysicsSchedule
+from misc_tiling import tune_tile_size
+from dyn_tendencies import compute_tendencies
+if i_time_stepping == 'MATSUNO':
+    from dyn_matsuno import step_matsuno as time_stepper
+elif i_time_stepping == 'LEAPFROG':
+    from dyn_leapfrog import step_leapfrog as time_stepper
+elif i_time_stepping == 'RK3':
+    from dyn_runge_kutta import step_RK3 as time_stepper
+elif i_time_stepping == 'RK4':
+    from dyn_runge_kutta import step_RK4 as time_stepper
+from dyn_org_discretizations import DiagnosticsFactory
+###############################################################################
+if i_comp_mode == 1:
+    Diagnostics = DiagnosticsFactory(target=CPU)
+elif i_comp_mode == 2:
+    Diagnostics = DiagnosticsFactory(target=GPU)
+
+
+class Simulation:
+
+    # number of simulations created in this process
+    n_created = 0
+
+    def __init__(self):
+        if Simulation.n_created > 0 and i_radiation and njobs_rad > 1:
+            raise ValueError('Only one simulation per process with ' +
+                        'radiation worker processes (njobs_rad > 1).')
+        Simulation.n_created += 1
+        self.GR = None
+        self.F = None
+        self.PHY = None
+
+
+    def setup(self):
+        """
+        Create model grid and fields (from initial conditions or restart
+        file) and write output at time step 0.
+        """
+        ################################################################
+        # CREATE MODEL GRID AND FIELDS
+        ################################################################
+        self.GR = Grid()
+        self.F = ModelFields(self.GR, gpu_enable)
+        self.PHY = PhysicsSchedule(self.GR)
+        GR = self.GR
+        F = self.F
+
+        ################################################################
+        # OUTPUT AT TIMESTEP 0 (before start of simulation)
+        ################################################################
+        constant_fields_to_NC(GR, F)
+
+        ## TODO is this necessary?
+        GR.timer.start('diag')
+        F.plan(GR, Diagnostics.primary_diag, Diagnostics.target)()
+        GR.timer.stop('diag')
+
+        # tile size of CPU kernels (benchmarked once per grid shape)
+        if i_comp_mode == 1:
+            tune_tile_size(GR, F, compute_tendencies)
+
+        self.sim_time_sec_start = GR.sim_time_sec
+
+
+    def finished(self):
+        return(self.GR.dt_control.finished(self.GR))
+
+
+    def step(self, n=1):
+        """
+        Advance n time steps (at most until the end of the simulation).
+        """
+        for i in range(n):
+            if self.finished():
+                break
+            self.time_step()
+
+
+    def run_until(self, sim_time_sec=None):
+        """
+        Advance until the simulation time sim_time_sec [s] is reached
+        (default: end of simulation).
+        """
+        while not self.finished():
+            if (sim_time_sec is not None and
+                self.GR.sim_time_sec >= sim_time_sec - 1E-6):
+                break
+            self.time_step()
+
+
+    def time_step(self):
+        GR = self.GR
+        F = self.F
+        PHY = self.PHY
+        GR.timer.start('total')
+
+        ################################################################
+        # SIMULATION STATUS
+        ################################################################
+        GR.dt_control.start_timestep(GR, F)
+        print_ts_info(GR, F)
+
+
+        ################################################################
+        # SECONDARY DIAGNOSTICS (related to physics, but not affecting
+        #                        dynamics)
+        ################################################################
+        GR.timer.start('diag')
+        F.plan(GR, Diagnostics.secondary_diag, Diagnostics.target)()
+        GR.timer.stop('diag')
+
+
+        ################################################################
+        # TURBULENCE
+        ################################################################
+        if PHY.due(GR, 'turbulence'):
+            GR.timer.start('turb')
+            F.plan(GR, F.TURB.compute_turbulence, F.TURB.target)()
+            GR.timer.stop('turb')
+
+
+        ################################################################
+        # MICROPHYSICS
+        ################################################################
+        if PHY.due(GR, 'microphysics'):
+            GR.timer.start('mic')
+            F.plan(GR, F.MIC.compute_microhpysics, F.MIC.target)(
+                                        dt=PHY.get_dt(GR, 'microphysics'))
+            GR.timer.stop('mic')
+
+
+        ################################################################
+        # EARTH SURFACE
+        ################################################################
+        if PHY.due(GR, 'surface'):
+            GR.timer.start('srfc')
+            F.plan(GR, F.SURF.advance_timestep, F.SURF.target)(
+                                        dt=PHY.get_dt(GR, 'surface'))
+            GR.timer.stop('srfc')
+
+
+        ################################################################
+        # RADIATION
+        ################################################################
+        if PHY.due(GR, 'radiation'):
+            GR.timer.start('rad')
+            F.RAD.launch_radiation_calc(GR, F)
+            GR.timer.stop('rad')
+
+
+        ################################################################
+        # DYNAMICS
+        ################################################################
+        GR.timer.start('dyn')
+        time_stepper(GR, F)
+        GR.timer.stop('dyn')
+
+
+        ################################################################
+        # WRITE NC OUTPUT
+        ################################################################
+        if GR.dt_control.due(GR, 'output'):
+            # copy GPU fields to CPU
+            if i_comp_mode == 2:
+                F.copy_device_to_host(GR, F.ALL_FIELDS)
+            # write file
+            GR.timer.start('IO')
+            GR.nc_output_count += 1
+            output_to_NC(GR, F)
+            GR.timer.stop('IO')
+
+
+        ################################################################
+        # WRITE RESTART FILE
+        ################################################################
+        if GR.dt_control.due(GR, 'restart') and i_save_to_restart:
+            # copy GPU fields to CPU
+            if i_comp_mode == 2:
+                F.copy_device_to_host(GR, F.ALL_FIELDS)
+            # write file
+            GR.timer.start('IO')
+            write_restart(GR, F)
+            GR.timer.stop('IO')
+
+
+        GR.timer.stop('total')
+
+
+    def finalize(self):
+        """
+        Wait for background radiation, shut down radiation workers and
+        print timer report.
+        """
+        GR = self.GR
+        F = self.F
+        RAD = getattr(F, 'RAD', None)
+        if RAD is not None:
+            RAD.wait_async_radiation(GR)
+            RAD.close_multiprocessing()
+
+        # no time step computed
+        if 'total' not in GR.timer.timings:
+            return
+        GR.timer.print_report()
+        self.PHY.print_report(GR)
+        # cost per simulated day (e.g. to compare time stepping schemes)
+        sim_days = (GR.sim_time_sec - self.sim_time_sec_start)/86400
+        if sim_days > 0:
+            print('cost per simulated day: ' +
+                    str(np.round(GR.timer.timings['total']/sim_days, 1)) +
+                    ' s (dt ' + str(np.round(GR.dt,1)) + ' s, ' +
+                    str(GR.ts) + ' time steps)')
@@ -0,0 +1,328 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+"""
+###############################################################################
+Author:             Christoph Heim
+Date created:       20190712
+Last modified:      20190715
+License:            MIT
+
+Time step control.
+TimeStepControl (GR.dt_control) advances the simulation time and
+decides when events (nc output, restart, radiation, ...) are due.
+- i_adaptive_dt = 0: constant time step GR.dt from Grid. Events are due
+  every nth time step as before.
+- i_adaptive_dt = 1: every adaptive_dt_nth_ts time steps the maximum
+  Courant number of the current state is computed from UWIND, VWIND,
+  WWIND and the gravity wave speed (compiled reduction, zonal grid
+  spacing dx_courant accounts for the polar filter) and GR.dt is
+  adjusted to the target Courant number
+  (CFL * stability limit of time stepping scheme or number of
+  split-explicit sub steps) within
+  [adaptive_dt_min, adaptive_dt_max]. Time steps are shortened
+  such that the simulation lands exactly on the times of all events.
+  Every change of the time step is logged.
+  After a restart the loaded time step control is continued.
+PhysicsSchedule decides when the physics components are called.
+- Every component is called every physics_call_sec[component] seconds
+  (0: every time step, radiation: every rad_nth_hour) and always in the
+  first time step of the simulation. After a restart the fields of the
+  last call are read from the restart file and the components are only
+  called when due. The call intervals are registered as events
+  such that with i_adaptive_dt the calls land on exact times.
+- Between two calls the fields computed by a component remain unchanged
+  and are reused by the dynamics. Components integrating in time
+  (microphysics, surface) are advanced over the call interval at once.
+- Number of calls and computing time of each component are reported
+  at the end of the simulation.
+###############################################################################
+"""
+import numpy as np
+from datetime import timedelta
+from numba import njit, prange
+
+from namelist import (i_adaptive_dt, adaptive_dt_nth_ts,
+                      adaptive_dt_min, adaptive_dt_max, adaptive_dt_tol,
+                      CFL, i_comp_mode,
+                      i_out_nth_hour, i_restart_nth_day, i_sim_n_days,
+                      i_turbulence, i_microphysics, i_surface_scheme,
+                      i_radiation, physics_call_sec, rad_nth_hour,
+                      nb)
+from io_read_namelist import wp, wp_int, dt_stability_factor
+from io_constants import con_Rd, con_cp
+###############################################################################
+
+# squared gravity wave speed divided by air temperature
+gravity_wave_fac = wp(con_cp/(con_cp-con_Rd)*con_Rd)
+
+class TimeStepControl:
+
+    def __init__(self, GR):
+
+        # GMT at simulation time 0
+        self.GMT_start = GR.GMT - timedelta(seconds=GR.sim_time_sec)
+        # time step that would be used without any events
+        self.dt_free = GR.dt
+        # time step has changed in the current time step
+        self.dt_changed = False
+        # log of time step changes (ts, sim_time_sec, courant, dt)
+        self.log = []
+
+        # EVENTS
+        # interval [s] of events
+        self.event_interval = {}
+        # interval [time steps] of events for constant time step
+        self.event_nth_ts = {}
+        # simulation time of next occurrence of events
+        self.event_next = {}
+        # events due at the end of the current and last time step
+        self.due_events = set()
+        self.last_due_events = set()
+
+        self.update_namelist(GR)
+
+
+    def update_namelist(self, GR):
+        """
+        Set the time step settings and the output, restart and end events
+        from the namelist. Called again after loading from a restart
+        file, where the remaining state (free time step, events due in
+        the last time step) is kept.
+        """
+        self.i_adaptive_dt = i_adaptive_dt
+        self.nth_ts = adaptive_dt_nth_ts
+        self.dt_min = adaptive_dt_min
+        self.dt_max = adaptive_dt_max
+        self.dt_tol = adaptive_dt_tol
+        self.target_courant = CFL*dt_stability_factor
+
+        self.add_event(GR, 'output', i_out_nth_hour*3600,
+                       nth_ts=GR.i_out_nth_ts)
+        self.add_event(GR, 'restart', i_restart_nth_day*3600*24,
+                       nth_ts=GR.i_restart_nth_ts)
+        self.add_event(GR, 'end', i_sim_n_days*3600*24)
+
+
+    def add_event(self, GR, name, interval, nth_ts=None):
+        """
+        Register event occurring every interval seconds of simulation
+        time (for constant time step every nth_ts time steps, default
+        int(interval/GR.dt)).
+        """
+        if nth_ts is None:
+            nth_ts = int(interval/GR.dt)
+        self.event_interval[name] = interval
+        self.event_nth_ts[name] = max(int(nth_ts), 1)
+        self.event_next[name] = (np.floor(GR.sim_time_sec/interval + 1E-9) +
+                                 1) * interval
+
+
+    def due(self, GR, name):
+        """
+        True if the event is due at the end of the current time step.
+        """
+        if self.i_adaptive_dt:
+            return(name in self.due_events)
+        else:
+            return(GR.ts % self.event_nth_ts[name] == 0)
+
+
+    def was_due(self, GR, name):
+        """
+        True if the event was due at the end of the last time step.
+        """
+        if self.i_adaptive_dt:
+            return(name in self.last_due_events)
+        else:
+            return((GR.ts - 1) % self.event_nth_ts[name] == 0)
+
+
+    def get_event_interval(self, GR, name):
+        """
+        Simulation time [s] between two occurrences of the event.
+        """
+        if self.i_adaptive_dt:
+            return(self.event_interval[name])
+        else:
+            return(self.event_nth_ts[name]*GR.dt)
+
+
+    def finished(self, GR):
+        if self.i_adaptive_dt:
+            return(GR.sim_time_sec >= self.event_interval['end'] - 1E-6)
+        else:
+            return(GR.ts >= GR.nts)
+
+
+    def start_timestep(self, GR, F):
+        """
+        Increment time step counter, set GR.dt of the current time step
+        and advance simulation time.
+        """
+        GR.ts += 1
+
+        if not self.i_adaptive_dt:
+            GR.sim_time_sec = GR.ts*GR.dt
+            GR.GMT += timedelta(seconds=GR.dt)
+            return
+
+        GR.timer.start('dt')
+        dt_old = GR.dt
+        if (GR.ts - 1) % self.nth_ts == 0:
+            self.adapt_dt(GR, F)
+
+        # land exactly on next event
+        next_time = min(self.event_next.values())
+        gap = next_time - GR.sim_time_sec
+        n_steps = np.ceil(gap/self.dt_free - 1E-9)
+        GR.dt = gap/max(n_steps, 1.)
+        self.dt_changed = not np.isclose(GR.dt, dt_old, rtol=1E-9)
+
+        self.last_due_events = self.due_events
+        self.due_events = set()
+        if n_steps <= 1:
+            GR.sim_time_sec = next_time
+            for name,time in self.event_next.items():
+                if abs(time - next_time) < 1E-6:
+                    self.due_events.add(name)
+                    self.event_next[name] += self.event_interval[name]
+        else:
+            GR.sim_time_sec += GR.dt
+        GR.GMT = self.GMT_start + timedelta(seconds=GR.sim_time_sec)
+        GR.timer.stop('dt')
+
+
+    def adapt_dt(self, GR, F):
+        """
+        Set the free time step from the maximum Courant number of the
+        current state.
+        """
+        if i_comp_mode == 2:
+            F.copy_device_to_host(GR, F.DT_CONTROL_FIELDS)
+        courant_rate = np.max(calc_courant_rate_cpu(
+                            F.host['UWIND'], F.host['VWIND'],
+                            F.host['WWIND'], F.host['TAIR'],
+                            GR.dx_courant, GR.dyis, GR.dsigma))
+        courant = courant_rate*self.dt_free
+
+        # time step reaching the target Courant number
+        dt_target = self.target_courant/courant_rate
+        # new time steps keep a margin of adaptive_dt_tol to the target
+        dt_new = min(max(dt_target/(1. + self.dt_tol), self.dt_min),
+                     self.dt_max)
+        # decrease if target is exceeded, increase only beyond tolerance
+        if ( (dt_target < self.dt_free) or
+             (dt_new > (1. + self.dt_tol)*self.dt_free) ):
+            print('ADAPTIVE DT: ts ' + str(GR.ts) + ' max. Courant number ' +
+                    str(np.round(courant,3)) + ' dt ' +
+                    str(np.round(self.dt_free,1)) + ' -> ' +
+                    str(np.round(dt_new,1)) + ' s')
+            if dt_new > dt_target:
+                print('WARNING: target Courant number ' +
+                        str(np.round(self.target_courant,3)) +
+                        ' exceeded at adaptive_dt_min.')
+            self.dt_free = dt_new
+            self.log.append((GR.ts, GR.sim_time_sec, courant, dt_new))
+
+
+
+class PhysicsSchedule:
+
+    def __init__(self, GR):
+
+        # component: (switch, timer key, call interval [s])
+        self.table = {
+            'turbulence':   (i_turbulence,      'turb',
+                             physics_call_sec['turbulence']),
+            'microphysics': (i_microphysics,    'mic',
+                             physics_call_sec['microphysics']),
+            'surface':      (i_surface_scheme,  'srfc',
+                             physics_call_sec['surface']),
+            'radiation':    (i_radiation,       'rad',
+                             rad_nth_hour*3600),
+        }
+
+        # first time step of the simulation (after a restart the fields
+        # of the last call are taken from the restart file)
+        self.first_ts = 1
+        self.n_calls = {}
+        for name,(switch,timer_key,interval) in self.table.items():
+            if not switch:
+                continue
+            if interval < 0:
+                raise ValueError('Negative call interval of ' + name + '.')
+            self.n_calls[name] = 0
+            # radiation event is registered by the radiation scheme
+            if interval > 0 and name != 'radiation':
+                GR.dt_control.add_event(GR, name, interval)
+
+
+    def due(self, GR, name):
+        """
+        True if the component has to be called in the current time step.
+        Counts the calls.
+        """
+        if name not in self.n_calls:
+            return(False)
+        interval = self.table[name][2]
+        if name == 'radiation':
+            # radiation decides itself (see rad_main.py)
+            due = GR.dt_control.due(GR, name)
+        elif interval == 0 or GR.ts == self.first_ts:
+            due = True
+        else:
+            due = GR.dt_control.was_due(GR, name)
+        if due:
+            self.n_calls[name] += 1
+        return(due)
+
+
+    def get_dt(self, GR, name):
+        """
+        Time step [s] from the current call of the component to the next.
+        """
+        if self.table[name][2] == 0:
+            return(GR.dt)
+        return(GR.dt_control.get_event_interval(GR, name))
+
+
+    def print_report(self, GR):
+        print('#### physics calls')
+        for name,n_calls in self.n_calls.items():
+            timer_key = self.table[name][1]
+            time = GR.timer.timings.get(timer_key, 0.)
+            print(name + '\t' + str(n_calls) + ' \tcalls\t' +
+                str(np.round(time,1)) + ' \tsec\t' +
+                str(np.round(1000*time/max(n_calls,1),1)) + ' \tms/call')
+
+
+
+###############################################################################
+### SPECIALIZE FOR CPU
+###############################################################################
+def launch_numba_cpu(UWIND, VWIND, WWIND, TAIR, dx, dyis, dsigma):
+    """
+    Maximum Courant number per time step [s-1] for each zonal index.
+    Horizontal: wind speed plus gravity wave speed over grid spacing,
+    vertical: sigma velocity over layer thickness.
+    """
+    nx = TAIR.shape[0]-2*nb
+    ny = TAIR.shape[1]-2*nb
+    nz = TAIR.shape[2]
+    rate = np.zeros(nx+2*nb, dtype=TAIR.dtype)
+
+    for i in prange(nb,nx+nb):
+        rate_i = wp(0.)
+        for j in range(nb,ny+nb):
+            for k in range(wp_int(0),nz):
+                c = np.sqrt(gravity_wave_fac*TAIR[i,j,k])
+                u = max(abs(UWIND[i,j,k]), abs(UWIND[i+1,j,k]))
+                v = max(abs(VWIND[i,j,k]), abs(VWIND[i,j+1,k]))
+                w = max(abs(WWIND[i,j,k]), abs(WWIND[i,j,k+1]))
+                rate_i = max(rate_i, (u + c)/dx[i,j,0])
+                rate_i = max(rate_i, (v + c)/dyis[i,j,0])
+                rate_i = max(rate_i, w/dsigma[0,0,k])
+        rate[i] = rate_i
+    return(rate)
+
+calc_courant_rate_cpu = njit(parallel=True)(launch_numba_cpu)
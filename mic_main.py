@@ -4,7 +4,7 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20190630
-Last modified:      20190701
+Last modified:      20190715
 License:            MIT
 
 Main script of microphysics.
@@ -49,12 +49,19 @@ class Microphysics:
         ### specific cloud liquid water content
 
     def compute_microhpysics(self, GR, QV, QC, QR, POTT, TAIR,
-                            PAIR, RHO, dPOTTdt_MIC, RAIN, RAINRATE, ACCRAIN):
+                            PAIR, RHO, dPOTTdt_MIC, RAIN, RAINRATE, ACCRAIN,
+                            dt=None):
+        """
+        Time step dt until the next call (default GR.dt).
+        """
+        if dt is None:
+            dt = GR.dt
+
         if self.target == GPU:
             compute_microphysics_gpu[bpg, tpb](QV, QC, QR, POTT, TAIR,
                                             PAIR, RHO, dPOTTdt_MIC,
-                                            RAIN, RAINRATE, ACCRAIN, GR.dt,
-                                            GR.ts % GR.i_out_nth_ts == 1)
+                                            RAIN, RAINRATE, ACCRAIN, dt,
+                                    GR.dt_control.was_due(GR, 'output'))
 
         #elif self.target == CPU:
         #    compute_microphysics_cpu(QV, QC, TAIR)
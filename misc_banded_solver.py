@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+"""
+###############################################################################
+Author:             Christoph Heim
+Date created:       20190708
+Last modified:      20190708
+License:            MIT
+
+Compiled solver for banded linear systems (e.g. the vertical column
+systems of the radiation scheme):
+- solve_banded_col: one column, callable from compiled code.
+- solve_banded_batched_cpu: many columns stacked as (ncols, kl+ku+1, n)
+  solved in parallel. All work arrays are passed in by the caller
+  (see allocate_banded_work) such that no allocation happens per call.
+Both use the storage format of scipy.linalg.solve_banded.
+
+Run this file to benchmark against scipy.linalg.solve_banded.
+###############################################################################
+"""
+import time
+import numpy as np
+from numba import njit, prange
+###############################################################################
+
+
+###############################################################################
+### DEVICE UNSPECIFIC PYTHON FUNCTIONS
+###############################################################################
+def solve_banded_col_py(kl, ku, ab, b, lu, x):
+    """
+    Solve the banded system given in scipy.linalg.solve_banded storage
+    (ab[ku+i-j,j] = a[i,j]) by Gaussian elimination with partial
+    pivoting. lu (2*kl+ku+1, n) is a work array holding the fill-in,
+    the solution is written to x.
+    """
+    n = ab.shape[1]
+    ofs = kl+ku
+    for r in range(2*kl+ku+1):
+        for j in range(n):
+            lu[r,j] = 0.
+    for r in range(kl+ku+1):
+        for j in range(n):
+            lu[kl+r,j] = ab[r,j]
+    for j in range(n):
+        x[j] = b[j]
+
+    # forward elimination (a[i,j] is stored in lu[ofs+i-j,j])
+    for k in range(n):
+        i_end = min(n, k+kl+1)
+        j_end = min(n, k+kl+ku+1)
+        p = k
+        pmax = abs(lu[ofs,k])
+        for i in range(k+1, i_end):
+            if abs(lu[ofs+i-k,k]) > pmax:
+                pmax = abs(lu[ofs+i-k,k])
+                p = i
+        if p != k:
+            for j in range(k, j_end):
+                tmp = lu[ofs+k-j,j]
+                lu[ofs+k-j,j] = lu[ofs+p-j,j]
+                lu[ofs+p-j,j] = tmp
+            tmp = x[k]
+            x[k] = x[p]
+            x[p] = tmp
+        for i in range(k+1, i_end):
+            fact = lu[ofs+i-k,k] / lu[ofs,k]
+            lu[ofs+i-k,k] = 0.
+            for j in range(k+1, j_end):
+                lu[ofs+i-j,j] = lu[ofs+i-j,j] - fact * lu[ofs+k-j,j]
+            x[i] = x[i] - fact * x[k]
+
+    # back substitution
+    for i in range(n-1,-1,-1):
+        val = x[i]
+        for j in range(i+1, min(n, i+kl+ku+1)):
+            val = val - lu[ofs+i-j,j] * x[j]
+        x[i] = val / lu[ofs,i]
+    return(x)
+
+
+
+def allocate_banded_work(ncols, kl, ku, n, dtype):
+    """
+    Work array (LU with fill-in) and solution array for
+    solve_banded_batched_cpu.
+    """
+    LU = np.empty((ncols, 2*kl+ku+1, n), dtype=dtype)
+    X = np.empty((ncols, n), dtype=dtype)
+    return(LU, X)
+
+
+
+###############################################################################
+### SPECIALIZE FOR CPU
+###############################################################################
+solve_banded_col = njit(solve_banded_col_py)
+
+def launch_numba_cpu(kl, ku, AB, B, LU, X):
+
+    for c in prange(AB.shape[0]):
+        solve_banded_col(kl, ku, AB[c,:,:], B[c,:], LU[c,:,:], X[c,:])
+
+solve_banded_batched_cpu = njit(parallel=True)(launch_numba_cpu)
+
+
+
+###############################################################################
+### BENCHMARK
+###############################################################################
+def benchmark_solve_banded(ncols=180*168, nzs=33, kl=2, ku=2, nrep=3):
+    """
+    Compare the batched compiled solver against a loop over
+    scipy.linalg.solve_banded for ncols systems of size 2*nzs.
+    """
+    import scipy.linalg
+
+    n = 2*nzs
+    np.random.seed(1)
+    AB = np.random.uniform(-1, 1, (ncols, kl+ku+1, n))
+    # diagonally dominant
+    AB[:,ku,:] = AB[:,ku,:] + np.sign(AB[:,ku,:])*(kl+ku+1)
+    B = np.random.uniform(-1, 1, (ncols, n))
+    LU, X = allocate_banded_work(ncols, kl, ku, n, AB.dtype)
+
+    # compile
+    solve_banded_batched_cpu(kl, ku, AB[:1], B[:1], LU[:1], X[:1])
+
+    t0 = time.time()
+    for rep in range(nrep):
+        X_scipy = np.empty_like(B)
+        for c in range(ncols):
+            X_scipy[c,:] = scipy.linalg.solve_banded((kl,ku), AB[c], B[c])
+    t_scipy = (time.time() - t0)/nrep
+
+    t0 = time.time()
+    for rep in range(nrep):
+        solve_banded_batched_cpu(kl, ku, AB, B, LU, X)
+    t_batched = (time.time() - t0)/nrep
+
+    print('banded solve ({},{}) of {} columns with n = {}'.format(
+            kl, ku, ncols, n))
+    print('scipy loop:   {:8.4f} s'.format(t_scipy))
+    print('batched:      {:8.4f} s'.format(t_batched))
+    print('speedup:      {:8.1f}'.format(t_scipy/t_batched))
+    print('max abs diff: {:8.2e}'.format(np.max(np.abs(X - X_scipy))))
+
+
+if __name__ == '__main__':
+    benchmark_solve_banded()
@@ -4,14 +4,19 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20181001
-Last modified:      20190607
+Last modified:      20190715
 License:            MIT
 
 Functions to implement lateral boundary conditions for both GPU and CPU.
+On the CPU, the fields written by one kernel are exchanged together
+(exchange_BC_fields_cpu) instead of one call per field.
+The CPU boundaries are nb grid points wide: periodic in x and zero
+gradient (unstaggered) or zero (staggered, poles included) in y.
+The GPU exchange still assumes nb = 1.
 ###############################################################################
 """
 import numpy as np
-from numba import njit, cuda
+from numba import njit, cuda, prange
 
 from io_read_namelist import wp, gpu_enable
 from main_grid import nx,nxs,ny,nys,nz,nzs,nb
@@ -19,27 +24,46 @@ if gpu_enable:
     from misc_gpu_functions import cuda_kernel_decorator
 ###############################################################################
 
-def exchange_BC_cpu(FIELD):
+def exchange_BC_fields_cpu(FIELDS):
+    """
+    Exchange the lateral boundaries of all fields of the tuple FIELDS
+    (e.g. all fields written by a kernel) in one pass: one parallel
+    loop over the zonal and one over the meridional boundaries.
+    """
+    # zonal boundaries (periodic, staggered fields contain the
+    # periodic point twice: nb and nx+nb)
+    for j in prange(nys+2*nb):
+        for FIELD in FIELDS:
+            fnx,fny,fnz = FIELD.shape
+            if j < fny:
+                for k in range(fnz):
+                    for i in range(0,nb):
+                        FIELD[i,j,k] = FIELD[i+nx,j,k]
+                    for i in range(nx+nb,fnx):
+                        FIELD[i,j,k] = FIELD[i-nx,j,k]
 
-    fnx,fny,fnz = FIELD.shape
+    # meridional boundaries
+    for i in prange(nxs+2*nb):
+        for FIELD in FIELDS:
+            fnx,fny,fnz = FIELD.shape
+            if i < fnx:
+                for k in range(fnz):
+                    if fny == nys+2*nb: # staggered in y (incl. poles)
+                        for j in range(0,nb+1):
+                            FIELD[i,j,k] = wp(0.)
+                        for j in range(nys+nb-1,fny):
+                            FIELD[i,j,k] = wp(0.)
+                    else:     # unstaggered in y
+                        for j in range(0,nb):
+                            FIELD[i,j,k] = FIELD[i,nb      ,k]
+                        for j in range(ny+nb,fny):
+                            FIELD[i,j,k] = FIELD[i,ny+nb-1 ,k]
+exchange_BC_fields_cpu = njit(parallel=True)(exchange_BC_fields_cpu)
 
-    # zonal boundaries
-    if fnx == nxs+2*nb: # staggered in x
-        FIELD[0,:,:] = FIELD[nxs-1,:,:] 
-        FIELD[nxs,:,:] = FIELD[1,:,:] 
-        FIELD[nxs+1,:,:] = FIELD[2,:,:] 
-    else:     # unstaggered in x
-        FIELD[0,:,:] = FIELD[nx,:,:] 
-        FIELD[nx+1,:,:] = FIELD[1,:,:] 
 
-    # meridional boundaries
-    if fny == nys+2*nb: # staggered in y
-        for j in [0,1,nys,nys+1]:
-            FIELD[:,j,:] = wp(0.)
-    else:     # unstaggered in y
-        FIELD[:,0,:] = FIELD[:,1,:] 
-        FIELD[:,ny+1,:] = FIELD[:,ny,:] 
-exchange_BC_cpu = njit(parallel=True)(exchange_BC_cpu)
+def exchange_BC_cpu(FIELD):
+    exchange_BC_fields_cpu((FIELD,))
+exchange_BC_cpu = njit(exchange_BC_cpu)
 
 
 
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+"""
+###############################################################################
+Author:             Christoph Heim
+Date created:       20190715
+Last modified:      20190715
+License:            MIT
+
+Cache blocking of the CPU stencil kernels.
+The horizontal domain (nb to nxs+nb, nb to nys+nb) is split into tiles of
+tile_size = (ti, tj) grid points (0: full extent). The tiles are
+distributed to the threads (prange over the tiles) and each kernel
+clips them to its own domain. For each tile the stencil data of all
+levels is reused from the cache.
+The tiles are stored as integer array (tile, [i0,i1,j0,j1]) in
+GR.GRF[CPU]['tiles'].
+With cpu_tile_size = 'auto' candidate tile sizes are benchmarked once per
+grid shape, precision, number of threads and kernel variant (fused or
+separate). The winner is stored in cpu_tile_cache_file
+(next to the restart files) and reused by later simulations.
+###############################################################################
+"""
+import os, json, time
+import numpy as np
+import numba
+
+from namelist import (cpu_tile_size, cpu_tile_cache_file,
+                      i_fused_tendencies)
+from io_read_namelist import CPU, wp_str
+###############################################################################
+
+# tile size if no tuned tile size is available (one i slab per thread)
+default_tile_size = (1, 0)
+# candidate tile sizes of the autotuner
+tune_ti = [1, 2, 4, 8, 16]
+tune_tj = [4, 8, 16, 32, 0]
+# number of repetitions per candidate (fastest is taken)
+tune_n_rep = 3
+
+
+def make_tiles(GR, tile_size):
+    """
+    Tiles covering the horizontal domain of all (staggered) fields.
+    """
+    ti, tj = tile_size
+    if ti < 0 or tj < 0:
+        raise ValueError('Tile size has to be positive (0: full extent).')
+    if ti == 0 or ti > GR.nxs:
+        ti = GR.nxs
+    if tj == 0 or tj > GR.nys:
+        tj = GR.nys
+    tiles = []
+    for i0 in range(GR.nb, GR.nxs+GR.nb, ti):
+        for j0 in range(GR.nb, GR.nys+GR.nb, tj):
+            tiles.append([i0, min(i0+ti, GR.nxs+GR.nb),
+                          j0, min(j0+tj, GR.nys+GR.nb)])
+    return(np.array(tiles, dtype=np.int32))
+
+
+def set_tiles(GR, tile_size):
+    GR.cpu_tile_size = tuple(tile_size)
+    GR.GRF[CPU]['tiles'] = make_tiles(GR, tile_size)
+
+
+def initial_tile_size(GR):
+    """
+    Tile size of namelist or of cache file for cpu_tile_size = 'auto'.
+    """
+    if cpu_tile_size == 'auto':
+        tile_size = load_tile_size(GR)
+        if tile_size is None:
+            tile_size = default_tile_size
+        return(tile_size)
+    return(tuple(cpu_tile_size))
+
+
+def cache_key(GR):
+    # configured number of threads (numba.get_num_threads() would launch
+    # the threading layer before the radiation worker pool is forked)
+    return('{}x{}x{}_{}_{}threads_fused{}'.format(GR.nx, GR.ny, GR.nz,
+                    wp_str, numba.config.NUMBA_NUM_THREADS,
+                    i_fused_tendencies))
+
+
+def load_cache():
+    if not os.path.exists(cpu_tile_cache_file):
+        return({})
+    with open(cpu_tile_cache_file, 'r') as f:
+        return(json.load(f))
+
+
+def load_tile_size(GR):
+    cache = load_cache()
+    if cache_key(GR) in cache:
+        return(tuple(cache[cache_key(GR)]))
+    return(None)
+
+
+def store_tile_size(GR, tile_size):
+    cache = load_cache()
+    cache[cache_key(GR)] = list(tile_size)
+    cache_dir = os.path.dirname(cpu_tile_cache_file)
+    if cache_dir != '':
+        os.makedirs(cache_dir, exist_ok=True)
+    with open(cpu_tile_cache_file, 'w') as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+
+
+def tune_tile_size(GR, F, benchmark):
+    """
+    Measure benchmark(GR, F) (e.g. compute_tendencies) for all candidate
+    tile sizes and store the fastest one in the cache file. Does nothing
+    if cpu_tile_size is fixed or a tuned tile size is already available.
+    The fields and timings are restored afterwards.
+    """
+    if cpu_tile_size != 'auto' or load_tile_size(GR) is not None:
+        return
+
+    host = {key:F.host[key].copy() for key in F.host.keys()}
+    timings = dict(GR.timer.timings)
+
+    # candidates (without duplicates after clipping to the domain)
+    candidates = []
+    for ti in tune_ti:
+        for tj in tune_tj:
+            tiles = make_tiles(GR, (ti, tj))
+            extent = (tiles[0,1]-tiles[0,0], tiles[0,3]-tiles[0,2])
+            if extent not in [c[1] for c in candidates]:
+                candidates.append(((ti, tj), extent))
+
+    # compile kernels
+    set_tiles(GR, default_tile_size)
+    benchmark(GR, F)
+
+    best_size = default_tile_size
+    best_time = np.inf
+    for tile_size,extent in candidates:
+        set_tiles(GR, tile_size)
+        elapsed = np.inf
+        for rep in range(tune_n_rep):
+            t0 = time.time()
+            benchmark(GR, F)
+            elapsed = min(elapsed, time.time() - t0)
+        if elapsed < best_time:
+            best_time = elapsed
+            best_size = tile_size
+
+    set_tiles(GR, best_size)
+    store_tile_size(GR, best_size)
+    print('cpu tile size ' + str(best_size) + ' for grid ' + cache_key(GR) +
+          ' stored in ' + cpu_tile_cache_file)
+
+    for key in F.host.keys():
+        F.host[key][:] = host[key]
+    GR.timer.timings = timings
@@ -4,7 +4,7 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20190530
-Last modified:      20190616
+Last modified:      20190715
 License:            MIT
 
 Functions and classes used for support:
@@ -45,6 +45,16 @@ class Timer:
         self.timings[timer_key] += time.time() - self.flags[timer_key]
         self.flags[timer_key] = None
 
+    def merge(self, timer):
+        """
+        Add the timings of another timer (e.g. of a worker thread).
+        """
+        for timer_key,value in timer.timings.items():
+            if timer_key not in self.timings.keys():
+                self.timings[timer_key] = 0.
+                self.flags [timer_key] = None
+            self.timings[timer_key] += value
+
     def print_report(self):
         n_decimal_perc = 0
         n_decimal_sec = 1
@@ -66,7 +76,8 @@ def function_input_fields(function):
     Returns list with string of model fields.
     """
     input_fields = list(signature(function).parameters)
-    ignore = ['self', 'GR', 'GRF']
+    ignore = ['self', 'GR', 'GRF', 'dt', 'RK_stage',
+              'substep', 'n_substeps']
     for ign in ignore:
         if ign in input_fields:
             input_fields.remove(ign)
@@ -20,7 +20,9 @@ from datetime import datetime
 # datetime of simulation start
 GMT_initialization = datetime(2019,1,1,0,0,0)
 
-# number of lateral boundary points
+# number of lateral boundary points (the stencils need 1). nb > 1
+# (e.g. for higher order stencils or redundant computation on the
+# boundaries) is prepared but not yet used by any time stepping.
 nb = 1
 # longitude domain
 lon0_deg = 0
@@ -87,6 +89,12 @@ i_moist_vert_turb       = 1
 i_moist_num_dif         = 1
 i_moist_microphys       = 1
 
+# polar filter: damp zonal waves of the tendencies poleward of
+# polar_filter_lat [deg] that violate the CFL criterion at
+# polar_filter_lat. The time step is derived from dx at polar_filter_lat.
+i_polar_filter          = 0
+polar_filter_lat        = 60.
+
 
 ###############################################################################
 # SURFACE
@@ -104,6 +112,15 @@ nzsoil = 1
 i_radiation = 0
 i_microphysics = 0
 i_turbulence = 0
+# call interval [s] of the physics components (0: every time step).
+# Between two calls the fields computed by a component (e.g. KMOM,
+# KHEAT, surface fluxes, SOILTEMP) are kept and reused by the dynamics.
+# The call interval of the radiation is set with rad_nth_hour.
+physics_call_sec = {
+    'turbulence'    : 0,
+    'microphysics'  : 0,
+    'surface'       : 0,
+}
 
 ###############################################################################
 # RADIATION
@@ -115,17 +132,23 @@ pseudo_rad_outRate = 5.0E-7
 # taking a value 24 % rad_nth_hour != 0 causes the computed radiation field
 # to change its exact position over several days.
 rad_nth_hour = 3.9
-## TODO: async_radiation not working. see rad_main.py
-#if i_comp_mode == 2:
-#    i_async_radiation = 1
-#else:
-#    i_async_radiation = 0
-#if i_async_radiation:
-#    njobs_rad = 1
-#else:
-#    njobs_rad = 4
+# account for the equation of time in the solar hour angle
+i_equation_of_time = 0
+# compute radiation in a background thread overlapping with the dynamics.
+# radiation fields then lag by one radiation interval (see rad_main.py)
 i_async_radiation = 0
-njobs_rad = 4
+# number of processes computing radiation fluxes (each process takes a
+# latitude band). 1: no multiprocessing
+njobs_rad = 1
+# compute radiation on a coarse grid of rad_coarse_factor x rad_coarse_factor
+# column blocks (area-weighted) and interpolate the result back
+# conservatively (see rad_coarse_grid.py). 1: model grid
+rad_coarse_factor = 1
+# incremental radiation: only recompute columns whose input fingerprint
+# (see Radiation.fingerprint_scales) moved by more than rad_incremental_tol
+# since they were last computed. Other columns keep their fluxes.
+i_rad_incremental = 0
+rad_incremental_tol = 1.
 # TODO finish implementation of radiation scheme.
 # Temporary values representing "mean atmospheric gas/aerosol composition"
 sigma_abs_gas_SW_in = 1.7E-5
@@ -137,6 +160,15 @@ sigma_sca_gas_LW_in = 1.72E-7
 emissivity_surface = 1
 # longwave
 planck_n_lw_bins = 5
+# temperature resolution [K] of the Planck radiance lookup table used by
+# the batched longwave computation. 0: evaluate Planck function exactly
+planck_table_dT = 0.5
+# compute longwave fluxes of all columns in one compiled parallel pass (1)
+# or column by column (0)
+i_rad_lw_batched = 1
+# shortwave: compute all sunlit columns as one compiled parallel batch (1)
+# or column by column (0)
+i_rad_sw_batched = 1
 
 
 ###############################################################################
@@ -217,9 +249,42 @@ IC_file_name        = '../IC/3.0_3.0_032.pkl'
 ###############################################################################
 # COMPUTATION SETTINGS
 ###############################################################################
-# TIME DISCRETIZATION: MATSUNO, RK4 (not implemented)
+# TIME DISCRETIZATION: MATSUNO, LEAPFROG, RK3 (Wicker-Skamarock), RK4
+# (time step scaled with stability limit of the scheme)
 i_time_stepping = 'MATSUNO'
+# LEAPFROG: Robert-Asselin-Williams filter coefficient and
+# Williams alpha (1: classical Robert-Asselin filter)
+RAW_nu      = 0.2
+RAW_alpha   = 0.53
+# SPLIT-EXPLICIT (RK3 and CPU only): the continuity equation and the pressure
+# gradient are sub-cycled (forward-backward) split_explicit_n_sub times
+# per time step while advection, coriolis, diffusion and physics are
+# computed once per RK3 stage. The time step is split_explicit_n_sub
+# times the one of the fast terms.
+i_split_explicit        = 0
+split_explicit_n_sub    = 4
+# SEMI-IMPLICIT (MATSUNO only): only the external gravity wave mode
+# (column pressure and vertically averaged pressure gradient linearized
+# about an isothermal state at semi_implicit_T_ref [K]) is integrated
+# implicitly (backward weight alpha = 0.5, fixed in dyn_semi_implicit.py).
+# semi_implicit_T_ref should not be lower than the atmospheric
+# temperatures. The time step is semi_implicit_dt_fac times the explicit
+# one. The internal gravity waves remain explicit and limit
+# semi_implicit_dt_fac (not advection, which is slower).
+# (compare with benchmark_semi_implicit.py)
+i_semi_implicit         = 0
+semi_implicit_T_ref     = 300.
+semi_implicit_dt_fac    = 3.
 CFL = 0.7
+# ADAPTIVE TIME STEP (1) from maximum Courant number of current state
+# computed every adaptive_dt_nth_ts time steps. New time steps keep a
+# relative margin adaptive_dt_tol to the target Courant number (CFL)
+# and are only increased by more than adaptive_dt_tol. Bounds in seconds.
+i_adaptive_dt       = 0
+adaptive_dt_nth_ts  = 10
+adaptive_dt_min     = 10.
+adaptive_dt_max     = 1800.
+adaptive_dt_tol     = 0.1
 
 # working precision
 working_precision = 'float32'
@@ -227,6 +292,18 @@ working_precision = 'float64'
 
 # 1: CPU, 2: GPU
 i_comp_mode = 2
+# CPU only: compute the tendencies of momentum, POTT and moisture
+# in one pass over the columns (dyn_fused.py) instead of one parallel
+# loop per variable. Bitwise identical to the separate kernels
+# (check with testsuite.py).
+i_fused_tendencies = 0
+# CPU only: the horizontal domain of the stencil kernels is split into
+# tiles of cpu_tile_size = (ti, tj) grid points (0: full extent) that are
+# distributed to the threads. (1, 0): one i slab per thread.
+# 'auto': benchmark candidate tile sizes at setup once per grid shape
+# and configuration and store the fastest in cpu_tile_cache_file.
+cpu_tile_size = (1, 0)
+cpu_tile_cache_file = '../restart/cpu_tile_cache.json'
 output_path = '../output_ref'
 output_path = '../output_test'
 
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+"""
+###############################################################################
+Author:             Christoph Heim
+Date created:       20190709
+Last modified:      20190709
+License:            MIT
+
+Coarse grid on which radiation can be computed (rad_coarse_factor > 1).
+Blocks of rad_coarse_factor x rad_coarse_factor columns of the model
+grid form one coarse column.
+- coarsen: area-weighted (Grid.A) block average of a model grid field.
+- refine: bilinear interpolation of a coarse field back to the model
+  grid followed by a correction per block such that the area-weighted
+  block total of the coarse field is conserved exactly.
+The coarse grid object only provides the grid attributes needed by
+the radiation scheme.
+###############################################################################
+"""
+import numpy as np
+
+from io_read_namelist import wp
+###############################################################################
+
+
+class RadiationCoarseGrid:
+
+    def __init__(self, GR, factor):
+
+        if GR.nx % factor or GR.ny % factor:
+            raise ValueError('rad_coarse_factor ' + str(factor) +
+                    ' has to divide nx = ' + str(GR.nx) +
+                    ' and ny = ' + str(GR.ny) + '.')
+
+        self.factor = factor
+
+        # NUMBER OF GRID POINTS IN EACH DIMENSION
+        self.nx = GR.nx//factor
+        self.ny = GR.ny//factor
+        self.nz = GR.nz
+        self.nzs = GR.nzs
+        self.nb = GR.nb
+
+        # INDEX ARRAYS
+        self.i   = np.arange((self.nb),(self.nx +self.nb))
+        self.j   = np.arange((self.nb),(self.ny +self.nb))
+        self.ii,  self.jj  = np.ix_(self.i    ,self.j)
+
+        # AREA OF MODEL GRID COLUMNS (nx, ny, 1) AND COARSE COLUMNS
+        self.A_fine = GR.A[GR.ii,GR.jj]
+        self.A = np.full( (self.nx+2*self.nb,self.ny+2*self.nb, 1),
+                            np.nan, dtype=wp)
+        self.A[self.ii,self.jj] = self.block_sum(self.A_fine)
+        self.A = self.exchange_BC(self.A)
+
+        # COARSE COLUMN CENTERS
+        self.lon_rad = np.full( (self.nx+2*self.nb,self.ny+2*self.nb, 1),
+                            np.nan, dtype=wp)
+        self.lat_rad = np.full( (self.nx+2*self.nb,self.ny+2*self.nb, 1),
+                            np.nan, dtype=wp)
+        self.lon_rad[self.ii,self.jj] = self.block_mean(
+                                            GR.lon_rad[GR.ii,GR.jj])
+        self.lat_rad[self.ii,self.jj] = self.block_mean(
+                                            GR.lat_rad[GR.ii,GR.jj])
+        self.lon_rad = self.exchange_BC(self.lon_rad)
+        self.lat_rad = self.exchange_BC(self.lat_rad)
+
+        # BILINEAR INTERPOLATION FROM COARSE TO MODEL GRID COLUMNS
+        # position of model grid column centers in coarse index space
+        # (index of first inner coarse column = nb)
+        pos_x = (np.arange(GR.nx) + 0.5)/factor - 0.5 + self.nb
+        pos_y = (np.arange(GR.ny) + 0.5)/factor - 0.5 + self.nb
+        self.interp_i0 = np.floor(pos_x).astype(np.int64)
+        self.interp_j0 = np.floor(pos_y).astype(np.int64)
+        self.interp_wx = (pos_x - self.interp_i0).astype(wp)
+        self.interp_wy = (pos_y - self.interp_j0).astype(wp)
+
+
+    def block_sum(self, FIELD):
+        """
+        Sum of inner domain field (nx*factor, ny*factor, nz) over blocks.
+        """
+        f = self.factor
+        nz = FIELD.shape[2]
+        return(FIELD.reshape(self.nx, f, self.ny, f, nz).sum(axis=(1,3)))
+
+
+    def block_mean(self, FIELD):
+        return(self.block_sum(FIELD)/self.factor**2)
+
+
+    def coarsen(self, GR, FIELD, CFIELD):
+        """
+        Area-weighted average of model grid FIELD over blocks written
+        to coarse grid CFIELD (including boundaries).
+        """
+        CFIELD[self.ii,self.jj] = ( self.block_sum(
+                            FIELD[GR.ii,GR.jj] * self.A_fine ) /
+                            self.A[self.ii,self.jj] )
+        self.exchange_BC(CFIELD)
+
+
+    def refine(self, GR, CFIELD, FIELD):
+        """
+        Interpolate coarse grid CFIELD to the inner domain of model grid
+        FIELD conserving the area-weighted total of each block.
+        """
+        i0 = self.interp_i0[:,np.newaxis]
+        j0 = self.interp_j0[np.newaxis,:]
+        wx = self.interp_wx[:,np.newaxis,np.newaxis]
+        wy = self.interp_wy[np.newaxis,:,np.newaxis]
+        INTERP = ( (1-wx) * (1-wy) * CFIELD[i0  ,j0  ] +
+                      wx  * (1-wy) * CFIELD[i0+1,j0  ] +
+                   (1-wx) *    wy  * CFIELD[i0  ,j0+1] +
+                      wx  *    wy  * CFIELD[i0+1,j0+1] )
+
+        # correct block mean
+        f = self.factor
+        nz = INTERP.shape[2]
+        correction = ( CFIELD[self.ii,self.jj] -
+                       self.block_sum(INTERP * self.A_fine) /
+                       self.A[self.ii,self.jj] )
+        FIELD[GR.ii,GR.jj] = ( INTERP.reshape(self.nx, f, self.ny, f, nz) +
+                correction[:,np.newaxis,:,np.newaxis,:] ).reshape(
+                                                INTERP.shape )
+
+
+    def exchange_BC(self, FIELD):
+        """
+        Periodic zonal and zero-gradient meridional boundaries
+        (as Grid.exchange_BC for unstaggered fields).
+        """
+        nb = self.nb
+        FIELD[:nb,::] = FIELD[self.nx:self.nx+nb,::]
+        FIELD[self.nx+nb:,::] = FIELD[nb:2*nb,::]
+        FIELD[:,:nb,::] = FIELD[:,nb:nb+1,::]
+        FIELD[:,self.ny+nb:,::] = FIELD[:,self.ny+nb-1:self.ny+nb,::]
+        return(FIELD)
@@ -4,26 +4,31 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20181001
-Last modified:      20190701
+Last modified:      20190709
 License:            MIT
 
 Organize computation of longwave radiation.
+
+HISTORY
+- 20190708: CH  Added batched computation of all columns in one
+                compiled parallel pass (calc_LW_fluxes_cpu).
+- 20190709: CH  Planck radiance of batched computation looked up from
+                table (calc_planck_table, resolution planck_table_dT).
+- 20190709: CH  Numba port of the Cython kernels (calc_planck_intensity,
+                calc_surface_emission, rad_calc_LW_RTE_matrix).
+                Removed rad_longwave_cython.pyx.
 ###############################################################################
 """
 import numpy as np
 import time
 import scipy
+from numba import njit, prange
 from io_constants import con_h, con_c, con_kb
 from namelist import (sigma_abs_gas_LW_in, sigma_sca_gas_LW_in,
-                      emissivity_surface, planck_n_lw_bins)
-from io_read_namelist import wp, wp_str
-
-#TODO
-run_cython = 1
-if run_cython:
-    from bin.rad_longwave_cython import (calc_planck_intensity_c,
-                                         calc_surface_emission_c, 
-                                         rad_calc_LW_RTE_matrix_c)
+                      emissivity_surface, planck_n_lw_bins, nb,
+                      planck_table_dT)
+from io_read_namelist import wp, wp_int
+from misc_banded_solver import solve_banded_col
 
 
 
@@ -74,41 +79,16 @@ def org_longwave(GR, nz, nzs, dz, tair_col, rho_col, tsurf,
 
     #GR.timer.start('02')
     # emission fields
-    if run_cython == 0:
-        B_air = 2*np.pi * (1 - omega_s) * \
-            calc_planck_intensity(tair_col, planck_lambdas_center,
-                                    planck_dlambdas)
-    elif run_cython == 1:
-        B_air = np.asarray(calc_planck_intensity_c(tair_col, omega_s, \
-                                planck_lambdas_center, planck_dlambdas))
+    B_air = calc_planck_intensity(tair_col, omega_s,
+                            planck_lambdas_center, planck_dlambdas)
+    B_surf = calc_surface_emission(tsurf,
+                            planck_lambdas_center, planck_dlambdas)
     #GR.timer.stop('02')
 
-    #GR.timer.start('03')
-    if wp_str == 'float64':
-        if run_cython == 0:
-            B_surf = emissivity_surface * np.pi * \
-                calc_planck_intensity(tsurf, planck_lambdas_center,
-                                    planck_dlambdas)
-        # does not  work with float32
-        elif run_cython == 1:
-            B_surf = calc_surface_emission_c(tsurf, \
-                        planck_lambdas_center, planck_dlambdas)
-    else:
-        B_surf = emissivity_surface * np.pi * \
-            calc_planck_intensity(tsurf, planck_lambdas_center,
-                                planck_dlambdas)
-    #GR.timer.stop('03')
-
     #GR.timer.start('04')
     # calculate radiative fluxes
-    if run_cython == 0:
-        A_mat, g_vec = rad_calc_LW_RTE_matrix(nz, nzs, dtau, gamma1, gamma2,
-                        B_air, B_surf, albedo_surface_LW)
-    elif run_cython == 1:
-        A_mat, g_vec = rad_calc_LW_RTE_matrix_c(nz, nzs, dtau, gamma1, gamma2,
+    A_mat, g_vec = rad_calc_LW_RTE_matrix(nz, nzs, dtau, gamma1, gamma2,
                             B_air, B_surf, albedo_surface_LW)
-        A_mat = np.asarray(A_mat)
-        g_vec = np.asarray(g_vec)
     #GR.timer.stop('04')
 
     #GR.timer.start('05')
@@ -137,77 +117,236 @@ def org_longwave(GR, nz, nzs, dz, tair_col, rho_col, tsurf,
 
 
 
-def calc_planck_intensity(temp, planck_lambdas_center, planck_dlambdas):
-
-
-    #print(nus)
-    #print(nus_center)
-    #print(lambdas)
-    #print(lambdas_center)
-    #print(dlambdas)
-
-    nnu = planck_n_lw_bins
+def calc_planck_intensity_py(temp, omega_s, planck_lambdas_center,
+                            planck_dlambdas):
+    """
+    Emission of all levels of a column integrated over all longwave bins.
+    """
+    B_sum = np.zeros(temp.shape[0], dtype=wp)
+    for k in range(temp.shape[0]):
+        B_sum[k] = 2.*pi_LW * (1. - omega_s[k]) * \
+                    planck_radiance(temp[k], planck_lambdas_center,
+                                    planck_dlambdas)
+    return(B_sum)
 
 
-    if (type(temp) == np.float64) or (type(temp) == np.float32):
-        B = np.zeros( (nnu, 1) )
-    else:
-        B = np.zeros( (nnu, len(temp)) )
+def calc_surface_emission_py(tsurf, planck_lambdas_center, planck_dlambdas):
+    """
+    Emission of the surface integrated over all longwave bins.
+    """
+    return(wp(emissivity_LW * pi_LW * \
+                    planck_radiance(tsurf, planck_lambdas_center,
+                                    planck_dlambdas)))
 
-    for c in range(0,nnu):
-        spectral_radiance = \
-            2*con_h*con_c**2 / planck_lambdas_center[c]**5 * \
-            1 / ( np.exp( con_h*con_c / (planck_lambdas_center[c]*con_kb*temp) ) - 1 )
-        radiance = spectral_radiance * -planck_dlambdas[c]
-        B[c,:] = radiance
 
-    B = np.sum(B,0)
+def rad_calc_LW_RTE_matrix_py(nz, nzs, dtau, gamma1, gamma2,
+                        B_air, B_surf, albedo_surface):
+    """
+    Banded (2,2) matrix (scipy.linalg.solve_banded storage) and right
+    hand side of the longwave two-stream system of one column.
+    """
+    A_mat = np.zeros( (5, 2*nzs), dtype=wp )
+    g_vec = np.zeros( 2*nzs, dtype=wp )
+    LW_RTE_matrix(nz, dtau, gamma1, gamma2, B_air, B_surf,
+                  albedo_surface, A_mat, g_vec)
+    return(A_mat, g_vec)
 
-    return(B)
 
+###############################################################################
+### SPECIALIZE FOR CPU
+###############################################################################
+calc_planck_intensity   = njit(calc_planck_intensity_py)
+calc_surface_emission   = njit(calc_surface_emission_py)
+rad_calc_LW_RTE_matrix  = njit(rad_calc_LW_RTE_matrix_py)
 
-def rad_calc_LW_RTE_matrix(nz, nzs, dtau, gamma1, gamma2, \
-                        B_air, B_surf, albedo_surface):
+###################################################################################
+###################################################################################
+###################################################################################
+###################################################################################
 
-    g_vec = np.zeros(2*nz+2)
-    g_vec[1:-1] = np.repeat(dtau*B_air, 2)
-    g_vec[range(2,len(g_vec),2)] = - g_vec[range(2,len(g_vec),2)]
-    g_vec[-1] = B_surf
 
-    C1 = 0.5 * dtau * gamma1
-    C2 = 0.5 * dtau * gamma2
+###################################################################################
+###################################################################################
+# METHOD: SELF CONSTRUCTED (BATCHED OVER ALL COLUMNS)
+###################################################################################
+###################################################################################
+# Same physics as org_longwave but for all columns at once in a
+# single compiled parallel pass. The per-column work arrays are
+# allocated once per thread row (i) and reused for all columns (j).
+# The banded system is solved with misc_banded_solver.
+
+cloud_fact_LW   = wp(1E-2)
+qc_max_LW       = wp(0.002)
+g_a_LW          = wp(0.)
+my1_LW          = wp(1/np.sqrt(3))
+sigma_abs_LW    = wp(sigma_abs_gas_LW_in)
+sigma_sca_LW    = wp(sigma_sca_gas_LW_in)
+emissivity_LW   = wp(emissivity_surface)
+pi_LW           = wp(np.pi)
+# temperature range of the Planck radiance lookup table
+planck_table_T0 = wp(100.)
+planck_table_T1 = wp(400.)
+
+
+def planck_radiance_py(temp, planck_lambdas_center, planck_dlambdas):
+    """
+    Planck radiance integrated over all longwave bins.
+    """
+    B = 0.
+    for c in range(planck_lambdas_center.shape[0]):
+        spectral_radiance = \
+            2.*con_h*con_c**2. / planck_lambdas_center[c]**5. * \
+            1. / ( np.exp( con_h*con_c / \
+            (planck_lambdas_center[c]*con_kb*temp) ) - 1. )
+        B = B + spectral_radiance * - planck_dlambdas[c]
+    return(B)
 
-    d0_ = np.repeat(1+C1, 2)
-    d0_[range(1,len(d0_),2)] = - d0_[range(1,len(d0_),2)]
-    d0 = np.ones(2*nz+2); d0[1:-1] = d0_
 
-    dp1_ = np.repeat(-C2, 2)
-    dp1_[range(1,len(dp1_),2)] = - dp1_[range(1,len(dp1_),2)]
-    dp1 = np.zeros(2*nz+2); dp1[2:] = dp1_
+def planck_radiance_table_py(temp, planck_lambdas_center, planck_dlambdas,
+                    planck_table, planck_table_dT):
+    """
+    Planck radiance linearly interpolated from planck_table. Outside of
+    the table range (or if the table is empty) it is computed exactly.
+    """
+    if planck_table.shape[0] > 1:
+        x = (temp - planck_table_T0)/planck_table_dT
+        ind = int(np.floor(x))
+        if ind >= 0 and ind < planck_table.shape[0]-1:
+            w = x - ind
+            return((1.-w)*planck_table[ind] + w*planck_table[ind+1])
+    return(planck_radiance(temp, planck_lambdas_center, planck_dlambdas))
+
+
+def LW_RTE_matrix_py(nz, dtau, gamma1, gamma2, B_air, B_surf,
+                    albedo_surface, A_mat, g_vec):
+    """
+    Fill the banded (2,2) matrix and right hand side of the
+    longwave two-stream system into preallocated A_mat and g_vec.
+    """
+    n = 2*nz+2
+    for k in range(n):
+        A_mat[0,k] = 0.
+        A_mat[1,k] = 0.
+        A_mat[3,k] = 0.
+        A_mat[4,k] = 0.
+    # upper and lower boundary
+    A_mat[2,0] = 1.
+    A_mat[2,n-1] = 1.
+    A_mat[3,n-2] = - albedo_surface
+    g_vec[0] = 0.
+    g_vec[n-1] = B_surf
+
+    for ind in range(nz):
+        C1 = 0.5 * dtau[ind] * gamma1[ind]
+        C2 = 0.5 * dtau[ind] * gamma2[ind]
+        # rows of layer ind
+        ko = 2*ind+1
+        ke = 2*ind+2
+        g_vec[ko] =   dtau[ind] * B_air[ind]
+        g_vec[ke] = - dtau[ind] * B_air[ind]
+        A_mat[2,ko] = + (1. + C1)
+        A_mat[2,ke] = - (1. + C1)
+        A_mat[1,ke] = - C2
+        A_mat[1,ke+1] = + C2
+        A_mat[0,ke+1] = - (1. - C1)
+        A_mat[3,ko-1] = - C2
+        A_mat[3,ko] = + C2
+        A_mat[4,ko-1] = + (1. - C1)
+    return(A_mat, g_vec)
 
-    dp2_ = np.repeat(-(1-C1), 2)
-    dp2_[range(0,len(dp2_),2)] = 0
-    dp2 = np.zeros(2*nz+2); dp2[2:] = dp2_
 
-    dm1_ = np.repeat(-C2, 2)
-    dm1_[range(1,len(dm1_),2)] = - dm1_[range(1,len(dm1_),2)]
-    dm1 = np.zeros(2*nz+2); dm1[:-2] = dm1_; dm1[-2] = -albedo_surface
+def longwave_col_py(nz, dz, tair_col, rho_col, tsurf, albedo_surface_LW,
+                    qc_col, planck_lambdas_center, planck_dlambdas,
+                    planck_table, planck_table_dT,
+                    dtau, gamma1, gamma2, B_air, A_mat, g_vec, lu, fluxes):
+    """
+    Longwave fluxes of one column using the preallocated work arrays.
+    Result: fluxes[0::2] = - down_diffuse, fluxes[1::2] = up_diffuse.
+    """
+    for k in range(nz):
+        qc = min(qc_col[k], qc_max_LW)
+        sigma_tot = sigma_abs_LW + qc*cloud_fact_LW + sigma_sca_LW
+        # optical thickness
+        dtau[k] = sigma_tot * dz[k] * rho_col[k]
+        # single scattering albedo
+        omega_s = sigma_sca_LW/sigma_tot
+        gamma1[k] = ( 1. - omega_s*(1.+g_a_LW)/2. ) / my1_LW
+        gamma2[k] = omega_s*(1.-g_a_LW) / (2.*my1_LW)
+        # emission
+        B_air[k] = 2.*pi_LW * (1. - omega_s) * \
+                    planck_radiance_table(tair_col[k],
+                                    planck_lambdas_center, planck_dlambdas,
+                                    planck_table, planck_table_dT)
+    B_surf = emissivity_LW * pi_LW * \
+                    planck_radiance_table(tsurf,
+                                    planck_lambdas_center, planck_dlambdas,
+                                    planck_table, planck_table_dT)
+
+    LW_RTE_matrix(nz, dtau, gamma1, gamma2, B_air, B_surf,
+                  albedo_surface_LW, A_mat, g_vec)
+    solve_banded_col(2, 2, A_mat, g_vec, lu, fluxes)
+    return(fluxes)
 
-    dm2_ = np.repeat(1-C1, 2)
-    dm2_[range(1,len(dm2_),2)] = 0
-    dm2 = np.zeros(2*nz+2); dm2[:-2] = dm2_
 
-    #A_mat = scipy.sparse.diags( (dm2, dm1, d0, dp1[1:], dp2[2:]),
-    #                            ( -2,  -1,  0,       1,       2),
-    #                            (nzs*2, nzs*2), format='csr' )
-    A_mat = np.zeros( ( 5, 2*nzs ) )
-    A_mat[0,:] = dp2
-    A_mat[1,:] = dp1
-    A_mat[2,:] = d0
-    A_mat[3,:] = dm1
-    A_mat[4,:] = dm2
 
-    return(A_mat, g_vec)
+###############################################################################
+### SPECIALIZE FOR CPU
+###############################################################################
+planck_radiance     = njit(planck_radiance_py)
+planck_radiance_table = njit(planck_radiance_table_py)
+LW_RTE_matrix       = njit(LW_RTE_matrix_py)
+longwave_col        = njit(longwave_col_py)
+
+def launch_numba_cpu(LWFLXDO, LWFLXUP, dz, TAIR, RHO, SOILTEMP,
+                    SURFALBEDLW, QC, RECOMPUTE, planck_lambdas_center,
+                    planck_dlambdas, planck_table, planck_table_dT):
+
+    nz = TAIR.shape[2]
+    for i in prange(nb,TAIR.shape[0]-nb):
+        # work arrays (reused for all columns of this row)
+        dtau    = np.empty(nz, dtype=wp)
+        gamma1  = np.empty(nz, dtype=wp)
+        gamma2  = np.empty(nz, dtype=wp)
+        B_air   = np.empty(nz, dtype=wp)
+        A_mat   = np.empty((5, 2*nz+2), dtype=wp)
+        g_vec   = np.empty(2*nz+2, dtype=wp)
+        lu      = np.empty((7, 2*nz+2), dtype=wp)
+        fluxes  = np.empty(2*nz+2, dtype=wp)
+        for j in range(nb,TAIR.shape[1]-nb):
+            # keep cached fluxes (incremental radiation)
+            if not RECOMPUTE[i,j,0]:
+                continue
+            longwave_col(nz, dz[i,j,:], TAIR[i,j,:], RHO[i,j,:],
+                        SOILTEMP[i,j,0], SURFALBEDLW[i,j,0], QC[i,j,:],
+                        planck_lambdas_center, planck_dlambdas,
+                        planck_table, planck_table_dT,
+                        dtau, gamma1, gamma2, B_air, A_mat, g_vec, lu, fluxes)
+            for k in range(wp_int(0),nz+1):
+                LWFLXDO[i,j,k] = fluxes[2*k]
+                LWFLXUP[i,j,k] = fluxes[2*k+1]
+
+calc_LW_fluxes_cpu = njit(parallel=True, nogil=True)(launch_numba_cpu)
+
+
+def calc_planck_table(planck_lambdas_center, planck_dlambdas, dT):
+    """
+    Tabulate the Planck radiance in steps of dT between planck_table_T0
+    and planck_table_T1. Also returns the maximum relative error of the
+    linear interpolation (largest half way between the nodes).
+    """
+    n = int(round((planck_table_T1 - planck_table_T0)/dT)) + 1
+    temps = planck_table_T0 + np.arange(n)*dT
+    table = np.zeros(n, dtype=wp)
+    for c in range(n):
+        table[c] = planck_radiance(temps[c], planck_lambdas_center,
+                                   planck_dlambdas)
+    rel_error = 0.
+    for c in range(n-1):
+        exact = planck_radiance(temps[c]+dT/2, planck_lambdas_center,
+                                planck_dlambdas)
+        interp = (table[c] + table[c+1])/2
+        rel_error = max(rel_error, abs(interp - exact)/exact)
+    return(table, rel_error)
 
 ###################################################################################
 ###################################################################################
@@ -4,25 +4,47 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20181001
-Last modified:      20190618
+Last modified:      20190715
 License:            MIT
 
 Main script of radiation scheme.
+
+Asynchroneous radiation (i_async_radiation = 1):
+At each radiation boundary the radiation input fields (RAD_TO_HOST) are
+copied to a snapshot and a worker thread computes the radiation fields
+from it while the dynamics continue. The result is written to a second
+set of RAD_TO_DEVICE fields (double buffering) and is only applied at
+the next radiation boundary. Thus, the radiation fields used by the
+model lag the atmospheric state by one radiation interval (rad_nth_hour).
+The solar geometry of the worker is evaluated for the time at which
+its result is applied. The worker measures its computing times with
+its own timer, which is merged into GR.timer after the join. Before a
+restart file is written the worker is joined and its pending result is
+written to the restart file.
 ###############################################################################
 """
-import time, scipy, copy
+import time, scipy, copy, threading, atexit
+import numba
 import numpy as np
+from datetime import timedelta
+from types import SimpleNamespace
 #import matplotlib.pyplot as plt
 import multiprocessing as mp
+from multiprocessing import shared_memory, resource_tracker
 
 from namelist import (pseudo_rad_inpRate, pseudo_rad_outRate,
                       rad_nth_hour, i_async_radiation, planck_n_lw_bins,
-                      njobs_rad, i_comp_mode)
+                      njobs_rad, i_comp_mode, i_rad_lw_batched,
+                      i_rad_sw_batched, rad_coarse_factor, planck_table_dT,
+                      i_rad_incremental, rad_incremental_tol)
 from io_constants import con_cp, con_g
 from io_read_namelist import wp, CPU, GPU
-from rad_shortwave import (org_shortwave, rad_solar_zenith_angle,
-                           calc_current_solar_constant)
-from rad_longwave import org_longwave
+from rad_shortwave import org_shortwave, calc_SW_fluxes_sunlit
+from rad_longwave import (org_longwave, calc_LW_fluxes_cpu,
+                          calc_planck_table)
+from rad_coarse_grid import RadiationCoarseGrid
+from rad_solar_geometry import SolarGeometry
+from misc_utilities import Timer
 ###############################################################################
 
         
@@ -37,17 +59,58 @@ class Radiation:
                         'LWFLXNET', 'SWFLXNET', 'SWFLXDIV', 'LWFLXDIV',
                         'TOTFLXDIV', 'dPOTTdt_RAD'] 
 
+    # coarse radiation: inputs averaged to the coarse grid and
+    # outputs interpolated back to the model grid
+    fields_coarsened = ['PHIVB', 'TAIR', 'RHO', 'SOILTEMP', 'SURFALBEDLW',
+                        'SURFALBEDSW', 'QC']
+    fields_refined = ['LWFLXDO', 'LWFLXUP', 'SWDIFFLXDO', 'SWDIRFLXDO',
+                      'SWFLXUP', 'SWFLXDO', 'LWFLXNET', 'SWFLXNET',
+                      'SWFLXDIV', 'LWFLXDIV', 'TOTFLXDIV', 'dPOTTdt_RAD']
+
+    # incremental radiation: column fingerprint components and the
+    # change of each that counts as one unit of rad_incremental_tol
+    fingerprint_scales = {
+        'TAIR_mean':    1.,     # K     mass-weighted column mean TAIR
+        'TAIR_sfc':     1.,     # K     TAIR of lowest level
+        'QC_path':      1E-2,   # kg/m2 column integrated QC
+        'column_mass':  1E2,    # kg/m2 column integrated RHO
+        'SOILTEMP':     1.,     # K
+        'SURFALBEDLW':  1E-3,   # -     longwave surface albedo
+        'SURFALBEDSW':  1E-3,   # -     shortwave surface albedo
+        'MYSUN':        1E-2,   # -     cosine of solar zenith angle
+    }
+
     def __init__(self, GR):
         print('Prepare Radiation')
 
         self.done = 0
 
         self.i_async_radiation = i_async_radiation
+        self.async_worker = None
+        self.async_fields = None
+        # worker thread timings (merged into GR.timer after the join)
+        self.async_timer = None
+        # result of the worker not yet applied to the model fields
+        self.async_result_pending = False
 
         self.njobs_rad = njobs_rad
+        self.mp_pool = None
+        self.mp_shm = None
+        # fork the workers before any parallel numba kernel has been run
+        # in this process (forking an initialized threading layer hangs)
+        if self.njobs_rad > 1:
+            self.start_worker_pool()
 
         self.rad_nth_hour = rad_nth_hour 
-        self.rad_nth_ts = int(self.rad_nth_hour * 3600/GR.dt)
+        GR.dt_control.add_event(GR, 'radiation', self.rad_nth_hour*3600)
+
+        self.rad_coarse_factor = rad_coarse_factor
+        self.set_up_coarse_grid(GR)
+
+        self.i_rad_incremental = i_rad_incremental
+        self.rad_incremental_tol = rad_incremental_tol
+        self.fingerprint = None
+        self.recompute_fraction = 1.
 
 
         # Planck emission calculations
@@ -63,138 +126,256 @@ class Radiation:
         lambdas = 1./nus
         self.planck_lambdas_center = 1./nus_center
         self.planck_dlambdas = np.diff(lambdas)
+        self.planck_table_dT = planck_table_dT
+        self.set_up_planck_table()
 
 
     def launch_radiation_calc(self, GR, F):
 
         # Asynchroneous Radiation
-        if F.RAD.i_async_radiation:
-            raise NotImplementedError(
-                'Copying not working for async on gpu. '+
-                'Get a strange error with SWFLXDO sometimes '+
-                'showing wrong pattern in output.')
-            if F.RAD.done == 1:
+        if self.i_async_radiation:
+            if GR.dt_control.due(GR, 'radiation'):
+                # wait for result from last radiation boundary
+                self.wait_async_radiation(GR)
+                if self.async_result_pending:
+                    self.apply_async_radiation(GR, F)
                 if i_comp_mode == 2:
-                    F.copy_host_to_device(GR, F.RAD_TO_DEVICE)
                     F.copy_device_to_host(GR, F.RAD_TO_HOST)
-
-                F.RAD.done = 0
-                _thread.start_new_thread(F.RAD.calc_radiation, (GR, F))
+                self.start_async_radiation(GR, F)
         # Synchroneous Radiation
         else:
-            if GR.ts % F.RAD.rad_nth_ts == 0:
+            if GR.dt_control.due(GR, 'radiation'):
                 if i_comp_mode == 2:
                     F.copy_device_to_host(GR, F.RAD_TO_HOST)
-                F.RAD.calc_radiation(GR, F)
+                self.calc_radiation(GR, F)
                 if i_comp_mode == 2:
                     F.copy_host_to_device(GR, F.RAD_TO_DEVICE)
 
+
+    def start_async_radiation(self, GR, F):
+        """
+        Copy the input fields to the snapshot buffer and start the
+        worker thread computing radiation from the snapshot.
+        """
+        if self.async_fields is None:
+            self.async_fields = {}
+            for field_name in self.fields_radiation:
+                self.async_fields[field_name] = np.copy(F.host[field_name])
+        else:
+            for field_name in F.field_groups[F.RAD_TO_HOST]:
+                self.async_fields[field_name][:] = F.host[field_name]
+
+        # result will be active during the next radiation interval
+        self.current_GMT = GR.GMT + timedelta(
+                    seconds=GR.dt_control.get_event_interval(GR, 'radiation'))
+        self.done = 0
+        self.async_timer = Timer()
+        # radiation is computed on the host
+        self.async_timer.i_sync_context = 0
+        self.async_worker = threading.Thread(
+                                target=self.calc_radiation_async,
+                                args=(GR, GR.sim_time_sec))
+        self.async_worker.start()
+
+
+    def calc_radiation_async(self, GR, sim_t_start):
+        t_start = time.time()
+        # the timer of GR is used by the main thread in the meantime
+        self.compute_radiation(GR, self.async_fields, self.async_timer)
+        self.done = 1
+        print('###########################################')
+        print('ASYNC RADIATION DONE')
+        print('took ' + str(round(time.time()-t_start,0)) + ' seconds and ' +
+                str(round((GR.sim_time_sec-sim_t_start)/3600,1)) + 
+                ' simulated hours.')
+        print('###########################################')
+
+
+    def wait_async_radiation(self, GR):
+        """
+        Wait for the worker thread (if running) and add its timings to
+        GR.timer. Its result remains pending until it is applied.
+        """
+        if self.async_worker is not None:
+            GR.timer.start('rad_wait')
+            self.async_worker.join()
+            GR.timer.stop('rad_wait')
+            GR.timer.merge(self.async_timer)
+            self.async_worker = None
+            self.async_timer = None
+            self.async_result_pending = True
+
+
+    def apply_async_radiation(self, GR, F):
+        """
+        Swap in the radiation fields computed by the worker.
+        """
+        for field_name in F.field_groups[F.RAD_TO_DEVICE]:
+            F.host[field_name][:] = self.async_fields[field_name]
+        if i_comp_mode == 2:
+            F.copy_host_to_device(GR, F.RAD_TO_DEVICE)
+        self.async_result_pending = False
+
+
+    def __getstate__(self):
+        if self.async_worker is not None:
+            raise ValueError('Radiation worker still running. Call ' +
+                             'wait_async_radiation before writing restart.')
+        state = self.__dict__.copy()
+        state['async_timer'] = None
+        # snapshot buffers are only written to restart if they contain
+        # a pending result (applied at the next radiation boundary)
+        if not self.async_result_pending:
+            state['async_fields'] = None
+        # same for worker processes and shared memory
+        for key in ['mp_pool', 'mp_shm', 'mp_fields', 'mp_specs']:
+            state[key] = None
+        # coarse grid work fields are allocated again
+        state['coarse_fields'] = None
+        return(state)
+
         
     def calc_radiation(self, GR, F):
 
 
         t_start = time.time()
-        sim_t_start = GR.sim_time_sec
 
         print('###########################################')
         print('RADIATION START')
-        self.simple_radiation(GR, **F.get(self.fields_radiation, target=CPU))
+        self.current_GMT = copy.copy(GR.GMT)
+        self.compute_radiation(GR, F.get(self.fields_radiation, target=CPU),
+                               GR.timer)
         #self.simple_radiation_par(GR, CF)
 
         self.done = 1
         t_end = time.time()
-        sim_t_end = GR.sim_time_sec
 
             
         print('###########################################')
         print('RADIATION DONE')
         print('took ' + str(round(t_end-t_start,0)) + ' seconds.')
-        if self.i_async_radiation:
-            print('took ' + str(round((sim_t_end-sim_t_start)/3600,1)) + 
-                    ' simulated hours.')
         print('###########################################')
 
 
 
 
 
-    def simple_radiation(self, GR, PHIVB, SOLZEN, MYSUN, SWINTOA, TAIR,
+    def set_up_planck_table(self):
+        """
+        Tabulate the band-integrated Planck radiance for the batched
+        longwave computation (planck_table_dT > 0).
+        """
+        if self.planck_table_dT > 0:
+            self.planck_table, rel_error = calc_planck_table(
+                            self.planck_lambdas_center, self.planck_dlambdas,
+                            self.planck_table_dT)
+            print('Planck table: ' + str(len(self.planck_table)) +
+                  ' entries, dT = ' + str(self.planck_table_dT) +
+                  ' K, max. relative interpolation error: ' +
+                  '{:.2E}'.format(rel_error))
+        else:
+            # empty table: Planck function is evaluated exactly
+            self.planck_table = np.zeros(0, dtype=wp)
+            self.planck_table_dT = 1.
+
+
+    def set_up_coarse_grid(self, GR):
+        self.solar_geometry = SolarGeometry(GR)
+        if self.rad_coarse_factor > 1:
+            self.CGR = RadiationCoarseGrid(GR, self.rad_coarse_factor)
+            self.coarse_solar_geometry = SolarGeometry(self.CGR)
+            self.coarse_fields = None
+        else:
+            self.CGR = None
+        # cached columns do not belong to this grid
+        self.fingerprint = None
+
+
+    def compute_radiation(self, GR, fields, timer):
+        """
+        Run the radiation scheme for fields on the model grid or on the
+        coarse grid (rad_coarse_factor > 1). Computing times are
+        measured with timer.
+        """
+        if self.CGR is None:
+            self.simple_radiation(GR, self.solar_geometry, timer, **fields)
+            return
+
+        CGR = self.CGR
+        if self.coarse_fields is None:
+            self.coarse_fields = {}
+            for field_name in self.fields_radiation:
+                self.coarse_fields[field_name] = np.zeros(
+                        (CGR.nx+2*CGR.nb, CGR.ny+2*CGR.nb,
+                         fields[field_name].shape[2]),
+                        dtype=fields[field_name].dtype)
+
+        timer.start('rad_coarse')
+        for field_name in self.fields_coarsened:
+            CGR.coarsen(GR, fields[field_name],
+                        self.coarse_fields[field_name])
+        timer.stop('rad_coarse')
+
+        self.simple_radiation(CGR, self.coarse_solar_geometry, timer,
+                              **self.coarse_fields)
+
+        timer.start('rad_coarse')
+        for field_name in self.fields_refined:
+            CGR.exchange_BC(self.coarse_fields[field_name])
+            CGR.refine(GR, self.coarse_fields[field_name],
+                        fields[field_name])
+        # solar geometry is cheap enough for the model grid
+        self.solar_geometry.calc(self.current_GMT, fields['SOLZEN'],
+                                 fields['MYSUN'], fields['SWINTOA'])
+        timer.stop('rad_coarse')
+
+
+    def simple_radiation(self, GR, SG, timer, PHIVB, SOLZEN, MYSUN, SWINTOA, TAIR,
                         RHO, SOILTEMP, SURFALBEDLW, SURFALBEDSW, QC, LWFLXDO,
                         LWFLXUP, SWDIFFLXDO, SWDIRFLXDO, SWFLXUP, SWFLXDO,
                         LWFLXNET, SWFLXNET, SWFLXDIV, LWFLXDIV, TOTFLXDIV,
                         dPOTTdt_RAD):
 
         #GR.timer.start('prep')
-        current_GMT = copy.copy(GR.GMT)
+        current_GMT = self.current_GMT
 
         ALTVB = PHIVB / con_g
         dz = ALTVB[:,:,:-1] -  ALTVB[:,:,1:]
 
-        SOLZEN = rad_solar_zenith_angle(GR, current_GMT, SOLZEN)
-        MYSUN = np.cos(SOLZEN)
-        MYSUN[GR.ii,GR.jj,0][MYSUN[GR.ii,GR.jj,0] < 0] = 0
-        self.solar_constant = calc_current_solar_constant(current_GMT) 
-        SWINTOA = self.solar_constant * np.cos(SOLZEN)
+        self.solar_constant = SG.calc(current_GMT, SOLZEN, MYSUN, SWINTOA)
+        if i_rad_sw_batched:
+            sunlit_columns = SG.sunlit_columns(GR, MYSUN)
+        else:
+            sunlit_columns = None
         #GR.timer.stop('prep')
 
-        GR.timer.start('lw')
-        for i in range(GR.nb,GR.nx+GR.nb):
-            #i_ref = i+GR.nb
-            for j in range(GR.nb,GR.ny+GR.nb):
-                #j_ref = j+GR.nb
-
-                # LONGWAVE
-                # toon et al 1989 method
-                #down_diffuse, up_diffuse = \
-                #                    org_longwave(GR, dz[i,j],
-                #                                TAIRVB[i,j,:], RHO[i,j], \
-                #                                SOIL.TSOIL[i,j,0], SOIL.ALBEDOLW[i,j])
-                # self-manufactured method
-                down_diffuse, up_diffuse = \
-                            org_longwave(GR, GR.nz, GR.nzs, dz[i,j],
-                                        TAIR[i,j,:],    RHO[i,j],
-                                        SOILTEMP[i,j,0], SURFALBEDLW[i,j,0],
-                                        QC[i,j,:],
-                                        self.planck_lambdas_center,
-                                        self.planck_dlambdas)
-
-                LWFLXDO[i,j,:] = - down_diffuse
-                LWFLXUP[i,j,:] =   up_diffuse
+        if self.i_rad_incremental:
+            RECOMPUTE = self.select_recompute_columns(GR, timer, dz, TAIR,
+                                            RHO, QC, SOILTEMP, SURFALBEDLW,
+                                            SURFALBEDSW, MYSUN)
+        else:
+            RECOMPUTE = np.ones(TAIR.shape[:2]+(1,), dtype=np.bool_)
+
+        if self.njobs_rad > 1:
+            timer.start('lwsw')
+            self.calc_fluxes_multiprocessing(GR, dz, TAIR, RHO, QC,
+                        SOILTEMP, SURFALBEDLW, SURFALBEDSW, MYSUN, SWINTOA,
+                        RECOMPUTE, LWFLXDO, LWFLXUP, SWDIFFLXDO, SWDIRFLXDO,
+                        SWFLXUP, SWFLXDO)
+            timer.stop('lwsw')
+        else:
+            timer.start('lw')
+            self.calc_longwave(GR, dz, TAIR, RHO, QC, SOILTEMP, SURFALBEDLW,
+                        RECOMPUTE, LWFLXDO, LWFLXUP)
+            timer.stop('lw')
+            timer.start('sw')
+            self.calc_shortwave(GR, dz, RHO, QC, SURFALBEDSW, MYSUN, SWINTOA,
+                        RECOMPUTE, sunlit_columns, SWDIFFLXDO, SWDIRFLXDO,
+                        SWFLXUP, SWFLXDO)
+            timer.stop('sw')
 
         LWFLXNET[:] = LWFLXDO[:] - LWFLXUP[:] 
-        GR.timer.stop('lw')
-
-        GR.timer.start('sw')
-        for i in range(GR.nb,GR.nx+GR.nb):
-            #i_ref = i+GR.nb
-            for j in range(GR.nb,GR.ny+GR.nb):
-                #j_ref = j+GR.nb
-
-                # SHORTWAVE
-                if MYSUN[i,j] > 0:
-
-                    # toon et al 1989 method
-                    down_diffuse, up_diffuse, down_direct = \
-                                    org_shortwave(GR.nz, GR.nzs, dz[i,j],
-                                                self.solar_constant,
-                                                RHO[i,j],
-                                                SWINTOA[i,j,0],
-                                                MYSUN[i,j,0],
-                                                SURFALBEDSW[i,j,0],
-                                                QC[i,j,:])
-
-                    SWDIFFLXDO[i,j,:] = - down_diffuse
-                    SWDIRFLXDO[i,j,:] = - down_direct
-                    SWFLXUP   [i,j,:] = up_diffuse
-                    SWFLXDO   [i,j,:] = - down_diffuse - down_direct
-                else:
-                    SWDIFFLXDO[i,j,:] = 0
-                    SWDIRFLXDO[i,j,:] = 0
-                    SWFLXUP   [i,j,:] = 0
-                    SWFLXDO   [i,j,:] = 0
-
         SWFLXNET[:] = SWFLXDO[:] - SWFLXUP[:] 
-        GR.timer.stop('sw')
 
         #GR.timer.start('finish')
         for k in range(0,GR.nz):
@@ -210,120 +391,248 @@ class Radiation:
 
 
 
+    def select_recompute_columns(self, GR, timer, dz, TAIR, RHO, QC,
+                                SOILTEMP, SURFALBEDLW, SURFALBEDSW, MYSUN):
+        """
+        Compare the fingerprint of each column's radiation inputs to the
+        one stored when the column was last computed. Columns for which
+        any (scaled) component moved by more than rad_incremental_tol
+        are recomputed, all others keep their cached fluxes.
+        """
+        timer.start('rad_fingerprint')
+        mass = RHO * dz
+        column_mass = np.sum(mass, axis=2)
+        components = {
+            'TAIR_mean':    np.sum(mass * TAIR, axis=2) / column_mass,
+            'TAIR_sfc':     TAIR[:,:,-1],
+            'QC_path':      np.sum(mass * QC, axis=2),
+            'column_mass':  column_mass,
+            'SOILTEMP':     SOILTEMP[:,:,0],
+            'SURFALBEDLW':  SURFALBEDLW[:,:,0],
+            'SURFALBEDSW':  SURFALBEDSW[:,:,0],
+            'MYSUN':        np.maximum(MYSUN[:,:,0], 0.),
+        }
+        fingerprint = np.stack([components[key] /
+                                self.fingerprint_scales[key]
+                                for key in self.fingerprint_scales], axis=2)
+
+        if (self.fingerprint is None or
+            self.fingerprint.shape != fingerprint.shape):
+            RECOMPUTE = np.ones(TAIR.shape[:2]+(1,), dtype=np.bool_)
+            self.fingerprint = fingerprint
+        else:
+            RECOMPUTE = ( np.max(np.abs(fingerprint - self.fingerprint),
+                                 axis=2, keepdims=True) >
+                          self.rad_incremental_tol )
+            self.fingerprint[RECOMPUTE[:,:,0]] = \
+                                    fingerprint[RECOMPUTE[:,:,0]]
+
+        self.recompute_fraction = np.mean(RECOMPUTE[GR.ii,GR.jj,0])
+        print('radiation recomputed for ' +
+              str(round(100*self.recompute_fraction,1)) + ' % of columns')
+        timer.stop('rad_fingerprint')
+        return(RECOMPUTE)
+
+
+    def calc_longwave(self, GR, dz, TAIR, RHO, QC, SOILTEMP, SURFALBEDLW,
+                        RECOMPUTE, LWFLXDO, LWFLXUP):
+        if i_rad_lw_batched:
+            calc_LW_fluxes_cpu(LWFLXDO, LWFLXUP, dz, TAIR, RHO, SOILTEMP,
+                        SURFALBEDLW, QC, RECOMPUTE, self.planck_lambdas_center,
+                        self.planck_dlambdas, self.planck_table,
+                        wp(self.planck_table_dT))
+        else:
+            for i in range(GR.nb,GR.nx+GR.nb):
+                #i_ref = i+GR.nb
+                for j in range(GR.nb,GR.ny+GR.nb):
+                    #j_ref = j+GR.nb
+                    if not RECOMPUTE[i,j,0]:
+                        continue
+
+                    # LONGWAVE
+                    # toon et al 1989 method
+                    #down_diffuse, up_diffuse = \
+                    #                    org_longwave(GR, dz[i,j],
+                    #                                TAIRVB[i,j,:], RHO[i,j], \
+                    #                                SOIL.TSOIL[i,j,0], SOIL.ALBEDOLW[i,j])
+                    # self-manufactured method
+                    down_diffuse, up_diffuse = \
+                                org_longwave(GR, GR.nz, GR.nzs, dz[i,j],
+                                            TAIR[i,j,:],    RHO[i,j],
+                                            SOILTEMP[i,j,0], SURFALBEDLW[i,j,0],
+                                            QC[i,j,:],
+                                            self.planck_lambdas_center,
+                                            self.planck_dlambdas)
+
+                    LWFLXDO[i,j,:] = - down_diffuse
+                    LWFLXUP[i,j,:] =   up_diffuse
+
+
+    def calc_shortwave(self, GR, dz, RHO, QC, SURFALBEDSW, MYSUN, SWINTOA,
+                        RECOMPUTE, sunlit_columns, SWDIFFLXDO, SWDIRFLXDO,
+                        SWFLXUP, SWFLXDO):
+        if i_rad_sw_batched:
+            calc_SW_fluxes_sunlit(GR, dz, self.solar_constant, RHO, SWINTOA,
+                        MYSUN, SURFALBEDSW, SWDIFFLXDO, SWDIRFLXDO,
+                        SWFLXUP, SWFLXDO, RECOMPUTE, sunlit_columns)
+        else:
+            for i in range(GR.nb,GR.nx+GR.nb):
+                #i_ref = i+GR.nb
+                for j in range(GR.nb,GR.ny+GR.nb):
+                    #j_ref = j+GR.nb
+                    if not RECOMPUTE[i,j,0]:
+                        continue
+
+                    # SHORTWAVE
+                    if MYSUN[i,j] > 0:
+
+                        # toon et al 1989 method
+                        down_diffuse, up_diffuse, down_direct = \
+                                        org_shortwave(GR.nz, GR.nzs, dz[i,j],
+                                                    self.solar_constant,
+                                                    RHO[i,j],
+                                                    SWINTOA[i,j,0],
+                                                    MYSUN[i,j,0],
+                                                    SURFALBEDSW[i,j,0],
+                                                    QC[i,j,:])
+
+                        SWDIFFLXDO[i,j,:] = - down_diffuse
+                        SWDIRFLXDO[i,j,:] = - down_direct
+                        SWFLXUP   [i,j,:] = up_diffuse
+                        SWFLXDO   [i,j,:] = - down_diffuse - down_direct
+                    else:
+                        SWDIFFLXDO[i,j,:] = 0
+                        SWDIRFLXDO[i,j,:] = 0
+                        SWFLXUP   [i,j,:] = 0
+                        SWFLXDO   [i,j,:] = 0
+
+
+    def calc_fluxes_multiprocessing(self, GR, dz, TAIR, RHO, QC,
+                        SOILTEMP, SURFALBEDLW, SURFALBEDSW, MYSUN, SWINTOA,
+                        RECOMPUTE, LWFLXDO, LWFLXUP, SWDIFFLXDO, SWDIRFLXDO,
+                        SWFLXUP, SWFLXDO):
+        """
+        Compute longwave and shortwave fluxes in njobs_rad worker
+        processes, each taking a contiguous latitude band. Input and
+        output fields are exchanged via shared memory.
+        """
+        fields = {'dz':dz, 'TAIR':TAIR, 'RHO':RHO, 'QC':QC,
+                  'SOILTEMP':SOILTEMP, 'SURFALBEDLW':SURFALBEDLW,
+                  'SURFALBEDSW':SURFALBEDSW, 'MYSUN':MYSUN,
+                  'SWINTOA':SWINTOA, 'RECOMPUTE':RECOMPUTE,
+                  'LWFLXDO':LWFLXDO, 'LWFLXUP':LWFLXUP,
+                  'SWDIFFLXDO':SWDIFFLXDO, 'SWDIRFLXDO':SWDIRFLXDO,
+                  'SWFLXUP':SWFLXUP, 'SWFLXDO':SWFLXDO}
+        if self.mp_pool is None:
+            self.start_worker_pool()
+        if self.mp_shm is None:
+            self.setup_shared_memory(GR, fields)
+
+        for field_name in self.mp_input_fields:
+            self.mp_fields[field_name][:] = fields[field_name]
+
+        args = [(self.mp_specs, j0, j1, GR.nb, GR.nx, GR.nzs,
+                 self.solar_constant, self.planck_lambdas_center,
+                 self.planck_dlambdas, self.planck_table,
+                 wp(self.planck_table_dT)) for j0,j1 in self.mp_bands]
+        self.mp_pool.starmap(calc_fluxes_band, args)
+
+        for field_name in self.mp_output_fields:
+            fields[field_name][:] = self.mp_fields[field_name]
+
+
+    def start_worker_pool(self):
+        # workers have to share the resource tracker of the main process
+        # (otherwise their own trackers unlink the shared memory on exit)
+        resource_tracker.ensure_running()
+        self.mp_pool = mp.get_context('fork').Pool(
+                            processes=self.njobs_rad,
+                            initializer=init_radiation_worker)
+        atexit.register(self.close_multiprocessing)
+
+
+    def setup_shared_memory(self, GR, fields):
+        """
+        Allocate the shared memory fields and split the domain into
+        latitude bands.
+        """
+        self.mp_input_fields = ['dz', 'TAIR', 'RHO', 'QC', 'SOILTEMP',
+                                'SURFALBEDLW', 'SURFALBEDSW', 'MYSUN',
+                                'SWINTOA', 'RECOMPUTE']
+        self.mp_output_fields = ['LWFLXDO', 'LWFLXUP', 'SWDIFFLXDO',
+                                 'SWDIRFLXDO', 'SWFLXUP', 'SWFLXDO']
+        self.mp_shm = []
+        self.mp_fields = {}
+        self.mp_specs = {}
+        for field_name in self.mp_input_fields + self.mp_output_fields:
+            field = fields[field_name]
+            shm = shared_memory.SharedMemory(create=True, size=field.nbytes)
+            self.mp_shm.append(shm)
+            self.mp_fields[field_name] = np.ndarray(field.shape,
+                                        dtype=field.dtype, buffer=shm.buf)
+            self.mp_fields[field_name][:] = field
+            self.mp_specs[field_name] = (shm.name, field.shape,
+                                         field.dtype.str)
+
+        self.mp_bands = []
+        for band in np.array_split(np.arange(GR.nb,GR.ny+GR.nb),
+                                   self.njobs_rad):
+            if len(band) > 0:
+                self.mp_bands.append((band[0], band[-1]+1))
+
+
+    def close_multiprocessing(self):
+        if self.mp_pool is not None:
+            self.mp_pool.terminate()
+            self.mp_pool.join()
+            self.mp_pool = None
+        if self.mp_shm is not None:
+            for shm in self.mp_shm:
+                shm.close()
+                shm.unlink()
+            self.mp_shm = None
 
 
 
 
-
-    #def simple_radiation_par(self, GR, CF):
-    #    raise NotImplementedError()
-    #    ALTVB = CF.PHIVB / con_g
-    #    dz = ALTVB[:,:,:-1][GR.iijj] -  ALTVB[:,:,1:][GR.iijj]
-
-    #    self.SOLZEN = rad_solar_zenith_angle(GR, self.SOLZEN)
-    #    self.MYSUN = np.cos(self.SOLZEN)
-    #    self.MYSUN[self.MYSUN < 0] = 0
-    #    self.solar_constant = calc_current_solar_constant(GR) 
-    #    self.SWINTOA = self.solar_constant * np.cos(self.SOLZEN)
-
-
-    #    ij_all = np.full( (GR.nx*GR.ny, 2), np.int)
-    #    ij_ref_all = np.full( (GR.nx*GR.ny, 2), np.int)
-
-    #    #ii = np.arange(3,6).astype(np.int)
-    #    ii = np.tile(np.arange(0,GR.nx).astype(np.int),GR.ny)
-    #    jj = np.repeat(np.arange(0,GR.ny).astype(np.int),GR.nx)
-    #    ii_ref = np.tile(np.arange(0,GR.nx).astype(np.int),GR.ny)+1
-    #    jj_ref = np.repeat(np.arange(0,GR.ny).astype(np.int),GR.nx)+1
-
-    #    #t1 = time.time()
-    #    p = mp.Pool(processes=self.njobs_rad)
-    #    
-    #    #print(type(TAIR))
-    #    #print(type(RHO))
-    #    #print(type(PHIVB))
-    #    #quit()
-
-    #    input = [(GR.nz, GR.nzs, GR.kk, CF.TAIR[ii_ref[c],jj_ref[c],:],
-    #            CF.RHO[ii_ref[c],jj_ref[c],:], CF.PHIVB[ii[c],jj[c],:],
-    #            CF.SOILTEMP[ii[c],jj[c],0], CF.SURFALBEDLW[ii[c],jj[c]],
-    #            CF.SURFALBEDSW[ii[c],jj[c]], CF.QC[ii[c],jj[c],:],
-    #            self.SWINTOA[ii[c],jj[c]], self.MYSUN[ii[c],jj[c]],
-    #            dz[ii[c],jj[c],:], self.solar_constant, self.planck_lambdas_center,
-    #            self.planck_dlambdas) for c in range(0,len(ii))]
-
-    #    result = p.starmap(calc_par, input)
-    #    p.close()
-    #    p.join()
-    #    #t2 = time.time()
-    #    #print(len(result))
-    #    #print(result[len(ii)-1][0])
-    #    #print(t2 - t1)
-    #    #quit()
-
-    #    for c in range(0,len(ii)):
-    #        i = ii[c]
-    #        j = jj[c]
-    #        self.LWFLXDO[i,j,:]     = result[c][0]
-    #        self.LWFLXUP[i,j,:]     = result[c][1]
-    #        self.SWDIFFLXDO[i,j,:]  = result[c][2]
-    #        self.SWDIRFLXDO[i,j,:]  = result[c][3]
-    #        self.SWFLXUP[i,j,:]     = result[c][4]
-    #        self.SWFLXDO[i,j,:]     = result[c][5]
-    #        CF.LWFLXNET[i,j,:]      = result[c][6]
-    #        CF.SWFLXNET[i,j,:]      = result[c][7]
-    #        self.LWFLXDIV[i,j,:]    = result[c][8]
-    #        self.SWFLXDIV[i,j,:]    = result[c][9]
-    #        self.TOTFLXDIV[i,j,:]   = result[c][10]
-    #        CF.dPOTTdt_RAD[i,j,:]   = result[c][11]
-    #    
-
-
-
-
-#def calc_par(nz, nzs, kk, TAIR, RHO, PHIVB, TSOIL, ALBEDOLW, ALBEDOSW, QC,
-#            SWINTOA, MYSUN, dz, solar_constant, planck_lambdas_center,
-#            planck_dlambdas):
-#
-#
-#        down_diffuse, up_diffuse = \
-#                            org_longwave(nz, nzs, dz, TAIR, RHO, TSOIL, ALBEDOLW, QC,
-#                                         planck_lambdas_center, planck_dlambdas)
-#
-#
-#        LWFLXDO = - down_diffuse
-#        LWFLXUP =   up_diffuse
-#
-#        # SHORTWAVE
-#        if MYSUN > 0:
-#
-#            # toon et al 1989 method
-#            down_diffuse, up_diffuse, down_direct = \
-#                                org_shortwave(nz, nzs, dz, solar_constant, RHO, SWINTOA,
-#                                            MYSUN, ALBEDOSW, QC)
-#
-#            SWDIFFLXDO = - down_diffuse
-#            SWDIRFLXDO = - down_direct
-#            SWFLXUP    = up_diffuse
-#            SWFLXDO    = - down_diffuse - down_direct
-#        else:
-#            SWDIFFLXDO = np.zeros(nzs)
-#            SWDIRFLXDO = np.zeros(nzs) 
-#            SWFLXUP    = np.zeros(nzs) 
-#            SWFLXDO    = np.zeros(nzs) 
-#
-#        LWFLXNET = LWFLXDO - LWFLXUP 
-#        SWFLXNET = SWFLXDO - SWFLXUP 
-#
-#        #print(LWFLXNET)
-#        LWFLXDIV = ( LWFLXNET[kk] - LWFLXNET[kk+1] ) / dz[kk]
-#        SWFLXDIV = ( SWFLXNET[kk] - SWFLXNET[kk+1] ) / dz[kk]
-#        TOTFLXDIV = SWFLXDIV + LWFLXDIV
-#        dPOTTdt_RAD = 1/(con_cp * RHO) * TOTFLXDIV
-#
-#
-#        result = (LWFLXDO, LWFLXUP, SWDIFFLXDO, SWDIRFLXDO, SWFLXUP, SWFLXDO,
-#                LWFLXNET, SWFLXNET,
-#                LWFLXDIV, SWFLXDIV, TOTFLXDIV, dPOTTdt_RAD)
-#        return(result)
-#
+###############################################################################
+### MULTIPROCESSING WORKER
+###############################################################################
+# shared memory blocks attached in this (worker) process
+attached_shm = {}
+
+def init_radiation_worker():
+    # parallelism comes from the worker processes
+    numba.set_num_threads(1)
+
+
+def calc_fluxes_band(mp_specs, j0, j1, nb, nx, nzs, solar_constant,
+                    planck_lambdas_center, planck_dlambdas, planck_table,
+                    planck_table_dT):
+    """
+    Longwave and shortwave fluxes of the latitude band j0 <= j < j1.
+    """
+    fields = {}
+    for field_name, (shm_name, shape, dtype) in mp_specs.items():
+        if shm_name not in attached_shm:
+            attached_shm[shm_name] = shared_memory.SharedMemory(name=shm_name)
+        fields[field_name] = np.ndarray(shape, dtype=np.dtype(dtype),
+                                        buffer=attached_shm[shm_name].buf)
+
+    # band including lateral boundaries
+    band = slice(j0-nb,j1+nb)
+    calc_LW_fluxes_cpu(fields['LWFLXDO'][:,band], fields['LWFLXUP'][:,band],
+                fields['dz'][:,band], fields['TAIR'][:,band],
+                fields['RHO'][:,band], fields['SOILTEMP'][:,band],
+                fields['SURFALBEDLW'][:,band], fields['QC'][:,band],
+                fields['RECOMPUTE'][:,band], planck_lambdas_center, planck_dlambdas, planck_table,
+                planck_table_dT)
+
+    band_grid = SimpleNamespace(nzs=nzs,
+                            ii=np.arange(nb,nx+nb)[:,np.newaxis],
+                            jj=np.arange(j0,j1)[np.newaxis,:])
+    calc_SW_fluxes_sunlit(band_grid, fields['dz'], solar_constant,
+                fields['RHO'], fields['SWINTOA'], fields['MYSUN'],
+                fields['SURFALBEDSW'], fields['SWDIFFLXDO'],
+                fields['SWDIRFLXDO'], fields['SWFLXUP'], fields['SWFLXDO'],
+                fields['RECOMPUTE'])
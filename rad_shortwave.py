@@ -4,18 +4,25 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20181001
-Last modified:      20190701
+Last modified:      20190709
 License:            MIT
 
 Organize computation of shortwave radiation.
+
+HISTORY
+- 20190708: CH  Added batched computation of all sunlit columns
+                (calc_SW_fluxes_cpu) with night-side column compaction.
+- 20190709: CH  Solar geometry moved to rad_solar_geometry.py.
 ###############################################################################
 """
 import scipy
 import numpy as np
-from datetime import timedelta
+from numba import njit, prange
 
 from io_constants import solar_constant_0
 from namelist import sigma_abs_gas_SW_in, sigma_sca_gas_SW_in
+from io_read_namelist import wp, wp_int
+from misc_banded_solver import solve_banded_col
 
 
 ###################################################################################
@@ -188,67 +195,215 @@ def rad_calc_SW_fluxes_toon(nz, nzs, dtau, gamma1, gamma2,
 ###################################################################################
 
 
-
-
-def rad_solar_zenith_angle(GR, current_time, SOLZEN):
-
-
-    #print(GR.GMT)
-    #quit()
-
-    # SOLAR DECLINATION ANGLE
-    n_days_in_year = 365 # TODO: leap years
-    D_J = current_time.timetuple().tm_yday
-    Y = current_time.timetuple().tm_year
-
-    if Y >= 2001:
-        D_L = np.floor((Y - 2001)/4)
+###################################################################################
+###################################################################################
+# METHOD: TOON ET AL 1989 (BATCHED OVER SUNLIT COLUMNS)
+###################################################################################
+###################################################################################
+# Same physics as org_shortwave but for a compacted list of sunlit
+# columns. Input and output arrays are laid out column-by-level
+# (ncols, nz) and (ncols, nzs). Columns are processed in blocks
+# sharing the same work arrays.
+
+g_a_SW          = wp(0.)
+my1_SW          = wp(1/np.sqrt(3))
+sigma_abs_SW    = wp(sigma_abs_gas_SW_in)
+sigma_sca_SW    = wp(sigma_sca_gas_SW_in)
+SW_block_size   = 64
+
+
+def gather_sunlit_columns(GR, MYSUN, RECOMPUTE, sunlit_columns=None):
+    """
+    Indices (i,j) of all columns of the domain with the sun above
+    the horizon that have to be recomputed. sunlit_columns can be
+    provided by SolarGeometry.sunlit_columns.
+    """
+    if sunlit_columns is None:
+        ii_sun, jj_sun = np.nonzero((MYSUN[GR.ii,GR.jj,0] > 0) &
+                                    RECOMPUTE[GR.ii,GR.jj,0])
+        return(GR.ii[ii_sun,0], GR.jj[0,jj_sun])
     else:
-        D_L = np.floor((Y - 2000)/4) - 1
-    N_JD = 364.5 + (Y - 2001)*365 + D_L + D_J
-
-    eps_ob = 23.439 - 0.0000004 * N_JD
-
-    L_M = 280.460 + 0.9856474 * N_JD;
-    g_M = 357.528 + 0.9856003 * N_JD;
-
-    lamb_ec = L_M + 1.915 * np.sin(g_M * np.pi/180) + \
-                    0.020 * np.sin(2 * g_M * np.pi/180);
-
-    sol_declin = np.arcsin( \
-            np.sin(eps_ob/180*np.pi)*np.sin(lamb_ec/180*np.pi))            
-
-    # HOUR ANGLE
-    sec_of_local_noon = GR.lon_rad[GR.ii,GR.jj,0]/(2*np.pi)*86400
-    #sec_of_day = timedelta(hours=GR.GMT.hour,
-    #                          minutes=GR.GMT.minute,
-    #                          seconds=GR.GMT.second).total_seconds()
-    sec_of_day = timedelta(hours=current_time.hour,
-                              minutes=current_time.minute,
-                              seconds=current_time.second).total_seconds()
-    sec_past_local_noon = sec_of_day - sec_of_local_noon
-    hour_angle = 2*np.pi * sec_past_local_noon / 86400;
+        ii_sun, jj_sun = sunlit_columns
+        recompute = RECOMPUTE[ii_sun,jj_sun,0]
+        return(ii_sun[recompute], jj_sun[recompute])
+
+
+def shortwave_col_py(nz, dz, rho_col, solar_constant, swintoa, mysun,
+                    albedo_surface_SW, taus, e1, e2, e3, e4,
+                    Cp_tau, Cm_tau, Cp_0, Cm_0, A_mat, src, lu, fluxes,
+                    swdifflxdo, swdirflxdo, swflxup, swflxdo):
+    """
+    Toon et al. 1989 two-stream shortwave fluxes of one sunlit column
+    using the preallocated work arrays.
+    """
+    # optical thickness
+    sigma_tot = sigma_abs_SW + sigma_sca_SW
+    taus[0] = 0.
+    for k in range(nz):
+        taus[k+1] = taus[k] + sigma_tot * dz[k] * rho_col[k]
 
+    # single scattering albedo
+    omega_s = sigma_sca_SW/sigma_tot
 
-    SOLZEN[GR.ii,GR.jj,0] = np.arccos( \
-                    + np.sin(GR.lat_rad[GR.ii,GR.jj,0]) * np.sin(sol_declin) \
-                    + np.cos(GR.lat_rad[GR.ii,GR.jj,0]) * \
-                                np.cos(sol_declin) * np.cos(hour_angle) )
+    # quadrature
+    gamma1 = ( 1. - omega_s*(1.+g_a_SW)/2. ) / my1_SW
+    gamma2 = omega_s*(1.-g_a_SW) / (2.*my1_SW)
+    gamma3 = (1. - 3. * g_a_SW * my1_SW * mysun) / 2.
+    gamma4 = 1. - gamma3
+    lamb_2str = np.sqrt(gamma1**2 - gamma2**2)
+    tau_2str = gamma2 / (gamma1 + lamb_2str)
 
-    return(SOLZEN)
+    # surface reflection
+    surf_reflected_SW = albedo_surface_SW * mysun * solar_constant * \
+                            np.exp(-taus[nz]/mysun)
+
+    fact_p = omega_s * solar_constant * \
+            ( (gamma1 - 1. / mysun) * gamma3 + gamma4 * gamma2 ) / \
+            ( lamb_2str**2 - 1. / mysun**2 )
+    fact_m = omega_s * solar_constant * \
+            ( (gamma1 + 1. / mysun) * gamma4 + gamma2 * gamma3 ) / \
+            ( lamb_2str**2 - 1. / mysun**2 )
+    for k in range(nz):
+        exp_lamb = np.exp( - lamb_2str * sigma_tot * dz[k] * rho_col[k] )
+        e1[k] = 1.       + tau_2str * exp_lamb
+        e2[k] = 1.       - tau_2str * exp_lamb
+        e3[k] = tau_2str +            exp_lamb
+        e4[k] = tau_2str -            exp_lamb
+        Cp_tau[k] = fact_p * np.exp( - taus[k+1] / mysun )
+        Cp_0  [k] = fact_p * np.exp( - taus[k  ] / mysun )
+        Cm_tau[k] = fact_m * np.exp( - taus[k+1] / mysun )
+        Cm_0  [k] = fact_m * np.exp( - taus[k  ] / mysun )
+
+    # tridiagonal system in solve_banded storage
+    n = 2*nz
+    A_mat[0,0] = 0.
+    A_mat[1,0] = e1[0]
+    A_mat[0,1] = - e2[0]
+    src[0] = 0. - Cm_0[0]
+    for k in range(nz-1):
+        # row 2k+1
+        r = 2*k+1
+        A_mat[2,r-1] = e2[k+1] * e1[k  ] - e3[k  ] * e4[k+1]
+        A_mat[1,r  ] = e2[k  ] * e2[k+1] - e4[k  ] * e4[k+1]
+        A_mat[0,r+1] = e1[k+1] * e4[k+1] - e2[k+1] * e3[k+1]
+        src[r] = e2[k+1] * (Cp_0  [k+1] - Cp_tau[k  ]) + \
+                 e4[k+1] * (Cm_0  [k+1] - Cm_tau[k  ])
+        # row 2k+2
+        r = 2*k+2
+        A_mat[2,r-1] = e2[k  ] * e3[k  ] - e4[k  ] * e1[k  ]
+        A_mat[1,r  ] = e1[k  ] * e1[k+1] - e3[k  ] * e3[k+1]
+        A_mat[0,r+1] = e3[k  ] * e4[k+1] - e1[k  ] * e2[k+1]
+        src[r] = e3[k  ] * (Cp_0  [k+1] - Cp_tau[k  ]) + \
+                 e1[k  ] * (Cm_tau[k  ] - Cm_0  [k+1])
+    A_mat[2,n-2] = e1[nz-1] - albedo_surface_SW * e3[nz-1]
+    A_mat[1,n-1] = e2[nz-1] - albedo_surface_SW * e4[nz-1]
+    A_mat[2,n-1] = 0.
+    src[n-1] = surf_reflected_SW - Cp_tau[nz-1] + \
+                albedo_surface_SW * Cm_tau[nz-1]
+
+    solve_banded_col(1, 1, A_mat, src, lu, fluxes)
+
+    # fluxes (sign convention of SWDIFFLXDO, SWDIRFLXDO, SWFLXUP, SWFLXDO)
+    swdifflxdo[0] = 0.
+    swdirflxdo[0] = swintoa
+    for k in range(nz):
+        Y1 = fluxes[2*k]
+        Y2 = fluxes[2*k+1]
+        down_diffuse = - Y1*e3[k] - Y2*e4[k] - Cm_tau[k]
+        down_direct = - mysun * solar_constant * np.exp( - taus[k+1] / mysun)
+        swdifflxdo[k+1] = - down_diffuse
+        swdirflxdo[k+1] = - down_direct
+        swflxup[k+1] = Y1*e1[k] + Y2*e2[k] + Cp_tau[k]
+    # extrapolate uppermost flux (second order)
+    swflxup[0] = max(0., swflxup[1] - (- swflxup[3] + 4.*swflxup[2] - \
+                                        3.*swflxup[1]) * dz[0]/(dz[1]+dz[2]))
+    for k in range(nz+1):
+        swflxdo[k] = swdifflxdo[k] + swdirflxdo[k]
 
 
-def calc_current_solar_constant(current_time):
-    n_days_in_year = 365 # TODO: leap years
-    D_J = current_time.timetuple().tm_yday
-    theta_J = 2 * np.pi * D_J / n_days_in_year
-    earth_sun_dist = 1.00011 + 0.034221 * np.cos(theta_J) \
-                    + 0.00128 * np.sin(theta_J) \
-                    + 0.000719 * np.cos(2 * theta_J) \
-                    + 0.000077 * np.sin(2 * theta_J)
-    return(solar_constant_0 * earth_sun_dist)
 
+###############################################################################
+### SPECIALIZE FOR CPU
+###############################################################################
+shortwave_col = njit(shortwave_col_py)
+
+def launch_numba_cpu(SWDIFFLXDO, SWDIRFLXDO, SWFLXUP, SWFLXDO,
+                    dz, RHO, solar_constant, SWINTOA, MYSUN, SURFALBEDSW):
+
+    ncols = dz.shape[0]
+    nz = dz.shape[1]
+    nblocks = (ncols + SW_block_size - 1) // SW_block_size
+    for b in prange(nblocks):
+        # work arrays (reused for all columns of this block)
+        taus    = np.empty(nz+1, dtype=wp)
+        e1      = np.empty(nz, dtype=wp)
+        e2      = np.empty(nz, dtype=wp)
+        e3      = np.empty(nz, dtype=wp)
+        e4      = np.empty(nz, dtype=wp)
+        Cp_tau  = np.empty(nz, dtype=wp)
+        Cm_tau  = np.empty(nz, dtype=wp)
+        Cp_0    = np.empty(nz, dtype=wp)
+        Cm_0    = np.empty(nz, dtype=wp)
+        A_mat   = np.empty((3, 2*nz), dtype=wp)
+        src     = np.empty(2*nz, dtype=wp)
+        lu      = np.empty((4, 2*nz), dtype=wp)
+        fluxes  = np.empty(2*nz, dtype=wp)
+        for c in range(b*SW_block_size, min(ncols, (b+1)*SW_block_size)):
+            shortwave_col(nz, dz[c,:], RHO[c,:], solar_constant,
+                        SWINTOA[c], MYSUN[c], SURFALBEDSW[c],
+                        taus, e1, e2, e3, e4, Cp_tau, Cm_tau, Cp_0, Cm_0,
+                        A_mat, src, lu, fluxes,
+                        SWDIFFLXDO[c,:], SWDIRFLXDO[c,:],
+                        SWFLXUP[c,:], SWFLXDO[c,:])
+
+calc_SW_fluxes_cpu = njit(parallel=True, nogil=True)(launch_numba_cpu)
+
+
+def calc_SW_fluxes_sunlit(GR, dz, solar_constant, RHO, SWINTOA, MYSUN,
+                        SURFALBEDSW, SWDIFFLXDO, SWDIRFLXDO, SWFLXUP, SWFLXDO,
+                        RECOMPUTE, sunlit_columns=None):
+    """
+    Gather the sunlit columns, compute their shortwave fluxes as one
+    batch and scatter the results back to the 3D flux fields.
+    Night-side columns are set to zero. Only columns flagged in
+    RECOMPUTE are touched (incremental radiation).
+    """
+    ii_sun, jj_sun = gather_sunlit_columns(GR, MYSUN, RECOMPUTE,
+                                           sunlit_columns)
+    ncols = len(ii_sun)
+
+    ii_night, jj_night = np.nonzero(RECOMPUTE[GR.ii,GR.jj,0] &
+                                    ~(MYSUN[GR.ii,GR.jj,0] > 0))
+    for FIELD in [SWDIFFLXDO, SWDIRFLXDO, SWFLXUP, SWFLXDO]:
+        FIELD[GR.ii[ii_night,0],GR.jj[0,jj_night],:] = 0.
+    if ncols == 0:
+        return
+
+    # gather (column-by-level layout)
+    dz_sun          = np.ascontiguousarray(dz[ii_sun,jj_sun,:])
+    RHO_sun         = np.ascontiguousarray(RHO[ii_sun,jj_sun,:])
+    SWINTOA_sun     = SWINTOA[ii_sun,jj_sun,0].astype(wp)
+    MYSUN_sun       = MYSUN[ii_sun,jj_sun,0].astype(wp)
+    SURFALBEDSW_sun = SURFALBEDSW[ii_sun,jj_sun,0].astype(wp)
+    SWDIFFLXDO_sun  = np.empty((ncols, GR.nzs), dtype=wp)
+    SWDIRFLXDO_sun  = np.empty((ncols, GR.nzs), dtype=wp)
+    SWFLXUP_sun     = np.empty((ncols, GR.nzs), dtype=wp)
+    SWFLXDO_sun     = np.empty((ncols, GR.nzs), dtype=wp)
+
+    calc_SW_fluxes_cpu(SWDIFFLXDO_sun, SWDIRFLXDO_sun, SWFLXUP_sun,
+                    SWFLXDO_sun, dz_sun, RHO_sun, wp(solar_constant),
+                    SWINTOA_sun, MYSUN_sun, SURFALBEDSW_sun)
+
+    # scatter
+    SWDIFFLXDO[ii_sun,jj_sun,:] = SWDIFFLXDO_sun
+    SWDIRFLXDO[ii_sun,jj_sun,:] = SWDIRFLXDO_sun
+    SWFLXUP   [ii_sun,jj_sun,:] = SWFLXUP_sun
+    SWFLXDO   [ii_sun,jj_sun,:] = SWFLXDO_sun
 
+###################################################################################
+###################################################################################
+###################################################################################
+###################################################################################
 
 
 
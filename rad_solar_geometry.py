@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+#-*- coding: utf-8 -*-
+"""
+###############################################################################
+Author:             Christoph Heim
+Date created:       20190709
+Last modified:      20190709
+License:            MIT
+
+Solar geometry for the radiation scheme.
+SolarGeometry precomputes the latitude/longitude-dependent terms once
+per grid. Per radiation call only scalars are evaluated in python
+(declination, equation of time, solar constant) and SOLZEN, MYSUN and
+SWINTOA of all columns are filled in one compiled pass.
+The equation of time is optional (i_equation_of_time).
+
+HISTORY
+- 20190709: CH  Moved rad_solar_zenith_angle and
+                calc_current_solar_constant here from rad_shortwave.py.
+###############################################################################
+"""
+import numpy as np
+from datetime import timedelta
+from numba import njit, prange
+
+from io_constants import solar_constant_0
+from namelist import nb, i_equation_of_time
+from io_read_namelist import wp
+###############################################################################
+
+
+class SolarGeometry:
+
+    def __init__(self, GR):
+        self.i_equation_of_time = i_equation_of_time
+
+        # LATITUDE/LONGITUDE DEPENDENT TERMS
+        shape = (GR.nx+2*GR.nb, GR.ny+2*GR.nb)
+        self.sin_lat = np.zeros(shape, dtype=wp)
+        self.cos_lat = np.zeros(shape, dtype=wp)
+        # hour angle contribution of longitude
+        self.lon_hour_angle = np.zeros(shape, dtype=wp)
+        self.sin_lat[GR.ii,GR.jj] = np.sin(GR.lat_rad[GR.ii,GR.jj,0])
+        self.cos_lat[GR.ii,GR.jj] = np.cos(GR.lat_rad[GR.ii,GR.jj,0])
+        self.lon_hour_angle[GR.ii,GR.jj] = GR.lon_rad[GR.ii,GR.jj,0]
+
+
+    def calc(self, current_time, SOLZEN, MYSUN, SWINTOA):
+        """
+        Fill SOLZEN, MYSUN (cosine of SOLZEN, zero if the sun is below
+        the horizon) and SWINTOA for current_time. Returns the solar
+        constant.
+        """
+        sol_declin, eq_of_time = solar_declination(current_time)
+        if not self.i_equation_of_time:
+            eq_of_time = 0.
+        sec_of_day = timedelta(hours=current_time.hour,
+                              minutes=current_time.minute,
+                              seconds=current_time.second).total_seconds()
+        time_hour_angle = 2*np.pi * (sec_of_day + eq_of_time) / 86400
+        solar_constant = calc_current_solar_constant(current_time)
+
+        solar_geometry_cpu(SOLZEN, MYSUN, SWINTOA,
+                    self.sin_lat, self.cos_lat, self.lon_hour_angle,
+                    wp(np.sin(sol_declin)), wp(np.cos(sol_declin)),
+                    wp(time_hour_angle), wp(solar_constant))
+        return(solar_constant)
+
+
+    def sunlit_columns(self, GR, MYSUN):
+        """
+        Indices (i,j) of all columns of the domain with the sun above
+        the horizon.
+        """
+        ii_sun, jj_sun = np.nonzero(MYSUN[GR.ii,GR.jj,0] > 0)
+        return(GR.ii[ii_sun,0], GR.jj[0,jj_sun])
+
+
+
+def solar_declination(current_time):
+    """
+    Solar declination angle [rad] and equation of time [s] of the day
+    of current_time.
+    """
+    D_J = current_time.timetuple().tm_yday
+    Y = current_time.timetuple().tm_year
+
+    if Y >= 2001:
+        D_L = np.floor((Y - 2001)/4)
+    else:
+        D_L = np.floor((Y - 2000)/4) - 1
+    N_JD = 364.5 + (Y - 2001)*365 + D_L + D_J
+
+    eps_ob = 23.439 - 0.0000004 * N_JD
+
+    L_M = 280.460 + 0.9856474 * N_JD
+    g_M = 357.528 + 0.9856003 * N_JD
+
+    lamb_ec = L_M + 1.915 * np.sin(g_M * np.pi/180) + \
+                    0.020 * np.sin(2 * g_M * np.pi/180)
+
+    sol_declin = np.arcsin( \
+            np.sin(eps_ob/180*np.pi)*np.sin(lamb_ec/180*np.pi))
+
+    # equation of time: mean minus apparent solar right ascension
+    right_asc = np.arctan2(np.cos(eps_ob/180*np.pi)*np.sin(lamb_ec/180*np.pi),
+                           np.cos(lamb_ec/180*np.pi)) * 180/np.pi
+    eq_of_time = (L_M - right_asc + 180) % 360 - 180
+    # 4 minutes per degree
+    eq_of_time = eq_of_time * 240
+
+    return(sol_declin, eq_of_time)
+
+
+def calc_current_solar_constant(current_time):
+    n_days_in_year = 365 # TODO: leap years
+    D_J = current_time.timetuple().tm_yday
+    theta_J = 2 * np.pi * D_J / n_days_in_year
+    earth_sun_dist = 1.00011 + 0.034221 * np.cos(theta_J) \
+                    + 0.00128 * np.sin(theta_J) \
+                    + 0.000719 * np.cos(2 * theta_J) \
+                    + 0.000077 * np.sin(2 * theta_J)
+    return(solar_constant_0 * earth_sun_dist)
+
+
+
+###############################################################################
+### SPECIALIZE FOR CPU
+###############################################################################
+def launch_numba_cpu(SOLZEN, MYSUN, SWINTOA, sin_lat, cos_lat, lon_hour_angle,
+                    sin_declin, cos_declin, time_hour_angle, solar_constant):
+
+    for i in prange(nb,SOLZEN.shape[0]-nb):
+        for j in range(nb,SOLZEN.shape[1]-nb):
+            hour_angle = time_hour_angle - lon_hour_angle[i,j]
+            mysun = ( sin_lat[i,j] * sin_declin +
+                      cos_lat[i,j] * cos_declin * np.cos(hour_angle) )
+            mysun = min(max(mysun, -1.), 1.)
+            SOLZEN[i,j,0] = np.arccos(mysun)
+            MYSUN[i,j,0] = max(mysun, 0.)
+            SWINTOA[i,j,0] = solar_constant * MYSUN[i,j,0]
+
+solar_geometry_cpu = njit(parallel=True, nogil=True)(launch_numba_cpu)
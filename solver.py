@@ -4,13 +4,15 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20181001
-Last modified:      20190701
+Last modified:      20190715
 License:            MIT
 
 Simple global climate model, hydrostatic and on a lat-lon grid.
 Still in construction.
 
-solver.py is the entry point to the program.
+solver.py is the entry point to the program. The time loop is
+implemented in main_simulation.py (Simulation) and can also be driven
+from Python.
 
 Implementation of dynamical core according to:
 Jacobson 2005
@@ -22,172 +24,14 @@ Numba:  0.43.1
 Numpy:  1.16.3
 ###############################################################################
 """
-#if i == 0:
-#    from pdb import set_trace
-#    pdb.set_trace()
-import time, _thread
-import numpy as np
-from datetime import timedelta
-
-from namelist import (i_time_stepping,
-                    i_load_from_restart, i_save_to_restart,
-                    i_surface_scheme, i_turbulence, i_microphysics,
-                    i_radiation, i_comp_mode,
-                    i_microphysics)
-from io_read_namelist import (gpu_enable, CPU, GPU)
-from io_nc_output import constant_fields_to_NC, output_to_NC
-from io_restart import write_restart
-from io_functions import (print_ts_info)
-from main_grid import Grid
-from main_fields import ModelFields
-from dyn_matsuno import step_matsuno as time_stepper
-from dyn_org_discretizations import DiagnosticsFactory
+from main_simulation import Simulation
 ###############################################################################
-if i_comp_mode == 1:
-    Diagnostics = DiagnosticsFactory(target=CPU)
-elif i_comp_mode == 2:
-    Diagnostics = DiagnosticsFactory(target=GPU)
-
-## show number of CPU threads for numba.
-#import numba
-#print(numba.config.NUMBA_DEFAULT_NUM_THREADS)
-#quit()
 
-####################################################################
-# CREATE MODEL GRID AND FIELDS
-####################################################################
-GR = Grid()
-F = ModelFields(GR, gpu_enable)
-
-
-####################################################################
-# OUTPUT AT TIMESTEP 0 (before start of simulation)
-####################################################################
-constant_fields_to_NC(GR, F)
-
-## TODO is this necessary?
-GR.timer.start('diag')
-Diagnostics.primary_diag(GR.GRF[Diagnostics.target],
-        **F.get(
-                Diagnostics.fields_primary_diag,
-                target=Diagnostics.target))
-GR.timer.stop('diag')
-
-
-####################################################################
-####################################################################
-####################################################################
-# TIME LOOP START
-while GR.ts < GR.nts:
-    GR.timer.start('total')
-
-    ####################################################################
-    # SIMULATION STATUS
-    ####################################################################
-    real_time_ts_start = time.time()
-    GR.ts += 1
-    GR.sim_time_sec = GR.ts*GR.dt
-    GR.GMT += timedelta(seconds=GR.dt)
-    print_ts_info(GR, F)
-
-
-    ####################################################################
-    # SECONDARY DIAGNOSTICS (related to physics, but not affecting
-    #                        dynamics)
-    ####################################################################
-    GR.timer.start('diag')
-    Diagnostics.secondary_diag(
-            **F.get(Diagnostics.fields_secondary_diag,
-                    target=Diagnostics.target))
-    GR.timer.stop('diag')
-
-
-    ####################################################################
-    # TURBULENCE
-    ####################################################################
-    if i_turbulence:
-        GR.timer.start('turb')
-        F.TURB.compute_turbulence(GR, **F.get(F.TURB.fields_main,
-                                target=F.TURB.target))
-        GR.timer.stop('turb')
-
-
-    ####################################################################
-    # MICROPHYSICS
-    ####################################################################
-    if i_microphysics:
-        GR.timer.start('mic')
-        F.MIC.compute_microhpysics(GR, **F.get(F.MIC.fields_main,
-                                    target=F.MIC.target))
-        GR.timer.stop('mic')
-
-
-    ####################################################################
-    # EARTH SURFACE
-    ####################################################################
-    if i_surface_scheme:
-        GR.timer.start('srfc')
-        F.SURF.advance_timestep(GR, GR.GRF[F.SURF.target],
-                                **F.get(F.SURF.fields_timestep,
-                                target=F.SURF.target))
-        GR.timer.stop('srfc')
-
-
-    ####################################################################
-    # RADIATION
-    ####################################################################
-    if i_radiation:
-        GR.timer.start('rad')
-        F.RAD.launch_radiation_calc(GR, F)
-        GR.timer.stop('rad')
-
-
-    ####################################################################
-    # DYNAMICS
-    ####################################################################
-    GR.timer.start('dyn')
-    time_stepper(GR, F)
-    GR.timer.stop('dyn')
-
-
-    ####################################################################
-    # WRITE NC OUTPUT
-    ####################################################################
-    if GR.ts % GR.i_out_nth_ts == 0:
-        # copy GPU fields to CPU
-        if i_comp_mode == 2:
-            F.copy_device_to_host(GR, F.ALL_FIELDS)
-        # write file
-        GR.timer.start('IO')
-        GR.nc_output_count += 1
-        output_to_NC(GR, F)
-        GR.timer.stop('IO')
-
-
-    ####################################################################
-    # WRITE RESTART FILE
-    ####################################################################
-    if (GR.ts % GR.i_restart_nth_ts == 0) and i_save_to_restart:
-        # copy GPU fields to CPU
-        if i_comp_mode == 2:
-            F.copy_device_to_host(GR, F.ALL_FIELDS)
-        # write file
-        GR.timer.start('IO')
-        write_restart(GR, F)
-        GR.timer.stop('IO')
-
-
-    GR.timer.stop('total')
-# TIME LOOP STOP
-####################################################################
-####################################################################
-####################################################################
-
-
-####################################################################
-# FINALIZE SIMULATION
-####################################################################
-GR.timer.print_report()
+if __name__ == '__main__':
+    sim = Simulation()
+    sim.setup()
+    sim.run_until()
+    sim.finalize()
 
 
 
@@ -4,7 +4,7 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20181001
-Last modified:      20190629
+Last modified:      20190715
 License:            MIT
 
 Main script of surface scheme.
@@ -21,6 +21,7 @@ from srfc_namelist import (depth_soil, depth_ocean, cp_soil, cp_ocean,
                             rho_soil, rho_water, moisture_soil,
                             moisture_ocean, DRAGCM, DRAGCH)
 from srfc_timestep import advance_timestep_srfc_cpu
+from misc_boundaries import exchange_BC_fields_cpu
 if gpu_enable:
     from srfc_timestep import advance_timestep_srfc_gpu
 from srfc_timestep import advance_timestep_srfc_cpu
@@ -79,7 +80,12 @@ class Surface:
                         SURFALBEDSW, SURFALBEDLW, TAIR, QV, WIND,
                         RHO, PSURF, COLP, WINDX, WINDY,
                         SMOMXFLX, SMOMYFLX, SSHFLX, SLHFLX,
-                        RAIN):
+                        RAIN, dt=None):
+        """
+        Time step dt until the next call (default GR.dt).
+        """
+        if dt is None:
+            dt = GR.dt
 
         if self.target == GPU:
             advance_timestep_srfc_gpu[bpg, tpb_2D](SOILTEMP, SOILMOIST,
@@ -89,7 +95,7 @@ class Surface:
                                    TAIR, QV, WIND, RHO, PSURF, COLP,
                                    SMOMXFLX, SMOMYFLX, SSHFLX, SLHFLX,
                                    WINDX, WINDY, RAIN, DRAGCM, DRAGCH,
-                                   GRF['A'], GR.dt)
+                                   GRF['A'], dt)
 
 
         elif self.target == CPU:
@@ -100,7 +106,9 @@ class Surface:
                                    TAIR, QV, WIND, RHO, PSURF, COLP,
                                    SMOMXFLX, SMOMYFLX, SSHFLX, SLHFLX,
                                    WINDX, WINDY, RAIN, DRAGCM, DRAGCH,
-                                   GRF['A'], GR.dt)
+                                   GRF['A'], dt)
+            # momentum fluxes are interpolated to the wind points
+            exchange_BC_fields_cpu((SMOMXFLX, SMOMYFLX))
 
 
         #    # calc evaporation capacity
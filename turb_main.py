@@ -4,7 +4,7 @@
 ###############################################################################
 Author:             Christoph Heim
 Date created:       20190607
-Last modified:      20190616
+Last modified:      20190715
 License:            MIT
 
 Main script to organize turbulent transport.
@@ -15,6 +15,7 @@ from numba import cuda
 
 from io_read_namelist import wp, GPU, CPU, gpu_enable
 from main_grid import tpb, bpg
+from misc_boundaries import exchange_BC_cpu
 if gpu_enable:
     from turb_compute import compute_turbulence_gpu
 from turb_compute import compute_turbulence_cpu
@@ -47,6 +48,8 @@ class Turbulence:
             compute_turbulence_cpu(
                             KMOM, KHEAT, PHIVB, HSURF, PHI, QV,
                             WINDX, WINDY, POTTVB, POTT)
+            # KMOM is interpolated to the wind points (boundaries needed)
+            exchange_BC_cpu(KMOM)
     
         
 